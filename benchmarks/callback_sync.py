@@ -0,0 +1,161 @@
+"""
+Compare the twilio API round trips, latency, queries and transactions of a
+status callback when the message is re-fetched from the REST API against
+syncing it from the callback payload.
+
+Run from the project root::
+
+    $ python -m benchmarks.callback_sync --messages 100 --latency .05
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import datetime
+import time
+
+from collections import deque
+
+import runtests  # noqa, configures settings
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.utils.timezone import utc
+
+from django_twilio.request import TwilioRequest
+from mock import Mock, patch
+
+from django_twilio_sms.models import Account, Message
+
+
+CALLBACK_STATUSES = ('queued', 'sent', 'delivered', 'delivered')
+
+
+class QueryLog(deque):
+    """
+    A query log recording whether each query ran inside a transaction, so
+    the queries run in autocommit, each its own transaction, can be told
+    from the ones sharing a transaction.
+    """
+
+    def append(self, query):
+        query['atomic'] = connection.in_atomic_block
+        super(QueryLog, self).append(query)
+
+
+class FakeMessages(object):
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self.statuses = {}
+
+    def get(self, sid):
+        self.calls = self.calls + 1
+        time.sleep(self.latency)
+        status = self.statuses.get(sid, 'queued')
+        return Mock(
+            sid=sid,
+            date_sent=datetime.datetime(2016, 1, 1, tzinfo=utc),
+            account_sid='ACbenchmark',
+            messaging_service_sid=None,
+            body='benchmark',
+            num_media=0,
+            num_segments=1,
+            status=status,
+            error_code=None,
+            error_message=None,
+            direction='outbound-api',
+            price='-0.00750' if status == 'delivered' else None,
+            price_unit='USD',
+            api_version='2010-04-01',
+            from_='+19999999991',
+            to='+19999999992',
+        )
+
+
+def api_sync(sid, status, messages):
+    messages.statuses[sid] = status
+    message_obj, created = Message.get_or_create(sid)
+    if not created:
+        message_obj.sync_twilio_message()
+
+
+def request_sync(sid, status, messages):
+    messages.statuses[sid] = status
+    Message.get_or_create_from_request(
+        TwilioRequest({'MessageSid': sid, 'MessageStatus': status})
+    )
+
+
+def run(name, sync, message_count, latency):
+    messages = FakeMessages(latency)
+    Message.objects.all().delete()
+
+    with patch('django_twilio_sms.models.twilio_client') as client:
+        client.messages = messages
+        # the initial create happens in send_message for both strategies
+        for i in range(message_count):
+            api_sync('SM{}{}'.format(name, i), 'accepted', messages)
+        messages.calls = 0
+
+        connection.queries_log = QueryLog(
+            maxlen=connection.queries_log.maxlen
+        )
+        connection.force_debug_cursor = True
+        start = time.time()
+        for status in CALLBACK_STATUSES:
+            for i in range(message_count):
+                sync('SM{}{}'.format(name, i), status, messages)
+        elapsed = time.time() - start
+        connection.force_debug_cursor = False
+        queries = list(connection.queries_log)
+
+    callbacks = message_count * len(CALLBACK_STATUSES)
+    return {
+        'name': name,
+        'callbacks': callbacks,
+        'api_calls': messages.calls,
+        'api_calls_per_callback': float(messages.calls) / callbacks,
+        'ms_per_callback': elapsed * 1000 / callbacks,
+        'queries_per_callback': float(len(queries)) / callbacks,
+        'transactions_per_callback': float(len([
+            query for query in queries if not query['atomic']
+        ])) / callbacks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument(
+        '--latency', type=float, default=.05,
+        help='Simulated twilio API latency in seconds.'
+    )
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    Account.objects.create(
+        sid='ACbenchmark', friendly_name='benchmark',
+        account_type=Account.FULL, status=Account.ACTIVE
+    )
+
+    results = [
+        run('api', api_sync, args.messages, args.latency),
+        run('request', request_sync, args.messages, args.latency),
+    ]
+
+    print('{:<10}{:>12}{:>12}{:>16}{:>14}{:>18}{:>15}'.format(
+        'sync', 'callbacks', 'api calls', 'calls/callback', 'ms/callback',
+        'queries/callback', 'txns/callback'
+    ))
+    for result in results:
+        print('{name:<10}{callbacks:>12}{api_calls:>12}'
+              '{api_calls_per_callback:>16.2f}'
+              '{ms_per_callback:>14.2f}'
+              '{queries_per_callback:>18.2f}'
+              '{transactions_per_callback:>15.2f}'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""
+Measure the queries, wall time and allocations of the package's hot paths,
+the inbound and status callback webhooks, sending a message, syncing a
+message from twilio and resolving an action, with cold and warm caches.
+Twilio is replaced by a local fake client, so only the package's own
+overhead is measured. Results are printed as JSON, pass ``--compare`` a
+previous result to fail on a query count regression.
+
+Run from the project root::
+
+    $ python -m benchmarks.hot_paths --iterations 200 --output results.json
+    $ python -m benchmarks.hot_paths --compare results.json
+
+and against Postgres, with the connection read from the ``PG*``
+environment variables::
+
+    $ DATABASE_ENGINE=postgresql_psycopg2 DATABASE_NAME=twilio_sms \\
+        python -m benchmarks.hot_paths
+"""
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+
+from datetime import datetime
+
+import runtests  # noqa, configures settings
+
+import django
+
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.utils.timezone import utc
+
+from mock import patch
+
+from django_twilio_sms.cache import lookup_cache
+from django_twilio_sms.models import Action, Message, Response
+from django_twilio_sms.router import action_router
+from django_twilio_sms.utils import AbsoluteURI
+from django_twilio_sms.views import callback_view, inbound_view
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+ACCOUNT_SID = 'ACbenchmark'
+SITE_NUMBER = '+15550000000'
+
+sids = itertools.count()
+
+
+def next_sid():
+    return 'SM{:032d}'.format(next(sids))
+
+
+class FakeMessage(object):
+
+    def __init__(self, sid, body, to, from_, direction='outbound-api',
+                 status='queued', price=None):
+        self.sid = sid
+        self.date_sent = datetime(2016, 1, 1, tzinfo=utc)
+        self.account_sid = ACCOUNT_SID
+        self.messaging_service_sid = None
+        self.body = body
+        self.num_media = 0
+        self.num_segments = 1
+        self.status = status
+        self.error_code = None
+        self.error_message = None
+        self.direction = direction
+        self.price = price
+        self.price_unit = 'USD'
+        self.api_version = '2010-04-01'
+        self.from_ = from_
+        self.to = to
+
+
+class FakeAccount(object):
+
+    def __init__(self, sid):
+        self.sid = sid
+        self.owner_account_sid = sid
+        self.friendly_name = 'benchmark'
+        self.type = 'Full'
+        self.status = 'active'
+
+
+class FakeMessages(object):
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.messages = {}
+
+    def add(self, message):
+        self.messages[message.sid] = message
+        return message
+
+    def create(self, body, to, from_, status_callback=None, **kwargs):
+        time.sleep(self.latency)
+        return self.add(FakeMessage(next_sid(), body, to, from_))
+
+    def get(self, sid):
+        time.sleep(self.latency)
+        return self.messages[sid]
+
+
+class FakeAccounts(object):
+
+    def get(self, sid):
+        return FakeAccount(sid)
+
+
+class FakeTwilioClient(object):
+    """
+    A stand in for ``django_twilio.client.twilio_client`` keeping the
+    messages it creates in memory.
+    """
+
+    def __init__(self, latency=0):
+        self.messages = FakeMessages(latency)
+        self.accounts = FakeAccounts()
+
+
+def clear_caches():
+    lookup_cache.clear()
+    action_router.invalidate()
+    AbsoluteURI.clear_cache()
+
+
+def get_recipient(i):
+    return '+1555{:07d}'.format(i % 100 + 1)
+
+
+def send(client, i):
+    return Message.send_message('benchmark', get_recipient(i), SITE_NUMBER)[0]
+
+
+def inbound_scenario(client, factory, i):
+    sid = next_sid()
+    client.messages.add(FakeMessage(
+        sid, 'HELLO', SITE_NUMBER, get_recipient(i), direction='inbound',
+        status='received', price='-0.00750'
+    ))
+    request = factory.post('/inbound/', {
+        'MessageSid': sid, 'From': get_recipient(i), 'To': SITE_NUMBER,
+        'Body': 'HELLO', 'SmsStatus': 'received', 'AccountSid': ACCOUNT_SID,
+    })
+    return lambda: inbound_view(request)
+
+
+def callback_scenario(client, factory, i):
+    message = send(client, i)
+    request = factory.post('/callback/', {
+        'MessageSid': message.sid, 'MessageStatus': 'sent',
+        'AccountSid': ACCOUNT_SID,
+    })
+    return lambda: callback_view(request)
+
+
+def send_message_scenario(client, factory, i):
+    return lambda: send(client, i)
+
+
+def sync_twilio_message_scenario(client, factory, i):
+    message = Message.objects.get(pk=send(client, i).pk)
+    twilio_message = client.messages.get(message.sid)
+    twilio_message.status = 'delivered'
+    twilio_message.price = '-0.00750'
+    return lambda: message.sync_twilio_message(twilio_message)
+
+
+def get_action_scenario(client, factory, i):
+    return lambda: Action.get_action('HELLO')
+
+
+SCENARIOS = (
+    ('inbound_view', inbound_scenario),
+    ('callback_view', callback_scenario),
+    ('send_message', send_message_scenario),
+    ('sync_twilio_message', sync_twilio_message_scenario),
+    ('get_action', get_action_scenario),
+)
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        'mean': sum(values) / len(values),
+        'median': values[len(values) // 2],
+        'min': values[0],
+        'max': values[-1],
+    }
+
+
+def measure(client, scenario, cold, iterations, alloc_iterations):
+    factory = RequestFactory()
+    if not cold:
+        scenario(client, factory, 0)()
+
+    timings = []
+    queries = []
+    for i in range(iterations):
+        run = scenario(client, factory, i)
+        if cold:
+            clear_caches()
+        with CaptureQueriesContext(connection) as context:
+            start = time.time()
+            run()
+            timings.append((time.time() - start) * 1000)
+        queries.append(len(context.captured_queries))
+
+    result = {
+        'queries': summarize(queries),
+        'ms': summarize(timings),
+        'allocated_kb': None,
+        'retained_kb': None,
+    }
+
+    if tracemalloc and alloc_iterations:
+        allocated = []
+        retained = []
+        for i in range(alloc_iterations):
+            run = scenario(client, factory, i)
+            if cold:
+                clear_caches()
+            tracemalloc.start()
+            run()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            allocated.append(peak / 1024)
+            retained.append(current / 1024)
+        result['allocated_kb'] = summarize(allocated)
+        result['retained_kb'] = summarize(retained)
+
+    return result
+
+
+def setup_data():
+    settings.DJANGO_TWILIO_SMS_SITE_HOST = 'www.example.com'
+    settings.DJANGO_TWILIO_SMS_LOOKUP_CACHE = True
+    settings.DJANGO_TWILIO_SMS_RESPONSE_MESSAGE = True
+    settings.DJANGO_TWILIO_FORGERY_PROTECTION = False
+
+    action = Action.objects.create(name='HELLO')
+    Response.objects.create(action=action, body='Hi there!')
+
+
+def run(iterations, alloc_iterations, latency):
+    client = FakeTwilioClient(latency)
+    results = []
+    with patch('django_twilio_sms.models.twilio_client', client), \
+            patch('django_twilio.client.twilio_client', client):
+        for name, scenario in SCENARIOS:
+            for cache in ('cold', 'warm'):
+                result = measure(
+                    client, scenario, cache == 'cold', iterations,
+                    alloc_iterations
+                )
+                result.update({'name': name, 'cache': cache})
+                results.append(result)
+    return results
+
+
+def compare(results, baseline):
+    """
+    Return the scenarios running more queries than in ``baseline``.
+    """
+    previous = dict(
+        ((result['name'], result['cache']), result)
+        for result in baseline['results']
+    )
+    regressions = []
+    for result in results:
+        key = (result['name'], result['cache'])
+        if key not in previous:
+            continue
+        before = previous[key]['queries']['max']
+        after = result['queries']['max']
+        if after > before:
+            regressions.append('{} ({}): {} queries, was {}'.format(
+                result['name'], result['cache'], after, before
+            ))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument(
+        '--alloc-iterations', type=int, default=20,
+        help='Iterations traced for allocations, 0 to skip.'
+    )
+    parser.add_argument(
+        '--latency', type=float, default=0,
+        help='Simulated twilio API latency in seconds.'
+    )
+    parser.add_argument('--output', help='Write the results to a file.')
+    parser.add_argument(
+        '--compare', help='A previous result to check query counts against.'
+    )
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        setup_data()
+        results = run(args.iterations, args.alloc_iterations, args.latency)
+    finally:
+        connection.creation.destroy_test_db(
+            connection.settings_dict['NAME'], verbosity=0
+        )
+
+    output = json.dumps({
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'iterations': args.iterations,
+        'latency': args.latency,
+        'results': results,
+    }, indent=2, sort_keys=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f))
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
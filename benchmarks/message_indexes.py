@@ -0,0 +1,206 @@
+"""
+Generate a synthetic Message table and report the query plans and timings
+of the package's Message access paths without and with the Message indexes,
+those of ``Message.Meta.index_together``.
+
+Run from the project root::
+
+    $ python -m benchmarks.message_indexes --rows 2000000
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import random
+import time
+
+from datetime import datetime, timedelta
+
+import runtests  # noqa, configures settings
+
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.utils.timezone import utc
+
+from django_twilio.models import Caller
+
+from django_twilio_sms.models import (
+    Account,
+    ApiVersion,
+    Currency,
+    Message,
+    PhoneNumber
+)
+
+
+# the indexes under test, the only ones besides the foreign keys' indexes
+INDEXES = tuple(
+    tuple(Message._meta.get_field(name).column for name in field_names)
+    for field_names in Message._meta.index_together
+)
+
+START = datetime(2016, 1, 1, tzinfo=utc)
+DAYS = 730
+
+
+def get_index_names(columns):
+    table = Message._meta.db_table
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [
+        name for name, constraint in constraints.items()
+        if constraint['index'] and not constraint['primary_key'] and
+        not constraint['unique'] and tuple(constraint['columns']) == columns
+    ]
+
+
+def set_indexes(enabled):
+    """
+    Create, or drop, only the indexes under test. Unapplying the migrations
+    would make SQLite rebuild the table as it was before the later
+    migrations.
+    """
+    quote_name = connection.ops.quote_name
+    table = quote_name(Message._meta.db_table)
+    with connection.cursor() as cursor:
+        for columns in INDEXES:
+            names = get_index_names(columns)
+            if enabled and not names:
+                cursor.execute('CREATE INDEX {} ON {} ({})'.format(
+                    quote_name('benchmark_{}_idx'.format('_'.join(columns))),
+                    table,
+                    ', '.join(quote_name(column) for column in columns)
+                ))
+            elif not enabled:
+                for name in names:
+                    if connection.vendor == 'mysql':
+                        sql = 'DROP INDEX {} ON {}'.format(
+                            quote_name(name), table
+                        )
+                    else:
+                        sql = 'DROP INDEX {}'.format(quote_name(name))
+                    cursor.execute(sql)
+
+
+def generate(rows, phone_number_count, chunk_size=10000):
+    account = Account.objects.create(
+        sid='ACbenchmark', friendly_name='benchmark',
+        account_type=Account.FULL, status=Account.ACTIVE
+    )
+    currency = Currency.objects.create(code='USD')
+    api_version = ApiVersion.objects.create(date=START.date())
+
+    Caller.objects.bulk_create([
+        Caller(phone_number='+1555{:07d}'.format(i))
+        for i in range(phone_number_count)
+    ])
+    PhoneNumber.objects.bulk_create([
+        PhoneNumber(caller=caller) for caller in Caller.objects.all()
+    ])
+    phone_numbers = list(PhoneNumber.objects.values_list('pk', flat=True))
+
+    statuses = [choice[0] for choice in Message.STATUS_CHOICES]
+    directions = [choice[0] for choice in Message.DIRECTION_CHOICES]
+    for start in range(0, rows, chunk_size):
+        Message.objects.bulk_create([
+            Message(
+                sid='SM{:032d}'.format(i),
+                date_sent=START + timedelta(
+                    seconds=random.randint(0, DAYS * 86400)
+                ),
+                account=account,
+                from_phone_number_id=random.choice(phone_numbers),
+                to_phone_number_id=random.choice(phone_numbers),
+                body='benchmark',
+                num_media=0,
+                num_segments=1,
+                status=random.choice(statuses),
+                direction=random.choice(directions),
+                price='-0.00750',
+                currency=currency,
+                api_version=api_version,
+            ) for i in range(start, min(start + chunk_size, rows))
+        ])
+
+    return phone_numbers[0]
+
+
+def get_queries(phone_number):
+    month = START + timedelta(days=DAYS // 2)
+    return [
+        ('changelist', Message.objects.order_by('-date_sent')[:100]),
+        ('status', Message.objects.filter(
+            status=Message.DELIVERED
+        ).order_by('-date_sent')[:100]),
+        ('direction', Message.objects.filter(
+            direction=Message.INBOUND
+        ).order_by('-date_sent')[:100]),
+        ('date range', Message.objects.filter(
+            date_sent__gte=month, date_sent__lt=month + timedelta(days=30)
+        ).order_by('-date_sent')[:100]),
+        ('conversation', Message.objects.filter(
+            from_phone_number=phone_number
+        ).order_by('-date_sent')[:50]),
+    ]
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    if connection.vendor == 'sqlite':
+        sql = 'EXPLAIN QUERY PLAN ' + sql
+    else:
+        sql = 'EXPLAIN ' + sql
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [' '.join('{}'.format(column) for column in row)
+                for row in cursor.fetchall()]
+
+
+def measure(phone_number, repeat):
+    results = []
+    for name, queryset in get_queries(phone_number):
+        timings = []
+        for i in range(repeat):
+            start = time.time()
+            list(queryset.all())
+            timings.append(time.time() - start)
+        results.append((name, min(timings), explain(queryset)))
+    return results
+
+
+def report(label, results):
+    print('\n{}'.format(label))
+    for name, timing, plan in results:
+        print('  {:<14}{:>10.2f} ms'.format(name, timing * 1000))
+        for line in plan:
+            print('      {}'.format(line))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--phone-numbers', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    set_indexes(False)
+
+    start = time.time()
+    phone_number = generate(args.rows, args.phone_numbers)
+    print('Generated {} messages in {:.1f}s'.format(
+        args.rows, time.time() - start
+    ))
+
+    report('Before indexes', measure(phone_number, args.repeat))
+
+    start = time.time()
+    set_indexes(True)
+    print('\nBuilt indexes in {:.1f}s'.format(time.time() - start))
+
+    report('After indexes', measure(phone_number, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Measure the overhead Message.get_status_callback adds to every send, with
+the absolute uri resolved on each call against the cached uri.
+
+Run from the project root::
+
+    $ python -m benchmarks.status_callback --calls 100000
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import timeit
+
+import runtests  # noqa, configures settings
+
+from django.conf import settings
+
+from django_twilio_sms.models import Message
+from django_twilio_sms.utils import AbsoluteURI
+
+
+def uncached():
+    AbsoluteURI.clear_cache()
+    return Message.get_status_callback()
+
+
+def cached():
+    return Message.get_status_callback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    settings.DJANGO_TWILIO_SMS_SITE_HOST = 'www.example.com'
+
+    print('{:<10}{:>14}'.format('callback', 'us/send'))
+    for name, func in (('uncached', uncached), ('cached', cached)):
+        timing = min(timeit.repeat(func, number=args.calls,
+                                   repeat=args.repeat))
+        print('{:<10}{:>14.3f}'.format(name, timing * 1e6 / args.calls))
+
+
+if __name__ == '__main__':
+    main()
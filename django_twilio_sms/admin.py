@@ -1,5 +1,66 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Account, Message, Response
+from django.core.paginator import Paginator
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.utils.functional import cached_property
+
+from .export import export
+from .models import (
+    Account,
+    Conversation,
+    Message,
+    MessageDailyStat,
+    Response
+)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator that reads the row count of an unfiltered queryset from the
+    database statistics once the table holds more than
+    ``DJANGO_TWILIO_SMS_ADMIN_COUNT_LIMIT`` rows, and stops counting a
+    filtered queryset at that limit, so paging a large table does not run a
+    ``COUNT(*)`` over all of it.
+    """
+
+    @property
+    def limit(self):
+        return getattr(
+            settings, 'DJANGO_TWILIO_SMS_ADMIN_COUNT_LIMIT', 100000
+        )
+
+    def get_estimate(self):
+        query = self.object_list.query
+        connection = connections[self.object_list.db]
+        table = query.model._meta.db_table
+
+        if connection.vendor == 'postgresql':
+            sql = 'SELECT reltuples FROM pg_class WHERE relname = %s'
+        elif connection.vendor == 'mysql':
+            sql = (
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s'
+            )
+        else:
+            return None
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] is not None else None
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query') or self.limit is None:
+            return super(EstimatedCountPaginator, self).count
+
+        if not self.object_list.query.where:
+            estimate = self.get_estimate()
+            if estimate is not None and estimate > self.limit:
+                return estimate
+
+        return self.object_list.order_by()[:self.limit].count()
 
 
 class MessageAdmin(admin.ModelAdmin):
@@ -12,14 +73,50 @@ class MessageAdmin(admin.ModelAdmin):
     )
     list_display_links = list_display
     list_filter = ('status', 'direction', 'date_sent')
-    date_hierarchy = 'date_sent'
+    list_select_related = (
+        'to_phone_number__caller',
+        'from_phone_number__caller',
+    )
     ordering = ('-date_sent', )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('export_csv', 'export_jsonl')
+
+    CONTENT_TYPES = {
+        'csv': 'text/csv',
+        'jsonl': 'application/x-ndjson',
+    }
+
+    def get_actions(self, request):
+        actions = super(MessageAdmin, self).get_actions(request)
+        if not getattr(settings, 'DJANGO_TWILIO_SMS_ADMIN_EXPORT', False):
+            actions.pop('export_csv', None)
+            actions.pop('export_jsonl', None)
+        return actions
+
+    def export(self, queryset, format):
+        response = StreamingHttpResponse(
+            export(queryset, format), content_type=self.CONTENT_TYPES[format]
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="messages.{}"'.format(format)
+        )
+        return response
+
+    def export_csv(self, request, queryset):
+        return self.export(queryset, 'csv')
+    export_csv.short_description = 'Export selected messages as CSV'
+
+    def export_jsonl(self, request, queryset):
+        return self.export(queryset, 'jsonl')
+    export_jsonl.short_description = 'Export selected messages as JSON lines'
 
 
 class ResponseAdmin(admin.ModelAdmin):
     list_display = ('action', 'active', 'body', 'date_updated')
     list_display_links = list_display
     list_filter = ('action', 'active')
+    list_select_related = ('action', )
 
 
 class AccountAdmin(admin.ModelAdmin):
@@ -28,11 +125,55 @@ class AccountAdmin(admin.ModelAdmin):
         'owner_account_sid',
         'account_type',
         'status',
+        'date_synced',
         'date_updated'
     )
     list_display_links = list_display
+    list_select_related = ('owner_account_sid', )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class MessageDailyStatAdmin(admin.ModelAdmin):
+    list_display = (
+        'date',
+        'account',
+        'messaging_service_sid',
+        'direction',
+        'messages',
+        'segments',
+        'delivered',
+        'failed',
+        'price',
+        'currency'
+    )
+    list_display_links = list_display
+    list_filter = ('direction', 'date')
+    ordering = ('-date', )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = (
+        'phone_number_1',
+        'phone_number_2',
+        'message_count',
+        'unread_count',
+        'last_message_at'
+    )
+    list_display_links = list_display
+    list_select_related = (
+        'phone_number_1__caller',
+        'phone_number_2__caller',
+    )
+    ordering = ('-last_message_at', )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Message, MessageAdmin)
 admin.site.register(Response, ResponseAdmin)
 admin.site.register(Account, AccountAdmin)
+admin.site.register(MessageDailyStat, MessageDailyStatAdmin)
+admin.site.register(Conversation, ConversationAdmin)
@@ -5,3 +5,6 @@ from django.utils.translation import ugettext_lazy as _
 class DjangoTwilioSmsConfig(AppConfig):
     name = 'django_twilio_sms'
     verbose_name = _("Django Twilio SMS")
+
+    def ready(self):
+        import django_twilio_sms.receivers  # noqa
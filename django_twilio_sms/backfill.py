@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import logging
+
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+from django.db import connection
+
+from django_twilio.client import twilio_client
+
+from .models import BackfillWindow, MAX_PAGE_SIZE, Message, PhoneNumber
+from .retry import retry_policy
+
+
+logger = logging.getLogger(__name__)
+
+
+def iter_chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def is_importable(twilio_message):
+    try:
+        for phone_number in (twilio_message.from_, twilio_message.to):
+            PhoneNumber.get_e164('{}'.format(phone_number))
+    except ValueError as e:
+        logger.warning('Skipped message %s: %s', twilio_message.sid, e)
+        return False
+    return True
+
+
+def backfill_date(date, batch_size=1000):
+    """
+    Import the messages twilio sent on ``date``, paging through the message
+    log lazily and saving ``batch_size`` messages at a time, then mark the
+    day completed. Messages already stored are skipped, so a day that was
+    interrupted can be imported again, as are messages from or to an
+    address that is not a phone number, such as a short code or an
+    alphanumeric sender id, which are logged. Returns the number of
+    messages.
+    """
+    window, created = BackfillWindow.objects.get_or_create(date=date)
+    twilio_messages = retry_policy.iter(
+        twilio_client.messages, date_sent=date.isoformat(),
+        page_size=min(batch_size, MAX_PAGE_SIZE)
+    )
+
+    count = 0
+    for chunk in iter_chunks(twilio_messages, batch_size):
+        chunk = [
+            twilio_message for twilio_message in chunk
+            if is_importable(twilio_message)
+        ]
+        phone_numbers = PhoneNumber.get_or_create_many(set(
+            '{}'.format(phone_number) for twilio_message in chunk
+            for phone_number in (twilio_message.from_, twilio_message.to)
+        ))
+        Message.bulk_create_from_twilio(
+            OrderedDict(
+                (twilio_message.sid, twilio_message)
+                for twilio_message in chunk
+            ),
+            phone_numbers
+        )
+        count = count + len(chunk)
+
+    window.complete(count)
+    return count
+
+
+def backfill_threaded_date(args):
+    date, batch_size = args
+    try:
+        return (date, backfill_date(date, batch_size), None)
+    except Exception as e:
+        return (date, None, e)
+    finally:
+        connection.close()
+
+
+def backfill(start, end, batch_size=1000, workers=1):
+    """
+    Import the message log from ``start`` to ``end``, one day at a time,
+    skipping the days already imported. With more than one worker the days
+    are imported concurrently. Yields a ``(date, count, exception)`` tuple
+    per day as it finishes.
+    """
+    dates = BackfillWindow.get_pending_dates(start, end)
+
+    if workers > 1 and len(dates) > 1:
+        pool = ThreadPool(min(workers, len(dates)))
+        try:
+            for result in pool.imap_unordered(
+                    backfill_threaded_date,
+                    [(date, batch_size) for date in dates]):
+                yield result
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for date in dates:
+            try:
+                yield (date, backfill_date(date, batch_size), None)
+            except Exception as e:
+                yield (date, None, e)
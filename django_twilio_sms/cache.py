@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+
+from .utils import on_commit
+
+
+class LookupCache(object):
+    """
+    A bounded, process local cache of the reference rows looked up on every
+    sync (accounts, currencies, api versions, errors and messaging services),
+    keyed by model and natural key. It can be backed by one of django's
+    caches so the rows are shared between processes. Rows are cached once
+    the transaction they were looked up in commits, so a row created in a
+    transaction that is rolled back is never cached.
+    """
+
+    def __init__(self):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'DJANGO_TWILIO_SMS_LOOKUP_CACHE', False)
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'DJANGO_TWILIO_SMS_LOOKUP_CACHE_SIZE', 1000)
+
+    @property
+    def shared_cache(self):
+        alias = getattr(settings, 'DJANGO_TWILIO_SMS_LOOKUP_CACHE_ALIAS', None)
+        if alias:
+            return caches[alias]
+
+    def get_key(self, model, natural_key):
+        return 'django_twilio_sms:lookup:{}.{}:{}'.format(
+            model._meta.app_label, model._meta.model_name, natural_key
+        )
+
+    def get_or_create(self, model, natural_key, create):
+        """
+        Return the cached ``model`` row for ``natural_key``, calling
+        ``create`` to fetch it from the database on a miss.
+        """
+        if not self.enabled:
+            return create()
+
+        key = self.get_key(model, natural_key)
+        with self._lock:
+            if key in self._cache:
+                self.hits = self.hits + 1
+                self._cache[key] = self._cache.pop(key)
+                return self._cache[key]
+
+        shared_cache = self.shared_cache
+        obj = shared_cache.get(key) if shared_cache else None
+        with self._lock:
+            if obj is None:
+                self.misses = self.misses + 1
+            else:
+                self.hits = self.hits + 1
+
+        if obj is None:
+            obj = create()
+            self._set_on_commit(model, key, obj)
+        else:
+            self._set(key, obj)
+        return obj
+
+    def set(self, model, natural_key, obj):
+        if self.enabled:
+            self._set_on_commit(model, self.get_key(model, natural_key), obj)
+
+    def _set_on_commit(self, model, key, obj):
+        def set_obj():
+            self._set(key, obj)
+            shared_cache = self.shared_cache
+            if shared_cache:
+                shared_cache.set(key, obj)
+
+        on_commit(set_obj, using=router.db_for_write(model))
+
+    def _set(self, key, obj):
+        with self._lock:
+            self._cache.pop(key, None)
+            self._cache[key] = obj
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, model, natural_key):
+        if not self.enabled:
+            return
+
+        key = self.get_key(model, natural_key)
+        self._delete(key)
+        # again once committed, after any set queued in the same transaction
+        on_commit(lambda: self._delete(key), using=router.db_for_write(model))
+
+    def _delete(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+        shared_cache = self.shared_cache
+        if shared_cache:
+            shared_cache.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+lookup_cache = LookupCache()
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+
+from collections import Counter
+
+
+class ChoiceMap(object):
+    """
+    Map between the values and display names of a ``choices`` tuple with
+    dicts built once, rather than scanning the tuple on every lookup.
+    Display names that are not in ``choices`` map to ``default`` and are
+    counted in ``unknown``.
+    """
+
+    def __init__(self, choices, default=None):
+        self.default = default
+        self.values = dict((display, value) for value, display in choices)
+        self.displays = dict(choices)
+        self.unknown = Counter()
+        self._lock = threading.Lock()
+
+    def get_value(self, display):
+        try:
+            return self.values[display]
+        except KeyError:
+            with self._lock:
+                self.unknown[display] = self.unknown[display] + 1
+            return self.default
+
+    def get_display(self, value):
+        return self.displays.get(value)
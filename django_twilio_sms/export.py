@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import csv
+import json
+
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import six
+
+from .models import Message
+from .utils import get_day_start
+
+
+FIELDS = (
+    'sid',
+    'date_sent',
+    'account',
+    'messaging_service',
+    'from',
+    'to',
+    'body',
+    'num_media',
+    'num_segments',
+    'status',
+    'direction',
+    'price',
+    'currency',
+    'error_code',
+    'error_message',
+    'api_version',
+)
+
+
+def filter_messages(queryset=None, start=None, end=None, statuses=None,
+                    directions=None, accounts=None):
+    """
+    Filter ``queryset``, all messages when not given, to those sent on the
+    days from ``start`` to ``end`` with one of the ``statuses`` and
+    ``directions``, by their display names, of one of the ``accounts``.
+    """
+    if queryset is None:
+        queryset = Message.objects.all()
+    if start:
+        queryset = queryset.filter(date_sent__gte=get_day_start(start))
+    if end:
+        queryset = queryset.filter(
+            date_sent__lt=get_day_start(end + timedelta(days=1))
+        )
+    if statuses:
+        queryset = queryset.filter(status__in=[
+            Message.get_status_choice(status) for status in statuses
+        ])
+    if directions:
+        queryset = queryset.filter(direction__in=[
+            Message.get_direction_choice(direction)
+            for direction in directions
+        ])
+    if accounts:
+        queryset = queryset.filter(account__in=accounts)
+    return queryset
+
+
+def iter_messages(queryset, batch_size=1000):
+    """
+    Yield the messages of ``queryset`` ordered by ``(date_sent, sid)``,
+    reading ``batch_size`` at a time from where the previous batch ended,
+    so each batch is an index range scan and only one batch is held in
+    memory. Messages without a ``date_sent`` come last.
+    """
+    queryset = queryset.select_related(
+        'from_phone_number__caller', 'to_phone_number__caller', 'currency',
+        'error', 'api_version'
+    )
+
+    sent = queryset.filter(date_sent__isnull=False).order_by(
+        'date_sent', 'sid'
+    )
+    last = None
+    while True:
+        batch = sent
+        if last:
+            batch = batch.filter(
+                Q(date_sent__gt=last.date_sent) |
+                Q(date_sent=last.date_sent, sid__gt=last.sid)
+            )
+        batch = list(batch[:batch_size])
+        if not batch:
+            break
+
+        for message in batch:
+            yield message
+        last = batch[-1]
+
+    unsent = queryset.filter(date_sent__isnull=True).order_by('sid')
+    last = None
+    while True:
+        batch = unsent
+        if last:
+            batch = batch.filter(sid__gt=last.sid)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+
+        for message in batch:
+            yield message
+        last = batch[-1]
+
+
+def get_row(message):
+    error = message.error
+    return {
+        'sid': message.sid,
+        'date_sent': (
+            message.date_sent.isoformat() if message.date_sent else None
+        ),
+        'account': message.account_id,
+        'messaging_service': message.messaging_service_id,
+        'from': '{}'.format(message.from_phone_number),
+        'to': '{}'.format(message.to_phone_number),
+        'body': message.body,
+        'num_media': message.num_media,
+        'num_segments': message.num_segments,
+        'status': message.get_status_display(),
+        'direction': message.get_direction_display(),
+        'price': '{}'.format(message.price),
+        'currency': message.currency_id,
+        'error_code': error.code if error else None,
+        'error_message': error.message if error else None,
+        'api_version': '{}'.format(message.api_version),
+    }
+
+
+class Echo(object):
+    """
+    A file like object returning what is written to it, so ``csv.writer``
+    formats one row at a time.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(messages):
+    writer = csv.writer(Echo())
+
+    def encode(values):
+        if six.PY2:
+            return [
+                value.encode('utf-8')
+                if isinstance(value, six.text_type) else value
+                for value in values
+            ]
+        return values
+
+    yield writer.writerow(encode(FIELDS))
+    for message in messages:
+        row = get_row(message)
+        yield writer.writerow(encode([row[field] for field in FIELDS]))
+
+
+def iter_jsonl(messages):
+    for message in messages:
+        yield json.dumps(get_row(message), sort_keys=True) + '\n'
+
+
+FORMATS = {
+    'csv': iter_csv,
+    'jsonl': iter_jsonl,
+}
+
+
+def export(queryset=None, format='csv', batch_size=1000, **filters):
+    """
+    Return a generator of the lines of the messages of ``queryset``,
+    filtered by ``filter_messages``, in ``format``.
+    """
+    return FORMATS[format](iter_messages(
+        filter_messages(queryset, **filters), batch_size
+    ))
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import logging
+import math
+import socket
+import threading
+import time
+
+from collections import deque
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryLog(deque):
+    """
+    A connection query log counting every query appended to it, as the log
+    itself stops growing once it reaches its ``maxlen``.
+    """
+
+    count = 0
+
+    def append(self, query):
+        self.count = self.count + 1
+        super(QueryLog, self).append(query)
+
+
+class Event(object):
+    """
+    A measured operation. ``outcome`` is ``'ok'`` or ``'error'``, with the
+    name of the exception raised in ``exception``.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.duration = 0
+        self.retries = 0
+        self.queries = 0
+        self.outcome = 'ok'
+        self.exception = None
+
+
+class NullMeasurement(object):
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_MEASUREMENT = NullMeasurement()
+
+
+class Measurement(object):
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.event = Event(name)
+
+    def __enter__(self):
+        queries_log = connection.queries_log
+        if not isinstance(queries_log, QueryLog):
+            queries_log = connection.queries_log = QueryLog(
+                queries_log, maxlen=queries_log.maxlen
+            )
+        self.queries_start = queries_log.count
+        self.force_debug_cursor = connection.force_debug_cursor
+        connection.force_debug_cursor = True
+
+        self.instrumentation.get_stack().append(self.event)
+        self.start = time.time()
+        return self.event
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event = self.event
+        event.duration = time.time() - self.start
+        connection.force_debug_cursor = self.force_debug_cursor
+        event.queries = connection.queries_log.count - self.queries_start
+        if exc_type is not None:
+            event.outcome = 'error'
+            event.exception = exc_type.__name__
+
+        stack = self.instrumentation.get_stack()
+        stack.pop()
+        if stack:
+            stack[-1].retries = stack[-1].retries + event.retries
+
+        self.instrumentation.emit(event)
+        return False
+
+
+class Instrumentation(object):
+    """
+    Measure the twilio API calls and the sync and send operations of the
+    package and hand each ``Event`` to the collectors listed, by dotted
+    path, in ``DJANGO_TWILIO_SMS_INSTRUMENTATION``. A path to a class is
+    instantiated, any other object is used as is. Without collectors a
+    measurement is a shared no-op.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._collectors = None
+
+    def get_collectors(self):
+        collectors = self._collectors
+        if collectors is None:
+            with self._lock:
+                collectors = []
+                for path in getattr(
+                        settings, 'DJANGO_TWILIO_SMS_INSTRUMENTATION', ()):
+                    collector = import_string(path)
+                    if isinstance(collector, type):
+                        collector = collector()
+                    collectors.append(collector)
+                self._collectors = collectors
+        return collectors
+
+    def get_stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def measure(self, name):
+        """
+        Return a context manager measuring the operation ``name``.
+        """
+        if not self.get_collectors():
+            return NULL_MEASUREMENT
+        return Measurement(self, name)
+
+    def retry(self):
+        """
+        Count a retry against the innermost measured operation.
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack:
+            stack[-1].retries = stack[-1].retries + 1
+
+    def emit(self, event):
+        for collector in self.get_collectors():
+            try:
+                collector.handle(event)
+            except Exception:
+                logger.exception('Instrumentation collector failed')
+
+    def reset(self):
+        with self._lock:
+            self._collectors = None
+
+
+instrumentation = Instrumentation()
+
+
+def instrumented(name):
+    """
+    Decorate a function to measure its calls as the operation ``name``.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with instrumentation.measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Histogram(object):
+    """
+    Count values in buckets growing by ``GROWTH``, so percentiles are
+    within that precision whatever the number of values.
+    """
+
+    GROWTH = 1.05
+    MIN = 1e-6
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        if value > self.MIN:
+            index = int(math.log(value / self.MIN) / math.log(self.GROWTH))
+        else:
+            index = 0
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count = self.count + 1
+        self.total = self.total + value
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile):
+        if not self.count:
+            return 0
+        rank = percentile / 100.0 * self.count
+        seen = 0
+        for index in sorted(self.buckets):
+            seen = seen + self.buckets[index]
+            if seen >= rank:
+                return min(self.max, self.MIN * self.GROWTH ** (index + 1))
+        return self.max
+
+
+class Aggregator(object):
+    """
+    Aggregate events in memory, keeping the calls, errors, retries and
+    queries of each operation and a histogram of its durations.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def handle(self, event):
+        with self._lock:
+            metric = self._metrics.get(event.name)
+            if metric is None:
+                metric = self._metrics[event.name] = {
+                    'calls': 0, 'errors': 0, 'retries': 0, 'queries': 0,
+                    'durations': Histogram(),
+                }
+            metric['calls'] = metric['calls'] + 1
+            metric['retries'] = metric['retries'] + event.retries
+            metric['queries'] = metric['queries'] + event.queries
+            if event.outcome != 'ok':
+                metric['errors'] = metric['errors'] + 1
+            metric['durations'].add(event.duration)
+
+    def reset(self):
+        with self._lock:
+            self._metrics = {}
+
+    def stats(self):
+        """
+        Return the calls, errors, retries, queries and the 50th, 90th and
+        99th percentile and longest duration, in seconds, per operation.
+        """
+        with self._lock:
+            stats = {}
+            for name, metric in self._metrics.items():
+                durations = metric['durations']
+                stats[name] = {
+                    'calls': metric['calls'],
+                    'errors': metric['errors'],
+                    'retries': metric['retries'],
+                    'queries': metric['queries'],
+                    'p50': durations.percentile(50),
+                    'p90': durations.percentile(90),
+                    'p99': durations.percentile(99),
+                    'max': durations.max,
+                }
+            return stats
+
+
+aggregator = Aggregator()
+
+
+class StatsdExporter(object):
+    """
+    Send each event to statsd over UDP, to
+    ``DJANGO_TWILIO_SMS_STATSD_HOST`` and ``DJANGO_TWILIO_SMS_STATSD_PORT``
+    with the metric names prefixed by ``DJANGO_TWILIO_SMS_STATSD_PREFIX``.
+    """
+
+    def __init__(self, host=None, port=None, prefix=None):
+        self.address = (
+            host or getattr(
+                settings, 'DJANGO_TWILIO_SMS_STATSD_HOST', 'localhost'
+            ),
+            port or getattr(settings, 'DJANGO_TWILIO_SMS_STATSD_PORT', 8125)
+        )
+        self.prefix = prefix or getattr(
+            settings, 'DJANGO_TWILIO_SMS_STATSD_PREFIX', 'django_twilio_sms'
+        )
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def get_lines(self, event):
+        name = '{}.{}'.format(self.prefix, event.name)
+        lines = [
+            '{}.duration:{:.3f}|ms'.format(name, event.duration * 1000),
+            '{}.{}:1|c'.format(name, event.outcome),
+        ]
+        if event.queries:
+            lines.append('{}.queries:{}|c'.format(name, event.queries))
+        if event.retries:
+            lines.append('{}.retries:{}|c'.format(name, event.retries))
+        return lines
+
+    def handle(self, event):
+        try:
+            self.socket.sendto(
+                '\n'.join(self.get_lines(event)).encode('utf-8'),
+                self.address
+            )
+        except socket.error:
+            # metrics are best effort, never fail the operation
+            pass
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from django_twilio_sms.backfill import backfill
+
+
+def date(value):
+    parsed = parse_date(value)
+    if not parsed:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Import the twilio message log into Message"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'start', type=date,
+            help='First day to import, as YYYY-MM-DD.'
+        )
+        parser.add_argument(
+            'end', type=date, nargs='?',
+            help='Last day to import, as YYYY-MM-DD. Defaults to today.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of messages saved at a time.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of days imported concurrently.'
+        )
+
+    def handle(self, *args, **options):
+        start = options['start']
+        end = options['end'] or timezone.now().date()
+        if start > end:
+            raise CommandError('start must not be after end.')
+
+        total = 0
+        failed = 0
+        started = time.time()
+        for day, count, exception in backfill(
+                start, end, options['batch_size'], options['workers']):
+            if exception:
+                failed = failed + 1
+                self.stderr.write('FAILED: {} {}'.format(day, exception))
+            else:
+                total = total + count
+                self.stdout.write('IMPORTED: {} {}'.format(day, count))
+
+        self.stdout.write('TOTAL: {} FAILED DAYS: {} ({:.1f}/s)'.format(
+            total, failed, total / max(time.time() - started, .001)
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from django_twilio_sms.models import Conversation
+
+
+class Command(BaseCommand):
+    help = "Add the messages without a conversation to their conversations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of messages added at a time.'
+        )
+
+    def handle(self, *args, **options):
+        count = Conversation.build(options['batch_size'])
+        self.stdout.write('ADDED: {}'.format(count))
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from django_twilio_sms.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete expired idempotency keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--age', type=int, default=getattr(
+                settings, 'DJANGO_TWILIO_SMS_IDEMPOTENCY_KEY_AGE', 86400
+            ),
+            help='Seconds an idempotency key is kept.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of keys deleted at a time.'
+        )
+
+    def handle(self, *args, **options):
+        deleted = IdempotencyKey.compact(
+            options['age'], options['batch_size']
+        )
+        self.stdout.write('DELETED: {}'.format(deleted))
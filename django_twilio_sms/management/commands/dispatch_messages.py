@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from django_twilio_sms.queue import dispatch_batch
+
+
+class Command(BaseCommand):
+    help = "Send messages queued by DJANGO_TWILIO_SMS_SEND_QUEUE"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of messages claimed at a time.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of threads sending a batch.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling for messages instead of exiting once drained.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Seconds to wait between polls when the queue is empty.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.time()
+            sent, failed = dispatch_batch(
+                options['batch_size'], options['concurrency']
+            )
+
+            if sent or failed:
+                elapsed = time.time() - start
+                self.stdout.write('SENT: {} FAILED: {} ({:.1f}/s)'.format(
+                    sent, failed, (sent + failed) / max(elapsed, .001)
+                ))
+            elif options['loop']:
+                time.sleep(options['sleep'])
+            else:
+                break
@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import six
+from django.utils.dateparse import parse_date
+
+from django_twilio_sms.export import export, FORMATS
+from django_twilio_sms.models import Message
+
+
+def date(value):
+    parsed = parse_date(value)
+    if not parsed:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Stream the message history as CSV or JSON lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=sorted(FORMATS), default='csv',
+            help='Output format.'
+        )
+        parser.add_argument(
+            '--start', type=date,
+            help='First day to export, as YYYY-MM-DD.'
+        )
+        parser.add_argument(
+            '--end', type=date,
+            help='Last day to export, as YYYY-MM-DD.'
+        )
+        parser.add_argument(
+            '--status', action='append', dest='statuses',
+            choices=[display for value, display in Message.STATUS_CHOICES],
+            help='Only export messages with this status, may be repeated.'
+        )
+        parser.add_argument(
+            '--direction', action='append', dest='directions',
+            choices=[
+                display for value, display in Message.DIRECTION_CHOICES
+            ],
+            help='Only export messages in this direction, may be repeated.'
+        )
+        parser.add_argument(
+            '--account', action='append', dest='accounts',
+            help='Only export messages of this account sid, may be repeated.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of messages read at a time.'
+        )
+        parser.add_argument(
+            '--output', help='Write to a file instead of stdout.'
+        )
+
+    def handle(self, *args, **options):
+        if (options['start'] and options['end'] and
+                options['start'] > options['end']):
+            raise CommandError('start must not be after end.')
+
+        lines = export(
+            format=options['format'],
+            batch_size=options['batch_size'],
+            start=options['start'],
+            end=options['end'],
+            statuses=options['statuses'],
+            directions=options['directions'],
+            accounts=options['accounts'],
+        )
+
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for line in lines:
+                    if isinstance(line, six.text_type):
+                        line = line.encode('utf-8')
+                    output.write(line)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
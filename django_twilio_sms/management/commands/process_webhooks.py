@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from django_twilio_sms.models import WebhookEvent
+from django_twilio_sms.queue import process_batch
+
+
+class Command(BaseCommand):
+    help = "Process webhook requests queued by DJANGO_TWILIO_SMS_WEBHOOK_QUEUE"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of events claimed at a time.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of threads processing a batch.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling for events instead of exiting once drained.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Seconds to wait between polls when the queue is empty.'
+        )
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Print the queue lag and throughput and exit.'
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(
+                'pending: {pending}, processing: {processing}, '
+                'failed: {failed}, lag: {lag:.1f}s, '
+                'processed in the last {window}s: {processed}'.format(
+                    **WebhookEvent.get_stats()
+                )
+            )
+            return
+
+        while True:
+            start = time.time()
+            processed, failed = process_batch(
+                options['batch_size'], options['concurrency']
+            )
+
+            if processed or failed:
+                elapsed = time.time() - start
+                self.stdout.write(
+                    'PROCESSED: {} FAILED: {} ({:.1f}/s)'.format(
+                        processed, failed,
+                        (processed + failed) / max(elapsed, .001)
+                    )
+                )
+            elif options['loop']:
+                time.sleep(options['sleep'])
+            else:
+                break
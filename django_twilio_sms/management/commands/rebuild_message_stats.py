@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from django_twilio_sms.models import MessageDailyStat
+
+
+def date(value):
+    parsed = parse_date(value)
+    if not parsed:
+        raise ValueError(value)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily message statistics from the messages"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'start', type=date,
+            help='First day to rebuild, as YYYY-MM-DD.'
+        )
+        parser.add_argument(
+            'end', type=date, nargs='?',
+            help='Last day to rebuild, as YYYY-MM-DD. Defaults to today.'
+        )
+
+    def handle(self, *args, **options):
+        start = options['start']
+        end = options['end'] or timezone.localtime(timezone.now()).date()
+        if start > end:
+            raise CommandError('start must not be after end.')
+
+        total = 0
+        for day, count in MessageDailyStat.rebuild(start, end):
+            total = total + count
+            self.stdout.write('REBUILT: {} {}'.format(day, count))
+        self.stdout.write('TOTAL: {}'.format(total))
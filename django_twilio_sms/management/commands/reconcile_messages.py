@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from django_twilio_sms.reconcile import reconcile
+
+
+class Command(BaseCommand):
+    help = "Refresh messages whose status callback never arrived"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--age', type=int, default=3600,
+            help='Seconds a message stays pending before it is refreshed.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of messages refreshed and written at a time.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Number of concurrent twilio API calls.'
+        )
+        parser.add_argument(
+            '--rate', type=float, default=None,
+            help='Maximum twilio API calls per second.'
+        )
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Check every pending message, not only those created '
+                 'since the last run.'
+        )
+
+    def handle(self, *args, **options):
+        start = time.time()
+        run = reconcile(
+            options['age'], options['batch_size'], options['concurrency'],
+            options['rate'], options['full']
+        )
+        self.stdout.write(
+            'CHECKED: {} UPDATED: {} FAILED: {} ({:.1f}/s)'.format(
+                run.checked, run.updated, run.failed,
+                run.checked / max(time.time() - start, .001)
+            )
+        )
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from django_twilio_sms.models import Account
+
+
+class Command(BaseCommand):
+    help = "Sync account stubs and stale accounts from twilio"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ttl', type=int, default=getattr(
+                settings, 'DJANGO_TWILIO_SMS_ACCOUNT_TTL', 86400
+            ),
+            help='Seconds an account is kept before it is synced again.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of accounts read at a time.'
+        )
+        parser.add_argument(
+            '--preload', action='store_true',
+            help='First store every subaccount from a single listing.'
+        )
+
+    def handle(self, *args, **options):
+        if options['preload']:
+            created, updated = Account.preload()
+            self.stdout.write(
+                'CREATED: {} UPDATED: {}'.format(created, updated)
+            )
+
+        refreshed, failed = Account.refresh_stale(
+            options['ttl'], options['batch_size']
+        )
+        self.stdout.write(
+            'REFRESHED: {} FAILED: {}'.format(refreshed, failed)
+        )
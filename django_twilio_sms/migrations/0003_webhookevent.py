@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio_sms', '0002_auto_20160512_2117'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('view', models.PositiveSmallIntegerField(choices=[(0, 'callback'), (1, 'inbound')])),
+                ('payload', models.TextField()),
+                ('status', models.PositiveSmallIntegerField(choices=[(0, 'pending'), (1, 'processing'), (2, 'processed'), (3, 'failed')], default=0)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('claim', models.CharField(blank=True, db_index=True, max_length=32)),
+                ('date_claimed', models.DateTimeField(null=True)),
+                ('date_processed', models.DateTimeField(null=True)),
+                ('error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='webhookevent',
+            index_together=set([('status', 'date_created')]),
+        ),
+    ]
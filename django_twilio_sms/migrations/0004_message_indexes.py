@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio_sms', '0003_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='date_sent',
+            field=models.DateTimeField(db_index=True, null=True),
+        ),
+        migrations.AlterIndexTogether(
+            name='message',
+            index_together=set([('status', 'date_sent'), ('direction', 'date_sent'), ('from_phone_number', 'date_sent')]),
+        ),
+    ]
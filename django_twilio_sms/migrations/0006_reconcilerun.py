@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio_sms', '0005_backfillwindow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconcileRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('high_water_mark', models.DateTimeField()),
+                ('checked', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('date_completed', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='message',
+            index_together=set([('status', 'date_sent'), ('direction', 'date_sent'), ('from_phone_number', 'date_sent'), ('date_created', 'sid')]),
+        ),
+    ]
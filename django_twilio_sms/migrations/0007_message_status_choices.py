@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio_sms', '0006_reconcilerun'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'accepted'), (1, 'queued'), (2, 'sending'), (3, 'sent'), (4, 'receiving'), (5, 'received'), (6, 'delivered'), (7, 'undelivered'), (8, 'failed'), (9, 'unknown'), (10, 'scheduled'), (11, 'read'), (12, 'partially_delivered'), (13, 'canceled')], default=1),
+        ),
+    ]
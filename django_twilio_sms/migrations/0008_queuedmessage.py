@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio_sms', '0007_message_status_choices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('body', models.CharField(max_length=160)),
+                ('recipient', models.CharField(max_length=32)),
+                ('sender', models.CharField(max_length=34)),
+                ('messaging_service_sid', models.CharField(blank=True, max_length=34)),
+                ('campaign', models.CharField(blank=True, max_length=64)),
+                ('status', models.PositiveSmallIntegerField(choices=[(0, 'pending'), (1, 'sending'), (2, 'sent'), (3, 'failed')], default=0)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('claim', models.CharField(blank=True, db_index=True, max_length=32)),
+                ('date_claimed', models.DateTimeField(null=True)),
+                ('sid', models.CharField(blank=True, db_index=True, max_length=34)),
+                ('message', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='django_twilio_sms.Message')),
+                ('date_sent', models.DateTimeField(null=True)),
+                ('error', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='queuedmessage',
+            index_together=set([('status', 'date_created')]),
+        ),
+    ]
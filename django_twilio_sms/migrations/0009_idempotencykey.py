@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio_sms', '0008_queuedmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('message', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='django_twilio_sms.Message')),
+                ('queued_message', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='django_twilio_sms.QueuedMessage')),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='idempotencykey',
+            index_together=set([('date_created', 'id')]),
+        ),
+    ]
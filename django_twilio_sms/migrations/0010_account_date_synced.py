@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def set_date_synced(apps, schema_editor):
+    # every existing account was synced from twilio when it was saved
+    Account = apps.get_model('django_twilio_sms', 'Account')
+    Account.objects.update(date_synced=models.F('date_updated'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio_sms', '0009_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='date_synced',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_date_synced, migrations.RunPython.noop),
+    ]
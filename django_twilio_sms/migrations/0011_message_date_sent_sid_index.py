@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio_sms', '0010_account_date_synced'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='message',
+            index_together=set([('status', 'date_sent'), ('direction', 'date_sent'), ('from_phone_number', 'date_sent'), ('date_created', 'sid'), ('date_sent', 'sid')]),
+        ),
+    ]
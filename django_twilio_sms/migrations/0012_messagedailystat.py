@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio_sms', '0011_message_date_sent_sid_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MessageDailyStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('messaging_service_sid', models.CharField(blank=True, max_length=34)),
+                ('direction', models.PositiveSmallIntegerField(choices=[(0, 'inbound'), (1, 'outbound-api'), (2, 'outbound-call'), (3, 'outbound-reply')])),
+                ('messages', models.IntegerField(default=0)),
+                ('segments', models.IntegerField(default=0)),
+                ('delivered', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('price', models.DecimalField(decimal_places=5, default=0, max_digits=12)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='django_twilio_sms.Account')),
+                ('currency', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='django_twilio_sms.Currency')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='messagedailystat',
+            unique_together=set([('date', 'account', 'messaging_service_sid', 'direction', 'currency')]),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio_sms', '0012_messagedailystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('message_count', models.IntegerField(default=0)),
+                ('unread_count', models.IntegerField(default=0)),
+                ('last_read_at', models.DateTimeField(blank=True, null=True)),
+                ('phone_number_1', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='django_twilio_sms.PhoneNumber')),
+                ('phone_number_2', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='django_twilio_sms.PhoneNumber')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='conversation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='django_twilio_sms.Conversation'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='conversation',
+            unique_together=set([('phone_number_1', 'phone_number_2')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='conversation',
+            index_together=set([('phone_number_1', 'last_message_at'), ('phone_number_2', 'last_message_at')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='message',
+            index_together=set([('status', 'date_sent'), ('direction', 'date_sent'), ('from_phone_number', 'date_sent'), ('date_created', 'sid'), ('date_sent', 'sid'), ('conversation', 'date_sent', 'sid')]),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_twilio_sms', '0014_idempotencykey_sid'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='message',
+            name='date_sent',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -1,18 +1,42 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-import time
+import json
+import logging
+import uuid
+
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+from multiprocessing.pool import ThreadPool
 
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
 from django.utils.encoding import python_2_unicode_compatible
 
 from django_twilio.client import twilio_client
 from django_twilio.models import Caller
-from twilio.rest.exceptions import TwilioRestException
-
+from django_twilio.request import TwilioRequest
+from phonenumber_field.phonenumber import to_python
+
+from .cache import lookup_cache
+from .choices import ChoiceMap
+from .instrumentation import instrumented
+from .retry import (
+    RETRY_CREATE_STATUSES,
+    RETRY_NOT_FOUND_STATUSES,
+    retry_policy
+)
+from .router import action_router
 from .signals import response_message, unsubscribe_signal
-from .utils import AbsoluteURI
+from .utils import AbsoluteURI, get_day_start, get_local_date
+
+
+logger = logging.getLogger(__name__)
+
+# the largest page the twilio API returns
+MAX_PAGE_SIZE = 1000
 
 
 # Abstract Models
@@ -23,6 +47,34 @@ class CreatedUpdated(models.Model):
     class Meta:
         abstract = True
 
+    def get_field_values(self):
+        return dict(
+            (field.attname, getattr(self, field.attname))
+            for field in self._meta.concrete_fields
+        )
+
+    def get_changed_fields(self, original):
+        return [
+            field.attname for field in self._meta.concrete_fields
+            if field.to_python(getattr(self, field.attname)) !=
+            field.to_python(original[field.attname])
+        ]
+
+    def save_changed(self, original):
+        """
+        Save only the fields whose value differs from ``original``, a dict
+        returned by ``get_field_values``, and skip the save when none do.
+        Unsaved objects are saved in full. Returns the changed field names.
+        """
+        if self._state.adding:
+            self.save()
+            return [field.attname for field in self._meta.concrete_fields]
+
+        changed = self.get_changed_fields(original)
+        if changed:
+            self.save(update_fields=changed + ['date_updated'])
+        return changed
+
 
 @python_2_unicode_compatible
 class Sid(CreatedUpdated):
@@ -38,6 +90,8 @@ class Sid(CreatedUpdated):
 # Message Model ForeignKeys
 class Account(Sid):
 
+    LOOKUP_FIELD = 'sid'
+
     # account type choices
     TRIAL = 0
     FULL = 1
@@ -58,57 +112,187 @@ class Account(Sid):
         (CLOSED, 'closed'),
     )
 
+    ACCOUNT_TYPE_MAP = ChoiceMap(ACCOUNT_TYPE_CHOICES)
+    STATUS_MAP = ChoiceMap(STATUS_CHOICES)
+
     friendly_name = models.CharField(max_length=64)
     account_type = models.PositiveSmallIntegerField(
         choices=ACCOUNT_TYPE_CHOICES
     )
     status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES)
     owner_account_sid = models.ForeignKey('self', null=True)
+    date_synced = models.DateTimeField(null=True, blank=True)
 
     @classmethod
     def get_account_type_choice(cls, account_type_display):
-        for choice in cls.ACCOUNT_TYPE_CHOICES:
-            if account_type_display == choice[1]:
-                return choice[0]
+        return cls.ACCOUNT_TYPE_MAP.get_value(account_type_display)
 
     @classmethod
     def get_status_choice(cls, status_display):
-        for choice in cls.STATUS_CHOICES:
-            if status_display == choice[1]:
-                return choice[0]
+        return cls.STATUS_MAP.get_value(status_display)
+
+    @staticmethod
+    def use_stubs():
+        return getattr(settings, 'DJANGO_TWILIO_SMS_ACCOUNT_STUBS', False)
 
     @classmethod
     def get_or_create(cls, account_sid=None, account=None):
+        """
+        Return the account, syncing a new one from twilio. With
+        ``DJANGO_TWILIO_SMS_ACCOUNT_STUBS`` a new account that is not given
+        is stored as a stub instead, left for ``refresh_stale`` to sync.
+        """
         if not account_sid:
             account_sid = account.sid
 
-        try:
-            return cls.objects.get(sid=account_sid)
-        except cls.DoesNotExist:
-            account_obj = cls(sid=account_sid)
-            account_obj.sync_twilio_account(account)
-            return account_obj
+        def get_or_create():
+            try:
+                return cls.objects.get(sid=account_sid)
+            except cls.DoesNotExist:
+                if not account and cls.use_stubs():
+                    return cls.create_stub(account_sid)
+                account_obj = cls(sid=account_sid)
+                account_obj.sync_twilio_account(account)
+                return account_obj
+
+        return lookup_cache.get_or_create(cls, account_sid, get_or_create)
+
+    @classmethod
+    def create_stub(cls, account_sid):
+        """
+        Store an account known only by its sid, without calling twilio.
+        A stub has no ``date_synced``.
+        """
+        account, created = cls.objects.get_or_create(
+            sid=account_sid,
+            defaults={
+                'friendly_name': '',
+                'account_type': cls.FULL,
+                'status': cls.ACTIVE,
+            }
+        )
+        return account
+
+    @classmethod
+    @instrumented('account.preload')
+    def preload(cls, accounts=None):
+        """
+        Store the account and all of its subaccounts, listed from twilio a
+        page at a time when not given, in a single transaction. Owners that
+        are not listed are stored as stubs. Returns the number of accounts
+        created and updated.
+        """
+        if accounts is None:
+            accounts = retry_policy.iter(
+                twilio_client.accounts, page_size=MAX_PAGE_SIZE
+            )
+        accounts = OrderedDict((account.sid, account) for account in accounts)
+
+        owner_sids = set(
+            account.owner_account_sid for account in accounts.values()
+            if account.owner_account_sid
+        ) - set(accounts)
+
+        now = timezone.now()
+        with transaction.atomic():
+            existing = cls.objects.in_bulk(list(accounts) + list(owner_sids))
+
+            created = []
+            updated = 0
+            for sid in owner_sids - set(existing):
+                created.append(cls(
+                    sid=sid, friendly_name='', account_type=cls.FULL,
+                    status=cls.ACTIVE
+                ))
+
+            for sid, account in accounts.items():
+                account_obj = existing.get(sid) or cls(sid=sid)
+                original = account_obj.get_field_values()
+                account_obj.set_twilio_account_fields(account)
+                if account.owner_account_sid != sid:
+                    account_obj.owner_account_sid_id = (
+                        account.owner_account_sid
+                    )
+                account_obj.date_synced = now
+                if sid not in existing:
+                    created.append(account_obj)
+                elif account_obj.save_changed(original):
+                    updated = updated + 1
+
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(created)
+            except IntegrityError:
+                # lost a race with a webhook, fall back to one at a time
+                for account_obj in created:
+                    if account_obj.date_synced:
+                        account_obj.save()
+                    else:
+                        cls.create_stub(account_obj.sid)
+
+        return (len(created), updated)
+
+    @classmethod
+    def refresh_stale(cls, ttl=86400, batch_size=100):
+        """
+        Sync the stubs and the accounts last synced more than ``ttl``
+        seconds ago from twilio, ``batch_size`` at a time. Returns the
+        number of accounts refreshed and of those that failed.
+        """
+        queryset = cls.objects.filter(
+            models.Q(date_synced__isnull=True) |
+            models.Q(date_synced__lt=timezone.now() - timedelta(seconds=ttl))
+        ).order_by('sid')
+
+        refreshed = 0
+        failed = 0
+        last_sid = None
+        while True:
+            batch = queryset
+            if last_sid:
+                batch = batch.filter(sid__gt=last_sid)
+            batch = list(batch[:batch_size])
+            if not batch:
+                return (refreshed, failed)
+
+            for account in batch:
+                try:
+                    account.sync_twilio_account()
+                except Exception:
+                    logger.exception('Refreshing account %s failed', account)
+                    failed = failed + 1
+                else:
+                    refreshed = refreshed + 1
+            last_sid = batch[-1].sid
 
     @property
     def twilio_account(self):
-        return twilio_client.accounts.get(self.sid)
+        return retry_policy.call(twilio_client.accounts.get, self.sid)
 
+    def set_twilio_account_fields(self, account):
+        self.friendly_name = account.friendly_name
+        self.account_type = self.get_account_type_choice(account.type)
+        self.status = self.get_status_choice(account.status)
+
+    @instrumented('account.sync_twilio_account')
     def sync_twilio_account(self, account=None):
         if not account:
             account = self.twilio_account
 
-        self.friendly_name = account.friendly_name
-        self.account_type = self.get_account_type_choice(account.type)
-        self.status = self.get_status_choice(account.status)
+        self.set_twilio_account_fields(account)
         if account.sid != account.owner_account_sid:
             self.owner_account_sid = Account.get_or_create(
                 account.owner_account_sid
             )
+        self.date_synced = timezone.now()
         self.save()
 
 
 @python_2_unicode_compatible
 class ApiVersion(models.Model):
+
+    LOOKUP_FIELD = 'date'
+
     date = models.DateField(unique=True)
 
     def __str__(self):
@@ -116,14 +300,20 @@ class ApiVersion(models.Model):
 
     @classmethod
     def get_or_create(cls, message_date):
-        api_version, created = cls.objects.get_or_create(
-            date=message_date
-        )
-        return api_version
+        def get_or_create():
+            api_version, created = cls.objects.get_or_create(
+                date=message_date
+            )
+            return api_version
+
+        return lookup_cache.get_or_create(cls, message_date, get_or_create)
 
 
 @python_2_unicode_compatible
 class Currency(models.Model):
+
+    LOOKUP_FIELD = 'code'
+
     code = models.CharField(max_length=3, primary_key=True)
 
     def __str__(self):
@@ -131,12 +321,22 @@ class Currency(models.Model):
 
     @classmethod
     def get_or_create(cls, message_price_unit):
-        currency, created = cls.objects.get_or_create(code=message_price_unit)
-        return currency
+        def get_or_create():
+            currency, created = cls.objects.get_or_create(
+                code=message_price_unit
+            )
+            return currency
+
+        return lookup_cache.get_or_create(
+            cls, message_price_unit, get_or_create
+        )
 
 
 @python_2_unicode_compatible
 class Error(models.Model):
+
+    LOOKUP_FIELD = 'code'
+
     code = models.CharField(max_length=5, primary_key=True)
     message = models.CharField(max_length=255)
 
@@ -145,22 +345,33 @@ class Error(models.Model):
 
     @classmethod
     def get_or_create(cls, message_error_code, message_error_message):
-        error, created = cls.objects.get_or_create(
-            code=message_error_code,
-            defaults={'message': message_error_message}
+        def get_or_create():
+            error, created = cls.objects.get_or_create(
+                code=message_error_code,
+                defaults={'message': message_error_message}
+            )
+            return error
+
+        return lookup_cache.get_or_create(
+            cls, message_error_code, get_or_create
         )
-        return error
 
 
 class MessagingService(Sid):
-    pass
+
+    LOOKUP_FIELD = 'sid'
 
     @classmethod
     def get_or_create(cls, messaging_service_sid):
-        messaging_service, created = cls.objects.get_or_create(
-            sid=messaging_service_sid
+        def get_or_create():
+            messaging_service, created = cls.objects.get_or_create(
+                sid=messaging_service_sid
+            )
+            return messaging_service
+
+        return lookup_cache.get_or_create(
+            cls, messaging_service_sid, get_or_create
         )
-        return messaging_service
 
 
 @python_2_unicode_compatible
@@ -185,17 +396,274 @@ class PhoneNumber(CreatedUpdated):
 
         return phone_number_obj
 
+    @staticmethod
+    def get_e164(phone_number):
+        """
+        Return ``phone_number`` in E.164 format, raising ``ValueError`` if
+        it cannot be parsed.
+        """
+        parsed = to_python(phone_number)
+        if not (getattr(parsed, 'country_code', None) and
+                getattr(parsed, 'national_number', None)):
+            raise ValueError(
+                "'{}' is not a valid phone number".format(phone_number)
+            )
+        return parsed.as_e164
+
+    @classmethod
+    def get_or_create_many(cls, phone_numbers, unsubscribed=False):
+        """
+        Resolve an iterable of phone numbers with set based queries instead
+        of a ``get_or_create`` per number. Returns a dict mapping each of the
+        given phone numbers to its ``PhoneNumber``, raising ``ValueError``
+        if one of them cannot be parsed.
+        """
+        resolved = {}
+        e164s = {}
+        for phone_number in phone_numbers:
+            if isinstance(phone_number, cls):
+                resolved[phone_number] = phone_number
+            elif phone_number not in e164s:
+                e164s[phone_number] = cls.get_e164(phone_number)
+
+        if not e164s:
+            return resolved
+
+        def get_phone_numbers():
+            return dict(
+                (phone_number.caller.phone_number.as_e164, phone_number)
+                for phone_number in cls.objects.filter(
+                    caller__phone_number__in=set(e164s.values())
+                ).select_related('caller')
+            )
+
+        def create_phone_numbers(missing):
+            callers = dict(
+                (caller.phone_number.as_e164, caller) for caller in
+                Caller.objects.filter(phone_number__in=missing)
+            )
+            if len(callers) < len(missing):
+                Caller.objects.bulk_create([
+                    Caller(phone_number=e164)
+                    for e164 in missing if e164 not in callers
+                ])
+                callers = Caller.objects.filter(phone_number__in=missing)
+            else:
+                callers = callers.values()
+
+            cls.objects.bulk_create([
+                cls(caller=caller, unsubscribed=unsubscribed)
+                for caller in callers
+            ])
+
+        phone_number_objs = get_phone_numbers()
+        missing = set(e164s.values()) - set(phone_number_objs)
+        if missing:
+            try:
+                with transaction.atomic():
+                    create_phone_numbers(missing)
+            except IntegrityError:
+                # another process created some of them first
+                for e164 in missing:
+                    cls.get_or_create(e164, unsubscribed)
+            phone_number_objs = get_phone_numbers()
+
+        for phone_number, e164 in e164s.items():
+            resolved[phone_number] = phone_number_objs[e164]
+        return resolved
+
     @property
     def as_e164(self):
         return self.caller.phone_number.as_e164
 
     def subscribe(self):
-        self.unsubscribed = False
-        self.save()
+        if self.unsubscribed:
+            self.unsubscribed = False
+            self.save(update_fields=['unsubscribed', 'date_updated'])
 
     def unsubscribe(self):
-        self.unsubscribed = True
-        self.save()
+        if not self.unsubscribed:
+            self.unsubscribed = True
+            self.save(update_fields=['unsubscribed', 'date_updated'])
+
+
+@python_2_unicode_compatible
+class Conversation(CreatedUpdated):
+    """
+    The messages exchanged between two phone numbers, whichever sent them.
+    The pair is stored with the lower primary key first. The number of
+    messages, of inbound messages since the conversation was last read and
+    the time of the latest message are kept up to date as messages are
+    synced, see ``DJANGO_TWILIO_SMS_CONVERSATIONS``.
+    """
+
+    phone_number_1 = models.ForeignKey(PhoneNumber, related_name='+')
+    phone_number_2 = models.ForeignKey(PhoneNumber, related_name='+')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    message_count = models.IntegerField(default=0)
+    unread_count = models.IntegerField(default=0)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = [('phone_number_1', 'phone_number_2')]
+        index_together = [
+            ('phone_number_1', 'last_message_at'),
+            ('phone_number_2', 'last_message_at'),
+        ]
+
+    def __str__(self):
+        return '{} {}'.format(self.phone_number_1_id, self.phone_number_2_id)
+
+    @staticmethod
+    def enabled():
+        return getattr(settings, 'DJANGO_TWILIO_SMS_CONVERSATIONS', False)
+
+    @classmethod
+    def get_or_create(cls, phone_number, other_phone_number):
+        phone_number_1, phone_number_2 = sorted(
+            [phone_number, other_phone_number], key=lambda obj: obj.pk
+        )
+        conversation, created = cls.objects.get_or_create(
+            phone_number_1=phone_number_1, phone_number_2=phone_number_2
+        )
+        return conversation
+
+    @classmethod
+    def for_phone_number(cls, phone_number):
+        """
+        Return the conversations of ``phone_number`` with messages, the most
+        recent first.
+        """
+        return cls.objects.filter(
+            models.Q(phone_number_1=phone_number) |
+            models.Q(phone_number_2=phone_number),
+            last_message_at__isnull=False
+        ).order_by('-last_message_at', '-id')
+
+    @classmethod
+    def add_messages(cls, messages):
+        """
+        Count ``messages``, newly added to their conversations, with a
+        single ``UPDATE`` per conversation.
+        """
+        conversations = OrderedDict()
+        for message in messages:
+            if not message.conversation_id:
+                continue
+            counts = conversations.setdefault(message.conversation_id, {
+                'messages': 0, 'inbound': 0, 'last_message_at': None,
+            })
+            counts['messages'] = counts['messages'] + 1
+            if message.direction == Message.INBOUND:
+                counts['inbound'] = counts['inbound'] + 1
+            message_at = message.date_sent or message.date_created
+            if (counts['last_message_at'] is None or
+                    message_at > counts['last_message_at']):
+                counts['last_message_at'] = message_at
+
+        for conversation_id, counts in conversations.items():
+            last_message_at = counts['last_message_at']
+            cls.objects.filter(pk=conversation_id).update(
+                message_count=models.F('message_count') + counts['messages'],
+                unread_count=models.F('unread_count') + counts['inbound'],
+                # only ever moved forward by a concurrent or older message
+                last_message_at=models.Case(
+                    models.When(
+                        models.Q(last_message_at__isnull=True) |
+                        models.Q(last_message_at__lt=last_message_at),
+                        then=models.Value(last_message_at)
+                    ),
+                    default=models.F('last_message_at'),
+                    output_field=models.DateTimeField()
+                ),
+                date_updated=timezone.now()
+            )
+
+    @classmethod
+    def build(cls, batch_size=1000):
+        """
+        Add the messages synced before conversations were enabled to their
+        conversations, ``batch_size`` at a time. Returns the number of
+        messages added.
+        """
+        conversations = {}
+        count = 0
+        last_sid = None
+        while True:
+            queryset = Message.objects.filter(
+                conversation__isnull=True
+            ).order_by('sid')
+            if last_sid:
+                queryset = queryset.filter(sid__gt=last_sid)
+            batch = list(queryset.select_related(
+                'from_phone_number', 'to_phone_number'
+            )[:batch_size])
+            if not batch:
+                return count
+
+            with transaction.atomic():
+                sids = OrderedDict()
+                for message in batch:
+                    key = tuple(sorted([
+                        message.from_phone_number_id,
+                        message.to_phone_number_id
+                    ]))
+                    if key not in conversations:
+                        conversations[key] = cls.get_or_create(
+                            message.from_phone_number,
+                            message.to_phone_number
+                        ).pk
+                    message.conversation_id = conversations[key]
+                    sids.setdefault(message.conversation_id, []).append(
+                        message.sid
+                    )
+
+                for conversation_id, conversation_sids in sids.items():
+                    Message.objects.filter(
+                        sid__in=conversation_sids, conversation__isnull=True
+                    ).update(conversation=conversation_id)
+                cls.add_messages(batch)
+
+            count = count + len(batch)
+            last_sid = batch[-1].sid
+
+    def get_messages(self, before=None, limit=50):
+        """
+        Return up to ``limit`` messages of the conversation, the newest
+        first, starting after ``before``, the last message of the previous
+        page. Messages without a ``date_sent`` yet come first. Each page is
+        an index range scan however far back it starts.
+        """
+        queryset = self.message_set.select_related(
+            'from_phone_number__caller', 'to_phone_number__caller'
+        )
+
+        messages = []
+        if before is None or before.date_sent is None:
+            unsent = queryset.filter(date_sent__isnull=True).order_by('-sid')
+            if before is not None:
+                unsent = unsent.filter(sid__lt=before.sid)
+            messages = list(unsent[:limit])
+            before = None
+
+        if len(messages) < limit:
+            sent = queryset.filter(date_sent__isnull=False).order_by(
+                '-date_sent', '-sid'
+            )
+            if before is not None:
+                sent = sent.filter(
+                    models.Q(date_sent__lt=before.date_sent) |
+                    models.Q(date_sent=before.date_sent, sid__lt=before.sid)
+                )
+            messages = messages + list(sent[:limit - len(messages)])
+        return messages
+
+    def mark_read(self):
+        self.unread_count = 0
+        self.last_read_at = timezone.now()
+        self.save(update_fields=[
+            'unread_count', 'last_read_at', 'date_updated'
+        ])
 
 
 class Message(Sid):
@@ -211,6 +679,10 @@ class Message(Sid):
     UNDELIVERED = 7
     FAILED = 8
     UNKNOWN = 9
+    SCHEDULED = 10
+    READ = 11
+    PARTIALLY_DELIVERED = 12
+    CANCELED = 13
 
     STATUS_CHOICES = (
         (ACCEPTED, 'accepted'),
@@ -222,8 +694,15 @@ class Message(Sid):
         (DELIVERED, 'delivered'),
         (UNDELIVERED, 'undelivered'),
         (FAILED, 'failed'),
+        (UNKNOWN, 'unknown'),
+        (SCHEDULED, 'scheduled'),
+        (READ, 'read'),
+        (PARTIALLY_DELIVERED, 'partially_delivered'),
+        (CANCELED, 'canceled'),
     )
 
+    STATUS_MAP = ChoiceMap(STATUS_CHOICES, default=UNKNOWN)
+
     # direction choices
     INBOUND = 0
     OUTBOUND_API = 1
@@ -237,12 +716,45 @@ class Message(Sid):
         (OUTBOUND_REPLY, 'outbound-reply'),
     )
 
+    DIRECTION_MAP = ChoiceMap(DIRECTION_CHOICES)
+
     UNSUBSCRIBE_MESSAGES = [
         'STOP', 'STOPALL', 'UNSUBSCRIBE', 'CANCEL', 'END', 'QUIT'
     ]
 
     SUBSCRIBE_MESSAGES = ['START', 'YES']
 
+    # the currency of a message received without syncing its price
+    DEFAULT_PRICE_UNIT = 'USD'
+
+    # statuses after which twilio has settled the price of a message
+    PRICED_STATUSES = (
+        RECEIVED, DELIVERED, UNDELIVERED, FAILED, READ, PARTIALLY_DELIVERED
+    )
+
+    # statuses twilio will move on from with a status callback
+    PENDING_STATUSES = (ACCEPTED, QUEUED, SENDING, SENT, RECEIVING)
+
+    # the order statuses follow one another in, a status is never replaced
+    # by one of the same or a lower rank
+    STATUS_RANKS = {
+        UNKNOWN: 0,
+        SCHEDULED: 1,
+        ACCEPTED: 2,
+        QUEUED: 3,
+        SENDING: 4,
+        RECEIVING: 4,
+        SENT: 5,
+        RECEIVED: 6,
+        DELIVERED: 6,
+        UNDELIVERED: 6,
+        FAILED: 6,
+        PARTIALLY_DELIVERED: 6,
+        CANCELED: 6,
+        READ: 7,
+    }
+
+    # indexed by the leading column of the (date_sent, sid) index
     date_sent = models.DateTimeField(null=True)
     account = models.ForeignKey(Account)
     messaging_service = models.ForeignKey(MessagingService, null=True)
@@ -259,20 +771,38 @@ class Message(Sid):
     price = models.DecimalField(max_digits=6, decimal_places=5)
     currency = models.ForeignKey(Currency)
     api_version = models.ForeignKey(ApiVersion)
+    conversation = models.ForeignKey(
+        Conversation, null=True, blank=True, on_delete=models.SET_NULL
+    )
+
+    class Meta:
+        index_together = [
+            ('status', 'date_sent'),
+            ('direction', 'date_sent'),
+            ('from_phone_number', 'date_sent'),
+            ('date_created', 'sid'),
+            ('date_sent', 'sid'),
+            ('conversation', 'date_sent', 'sid'),
+        ]
 
     @classmethod
     def get_direction_choice(cls, direction_display):
-        for choice in cls.DIRECTION_CHOICES:
-            if direction_display == choice[1]:
-                return choice[0]
+        return cls.DIRECTION_MAP.get_value(direction_display)
 
     @classmethod
     def get_status_choice(cls, status_display):
-        for choice in cls.STATUS_CHOICES:
-            if status_display == choice[1]:
-                return choice[0]
+        return cls.STATUS_MAP.get_value(status_display)
 
     @classmethod
+    def get_lower_statuses(cls, status):
+        rank = cls.STATUS_RANKS[status]
+        return [
+            lower for lower, lower_rank in cls.STATUS_RANKS.items()
+            if lower_rank < rank
+        ]
+
+    @classmethod
+    @instrumented('message.get_or_create')
     def get_or_create(cls, message_sid=None, message=None):
         if not message_sid:
             message_sid = message.sid
@@ -285,39 +815,327 @@ class Message(Sid):
             return (message_obj, True)
 
     @classmethod
-    def send_message(cls, body, to, from_=settings.TWILIO_DEFAULT_CALLERID):
-        to_phone_number = PhoneNumber.get_or_create(to)
-        from_phone_number = PhoneNumber.get_or_create(from_)
+    def is_inbound_request(cls, twilio_request):
+        """
+        Return whether ``twilio_request`` is the webhook of an inbound
+        message, which carries every field stored but the price.
+        """
+        status = (getattr(twilio_request, 'messagestatus', None) or
+                  getattr(twilio_request, 'smsstatus', None))
+        return bool(
+            status and
+            cls.get_status_choice(status) in (cls.RECEIVING, cls.RECEIVED) and
+            getattr(twilio_request, 'accountsid', None) and
+            getattr(twilio_request, 'apiversion', None) and
+            getattr(twilio_request, 'from_', None) and
+            getattr(twilio_request, 'to', None)
+        )
 
-        twilio_message = twilio_client.messages.create(
+    @classmethod
+    @instrumented('message.get_or_create_from_request')
+    def get_or_create_from_request(cls, twilio_request):
+        try:
+            message_obj = cls.objects.get(sid=twilio_request.messagesid)
+        except cls.DoesNotExist:
+            message_obj = cls(sid=twilio_request.messagesid)
+            if cls.is_inbound_request(twilio_request):
+                message_obj.sync_twilio_request(twilio_request)
+            else:
+                # status callbacks carry neither the direction nor the body
+                message_obj.sync_twilio_message()
+            return (message_obj, True)
+
+        message_obj.sync_twilio_request(twilio_request)
+        return (message_obj, False)
+
+    @classmethod
+    def create_twilio_message(cls, body, to,
+                              from_=settings.TWILIO_DEFAULT_CALLERID,
+                              messaging_service_sid=None):
+        """
+        Create the message with twilio. A message sent through a messaging
+        service is sent from whichever number of the service twilio picks,
+        ``from_`` is ignored.
+        """
+        kwargs = {}
+        if messaging_service_sid:
+            kwargs['messaging_service_sid'] = messaging_service_sid
+            to_phone_number = PhoneNumber.get_or_create_many([to])[to]
+        else:
+            phone_numbers = PhoneNumber.get_or_create_many([to, from_])
+            to_phone_number = phone_numbers[to]
+            kwargs['from_'] = phone_numbers[from_].as_e164
+
+        return retry_policy.call(
+            twilio_client.messages.create,
             body=body,
             to=to_phone_number.as_e164,
-            from_=from_phone_number.as_e164,
-            status_callback=cls.get_status_callback()
+            status_callback=cls.get_status_callback(
+                cls.get_status_callback_host(messaging_service_sid)
+            ),
+            retry_statuses=RETRY_CREATE_STATUSES,
+            **kwargs
         )
 
-        return cls.get_or_create(message=twilio_message)
+    @classmethod
+    @instrumented('message.send_message')
+    def send_message(cls, body, to, from_=settings.TWILIO_DEFAULT_CALLERID,
+                     messaging_service_sid=None, idempotency_key=None):
+        """
+        Send a message and return a ``(Message, created)`` tuple, or when
+        ``DJANGO_TWILIO_SMS_SEND_QUEUE`` is set, queue it for the
+        ``dispatch_messages`` command and return ``(QueuedMessage, True)``.
+        A repeated call with the same ``idempotency_key`` returns the message
+        sent by the first call, and ``False``, without sending it again.
+        """
+        if idempotency_key:
+            reserved, existing = IdempotencyKey.reserve_many(
+                [idempotency_key]
+            )
+            if existing:
+                return (existing[idempotency_key].get_sent(), False)
+
+        try:
+            if getattr(settings, 'DJANGO_TWILIO_SMS_SEND_QUEUE', False):
+                sent = (QueuedMessage.enqueue(
+                    body, to, from_, messaging_service_sid
+                ), True)
+            else:
+                twilio_message = cls.create_twilio_message(
+                    body, to, from_, messaging_service_sid
+                )
+        except Exception:
+            # nothing was sent, the key can be used again
+            if idempotency_key:
+                IdempotencyKey.release_many([idempotency_key])
+            raise
+
+        if not getattr(settings, 'DJANGO_TWILIO_SMS_SEND_QUEUE', False):
+            if idempotency_key:
+                # kept even when storing the message fails, so a repeated
+                # call syncs the sent message rather than sending it again
+                IdempotencyKey.record_sids(
+                    {idempotency_key: twilio_message.sid}
+                )
+            sent = cls.get_or_create(message=twilio_message)
+
+        if idempotency_key:
+            IdempotencyKey.record_many({idempotency_key: sent[0]})
+        return sent
+
+    @classmethod
+    @instrumented('message.send_bulk')
+    def send_bulk(cls, body, recipients,
+                  from_=settings.TWILIO_DEFAULT_CALLERID,
+                  idempotency_key=None):
+        """
+        Send ``body`` to every number in ``recipients``, dispatching the
+        twilio API calls over a bounded pool of threads sharing the twilio
+        client. Returns a tuple of dicts keyed by recipient, the sent
+        ``Message`` objects and the exceptions of the sends that failed,
+        including a ``ValueError`` for each recipient that is not a valid
+        phone number. A repeated call with the same ``idempotency_key``
+        only sends to the recipients the first call did not send to.
+        """
+        concurrency = getattr(
+            settings, 'DJANGO_TWILIO_SMS_BULK_CONCURRENCY', 10
+        )
+        batch_size = getattr(
+            settings, 'DJANGO_TWILIO_SMS_BULK_BATCH_SIZE', 500
+        )
+
+        sent = OrderedDict()
+        failed = OrderedDict()
+        for to in OrderedDict.fromkeys(recipients):
+            if not isinstance(to, PhoneNumber):
+                try:
+                    PhoneNumber.get_e164(to)
+                except ValueError as e:
+                    failed[to] = e
+        recipients = [
+            to for to in OrderedDict.fromkeys(recipients) if to not in failed
+        ]
+        phone_numbers = PhoneNumber.get_or_create_many(recipients + [from_])
+        from_phone_number = phone_numbers[from_]
+        status_callback = cls.get_status_callback()
+
+        def create(to):
+            try:
+                to_phone_number = phone_numbers[to]
+                twilio_message = retry_policy.call(
+                    twilio_client.messages.create,
+                    body=body,
+                    to=to_phone_number.as_e164,
+                    from_=from_phone_number.as_e164,
+                    status_callback=status_callback,
+                    retry_statuses=RETRY_CREATE_STATUSES
+                )
+            except Exception as e:
+                return (to, None, e)
+            return (to, twilio_message, None)
+
+        pool = ThreadPool(concurrency)
+        try:
+            for start in range(0, len(recipients), batch_size):
+                batch = recipients[start:start + batch_size]
+                keys = {}
+                if idempotency_key:
+                    keys = OrderedDict(
+                        (to, '{}:{}'.format(idempotency_key, to))
+                        for to in batch
+                    )
+                    reserved, existing = IdempotencyKey.reserve_many(
+                        list(keys.values())
+                    )
+                    reserved = set(reserved)
+                    for to in batch:
+                        if keys[to] in existing:
+                            try:
+                                sent[to] = existing[keys[to]].get_sent()
+                            except IdempotencyKey.InProgress as e:
+                                failed[to] = e
+                    batch = [to for to in batch if keys[to] in reserved]
+
+                twilio_messages = OrderedDict()
+                for to, twilio_message, exception in pool.imap(
+                        create, batch):
+                    if exception:
+                        failed[to] = exception
+                    else:
+                        twilio_messages[to] = twilio_message
+
+                if keys:
+                    IdempotencyKey.record_sids(dict(
+                        (keys[to], twilio_message.sid)
+                        for to, twilio_message in twilio_messages.items()
+                    ))
+                    IdempotencyKey.release_many(
+                        keys[to] for to in batch if to not in twilio_messages
+                    )
+
+                messages = cls.bulk_create_from_twilio(
+                    twilio_messages, dict(
+                        (phone_number.as_e164, phone_number)
+                        for phone_number in phone_numbers.values()
+                    )
+                )
+                sent.update(messages)
+
+                if keys:
+                    IdempotencyKey.record_many(dict(
+                        (keys[to], message) for to, message in messages.items()
+                    ))
+        finally:
+            pool.close()
+            pool.join()
+
+        return (sent, failed)
+
+    @classmethod
+    def bulk_create_from_twilio(cls, twilio_messages, phone_numbers):
+        """
+        Persist a dict of twilio messages, keyed by recipient, with a single
+        ``bulk_create``. ``phone_numbers`` maps the e164 numbers of the
+        messages to their ``PhoneNumber`` objects.
+        """
+        references = {}
+
+        def reference(model, *args):
+            key = (model, ) + args
+            if key not in references:
+                references[key] = model.get_or_create(*args)
+            return references[key]
+
+        existing = cls.objects.in_bulk([
+            twilio_message.sid for twilio_message in twilio_messages.values()
+        ])
+
+        messages = OrderedDict()
+        for to, twilio_message in twilio_messages.items():
+            if twilio_message.sid in existing:
+                # a status callback stored the message before we could
+                messages[to] = existing[twilio_message.sid]
+                continue
+
+            message = cls(
+                sid=twilio_message.sid,
+                date_sent=twilio_message.date_sent,
+                account=reference(Account, twilio_message.account_sid),
+                from_phone_number=phone_numbers[
+                    '{}'.format(twilio_message.from_)
+                ],
+                to_phone_number=phone_numbers['{}'.format(twilio_message.to)],
+                body=twilio_message.body,
+                num_media=twilio_message.num_media,
+                num_segments=twilio_message.num_segments,
+                status=cls.get_status_choice(twilio_message.status),
+                direction=cls.get_direction_choice(twilio_message.direction),
+                price=twilio_message.price or '0.0',
+                currency=reference(Currency, twilio_message.price_unit),
+                api_version=reference(ApiVersion, twilio_message.api_version),
+            )
+            if twilio_message.messaging_service_sid:
+                message.messaging_service = reference(
+                    MessagingService, twilio_message.messaging_service_sid
+                )
+            if twilio_message.error_code:
+                message.error = reference(
+                    Error, twilio_message.error_code,
+                    twilio_message.error_message
+                )
+            if Conversation.enabled():
+                message.conversation = reference(
+                    Conversation, message.from_phone_number,
+                    message.to_phone_number
+                )
+            messages[to] = message
+
+        try:
+            with transaction.atomic():
+                created = [
+                    message for message in messages.values()
+                    if message.sid not in existing
+                ]
+                cls.objects.bulk_create(created)
+                MessageDailyStat.apply(
+                    (None, message.get_field_values()) for message in created
+                )
+                Conversation.add_messages(created)
+        except IntegrityError:
+            # lost a race with a status callback, fall back to one at a time
+            for to, twilio_message in twilio_messages.items():
+                if twilio_message.sid not in existing:
+                    messages[to], created = cls.get_or_create(
+                        message=twilio_message
+                    )
+
+        return messages
 
     @property
     def twilio_message(self):
-        max_retries = getattr(settings, 'DJANGO_TWILIO_SMS_MAX_RETRIES', 5)
-        retry_sleep = getattr(settings, 'DJANGO_TWILIO_SMS_RETRY_SLEEP', .5)
-        retries = 0
-        while True:
-            try:
-                return twilio_client.messages.get(self.sid)
-            except TwilioRestException:
-                if retries < max_retries:
-                    time.sleep(retry_sleep)
-                    retries = retries + 1
-                else:
-                    raise
+        return retry_policy.call(
+            twilio_client.messages.get, self.sid,
+            retry_statuses=RETRY_NOT_FOUND_STATUSES
+        )
 
     @staticmethod
-    def get_status_callback():
-        absolute_uri = AbsoluteURI('django_twilio_sms', 'callback_view')
+    def get_status_callback(host=None):
+        absolute_uri = AbsoluteURI(
+            'django_twilio_sms', 'callback_view', host=host
+        )
         return absolute_uri.get_absolute_uri()
 
+    @staticmethod
+    def get_status_callback_host(messaging_service_sid):
+        """
+        Return the host of the status callback of the messages sent through
+        ``messaging_service_sid``, or ``None`` for the site host.
+        """
+        hosts = getattr(
+            settings, 'DJANGO_TWILIO_SMS_STATUS_CALLBACK_HOSTS', {}
+        )
+        return hosts.get(messaging_service_sid)
+
     def check_for_subscription_message(self):
         if self.direction is self.INBOUND:
             body = self.body.upper().strip()
@@ -336,6 +1154,7 @@ class Message(Sid):
                     sender=self.__class__, message=self, unsubscribed=False
                 )
 
+    @instrumented('message.send_response_message')
     def send_response_message(self):
         if self.direction is self.INBOUND:
             if not self.from_phone_number.unsubscribed:
@@ -349,43 +1168,424 @@ class Message(Sid):
                     sender=self.__class__, action=action, message=self
                 )
 
+    @instrumented('message.sync_twilio_message')
     def sync_twilio_message(self, message=None):
+        """
+        Update the message from a twilio message, fetched from the REST API
+        when not given, in a single transaction. Only the fields that
+        changed are written and nothing is when the message is up to date.
+        """
         if not message:
             message = self.twilio_message
 
-        self.date_sent = message.date_sent
-        self.account = Account.get_or_create(message.account_sid)
+        original = self.get_field_values()
 
-        if message.messaging_service_sid:
-            self.messaging_service = MessagingService.get_or_create(
-                message.messaging_service_sid
-            )
+        with transaction.atomic():
+            self.date_sent = message.date_sent
+            self.account = Account.get_or_create(message.account_sid)
 
-        self.num_media = message.num_media
-        self.num_segments = message.num_segments
+            if message.messaging_service_sid:
+                self.messaging_service = MessagingService.get_or_create(
+                    message.messaging_service_sid
+                )
 
-        if message.status:
-            self.status = self.get_status_choice(message.status)
-        else:
-            self.status = self.UNKNOWN
+            self.num_media = message.num_media
+            self.num_segments = message.num_segments
+
+            if message.status:
+                self.status = self.get_status_choice(message.status)
+            else:
+                self.status = self.UNKNOWN
 
-        if message.error_code:
-            self.error = Error.get_or_create(
-                message.error_code, message.error_message
+            if message.error_code:
+                self.error = Error.get_or_create(
+                    message.error_code, message.error_message
+                )
+
+            self.direction = self.get_direction_choice(message.direction)
+            self.sync_twilio_price(message)
+            self.api_version = ApiVersion.get_or_create(message.api_version)
+
+            phone_numbers = PhoneNumber.get_or_create_many(
+                [message.from_, message.to]
             )
+            self.from_phone_number = phone_numbers[message.from_]
+            self.to_phone_number = phone_numbers[message.to]
+
+            new_conversation = (
+                Conversation.enabled() and not self.conversation_id
+            )
+            if new_conversation:
+                self.conversation = Conversation.get_or_create(
+                    self.from_phone_number, self.to_phone_number
+                )
+
+            self.body = message.body
+            self.check_for_subscription_message()
+
+            if self._state.adding:
+                changed = self.upsert()
+            else:
+                changed = self.save_changed(original)
+            if changed:
+                MessageDailyStat.apply([(original, self.get_field_values())])
+                if new_conversation:
+                    Conversation.add_messages([self])
+
+    def upsert(self):
+        """
+        Insert the message, or when a concurrent callback or send inserted
+        it first, advance the stored message to its status instead. Returns
+        whether the message was inserted.
+        """
+        try:
+            with transaction.atomic():
+                self.save(force_insert=True)
+        except IntegrityError:
+            self._state.adding = False
+            self.advance_status(self.status)
+            return False
+        return True
+
+    def advance_status(self, status):
+        """
+        Move the message to ``status`` with a single ``UPDATE`` conditional
+        on the stored status ranking lower, so concurrent or out of order
+        updates never move it back. Returns whether the status was moved.
+        """
+        updated = Message.objects.filter(
+            sid=self.sid, status__in=self.get_lower_statuses(status)
+        ).update(status=status, date_updated=timezone.now())
+        if updated:
+            self.status = status
+        return bool(updated)
+
+    def sync_twilio_price(self, message=None):
+        if not message:
+            message = self.twilio_message
 
-        self.direction = self.get_direction_choice(message.direction)
         self.price = message.price or '0.0'
         self.currency = Currency.get_or_create(message.price_unit)
-        self.api_version = ApiVersion.get_or_create(message.api_version)
 
-        self.from_phone_number = PhoneNumber.get_or_create(message.from_)
-        self.to_phone_number = PhoneNumber.get_or_create(message.to)
+    def sync_twilio_dates(self, message=None):
+        if not message:
+            message = self.twilio_message
 
-        self.body = message.body
-        self.check_for_subscription_message()
+        if message.date_sent:
+            self.date_sent = message.date_sent
+
+    @instrumented('message.sync_twilio_request')
+    def sync_twilio_request(self, twilio_request):
+        """
+        Update the message from the parameters twilio posts to the webhooks
+        rather than fetching it again from the REST API. Only the price and
+        the date sent, which are not part of the callback, fall back to the
+        API, once the message has reached a priced status or has been sent
+        without a date sent being stored. As with
+        ``sync_twilio_message`` only the changed fields are written, and the
+        status is only ever advanced, see ``advance_status``. A message not
+        stored yet is created from an inbound message webhook, see
+        ``is_inbound_request``, dated when twilio posted it.
+        """
+        original = self.get_field_values()
+        adding = self._state.adding
+
+        status = (getattr(twilio_request, 'messagestatus', None) or
+                  getattr(twilio_request, 'smsstatus', None))
+        if status:
+            status = self.get_status_choice(status)
+            if adding:
+                self.status = status
+            if self.STATUS_RANKS[status] <= self.STATUS_RANKS[self.status]:
+                # the stored status can only be as far along
+                status = None
+
+        if adding:
+            self.date_sent = timezone.now()
+
+        # fetched before the transaction to keep it short
+        sync_price = (
+            getattr(settings, 'DJANGO_TWILIO_SMS_SYNC_PRICE', True) and
+            (self.status if adding else status) in self.PRICED_STATUSES and
+            not self.price
+        )
+        # messages are stored when they are created, before twilio sends
+        # them, and the callbacks do not carry the date sent
+        sync_dates = not self.date_sent and (
+            self.STATUS_RANKS[status if status is not None else self.status]
+            >= self.STATUS_RANKS[self.SENT]
+        )
+        twilio_message = None
+        if sync_price or sync_dates:
+            twilio_message = self.twilio_message
+
+        with transaction.atomic():
+            new_conversation = False
+            if adding:
+                self.account = Account.get_or_create(twilio_request.accountsid)
+                self.api_version = ApiVersion.get_or_create(
+                    twilio_request.apiversion
+                )
+                self.direction = self.INBOUND
+                self.num_media = 0
+                self.num_segments = 1
+                self.body = ''
+                self.price = '0.0'
+                self.currency = Currency.get_or_create(
+                    self.DEFAULT_PRICE_UNIT
+                )
 
-        self.save()
+                phone_numbers = PhoneNumber.get_or_create_many(
+                    [twilio_request.from_, twilio_request.to]
+                )
+                self.from_phone_number = phone_numbers[twilio_request.from_]
+                self.to_phone_number = phone_numbers[twilio_request.to]
+
+                new_conversation = Conversation.enabled()
+                if new_conversation:
+                    self.conversation = Conversation.get_or_create(
+                        self.from_phone_number, self.to_phone_number
+                    )
+
+            error_code = getattr(twilio_request, 'errorcode', None)
+            if error_code:
+                self.error = Error.get_or_create(
+                    error_code, getattr(twilio_request, 'errormessage', '')
+                )
+
+            messaging_service_sid = getattr(
+                twilio_request, 'messagingservicesid', None
+            )
+            if messaging_service_sid:
+                self.messaging_service = MessagingService.get_or_create(
+                    messaging_service_sid
+                )
+
+            if getattr(twilio_request, 'nummedia', None):
+                self.num_media = twilio_request.nummedia
+            if getattr(twilio_request, 'numsegments', None):
+                self.num_segments = twilio_request.numsegments
+            if getattr(twilio_request, 'body', None):
+                self.body = twilio_request.body
+
+            if twilio_message:
+                self.sync_twilio_dates(twilio_message)
+                if sync_price:
+                    self.sync_twilio_price(twilio_message)
+
+            if adding:
+                self.check_for_subscription_message()
+                changed = self.upsert()
+            else:
+                changed = self.save_changed(original)
+            if status is not None and self.advance_status(status):
+                changed = True
+            if changed:
+                MessageDailyStat.apply([(original, self.get_field_values())])
+                if new_conversation:
+                    Conversation.add_messages([self])
+
+
+@python_2_unicode_compatible
+class MessageDailyStat(CreatedUpdated):
+    """
+    The number of messages, segments, delivered and failed messages and the
+    spend of a day per account, messaging service, direction and currency,
+    kept up to date as messages are synced so reports read a row per day
+    instead of every message. Days are those of the current time zone.
+    """
+
+    # the statistics summed per day
+    COUNTERS = ('messages', 'segments', 'delivered', 'failed', 'price')
+
+    DELIVERED_STATUSES = (Message.DELIVERED, Message.READ)
+    FAILED_STATUSES = (Message.UNDELIVERED, Message.FAILED)
+
+    date = models.DateField()
+    account = models.ForeignKey(Account)
+    # a sid rather than a nullable key, so the unique constraint holds for
+    # messages sent without a messaging service
+    messaging_service_sid = models.CharField(max_length=34, blank=True)
+    direction = models.PositiveSmallIntegerField(
+        choices=Message.DIRECTION_CHOICES
+    )
+    currency = models.ForeignKey(Currency)
+    messages = models.IntegerField(default=0)
+    segments = models.IntegerField(default=0)
+    delivered = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    price = models.DecimalField(max_digits=12, decimal_places=5, default=0)
+
+    class Meta:
+        unique_together = [(
+            'date', 'account', 'messaging_service_sid', 'direction',
+            'currency'
+        )]
+
+    def __str__(self):
+        return '{} {}'.format(self.date, self.account_id)
+
+    @classmethod
+    def get_counts(cls, values):
+        """
+        Return the key and the counters a message adds to its day, from a
+        dict returned by ``get_field_values``, or ``None`` for a message
+        that has not been sent.
+        """
+        if not values or not values['date_sent']:
+            return None
+
+        status = int(values['status'])
+        key = (
+            get_local_date(values['date_sent']),
+            values['account_id'],
+            values['messaging_service_id'] or '',
+            int(values['direction']),
+            values['currency_id'],
+        )
+        return key, {
+            'messages': 1,
+            'segments': int(values['num_segments'] or 0),
+            'delivered': int(status in cls.DELIVERED_STATUSES),
+            'failed': int(status in cls.FAILED_STATUSES),
+            'price': Decimal(values['price'] or 0),
+        }
+
+    @classmethod
+    def apply(cls, changes):
+        """
+        Apply the difference each message makes to its day, ``changes``
+        being pairs of the field values of a message before and after it
+        changed, ``None`` when it did not exist. The deltas of a day are
+        written with a single ``UPDATE``. Nothing is written unless
+        ``DJANGO_TWILIO_SMS_DAILY_STATS`` is set.
+
+        Deltas are computed from the values the process read, so a message
+        written by two processes at once can leave its day off until the
+        day is rebuilt, see ``rebuild``.
+        """
+        if not getattr(settings, 'DJANGO_TWILIO_SMS_DAILY_STATS', False):
+            return
+
+        deltas = OrderedDict()
+        for before, after in changes:
+            for values, sign in ((before, -1), (after, 1)):
+                counts = cls.get_counts(values)
+                if counts is None:
+                    continue
+                key, counts = counts
+                delta = deltas.setdefault(
+                    key, dict((name, 0) for name in cls.COUNTERS)
+                )
+                for name in cls.COUNTERS:
+                    delta[name] = delta[name] + sign * counts[name]
+
+        for key, delta in deltas.items():
+            if any(delta.values()):
+                cls.add(key, delta)
+
+    @classmethod
+    def add(cls, key, delta):
+        date, account_id, messaging_service_sid, direction, currency_id = key
+        lookup = {
+            'date': date,
+            'account_id': account_id,
+            'messaging_service_sid': messaging_service_sid,
+            'direction': direction,
+            'currency_id': currency_id,
+        }
+        values = dict(
+            (name, models.F(name) + delta[name]) for name in cls.COUNTERS
+        )
+        values['date_updated'] = timezone.now()
+
+        if cls.objects.filter(**lookup).update(**values):
+            return
+
+        try:
+            with transaction.atomic():
+                cls.objects.create(**dict(lookup, **delta))
+        except IntegrityError:
+            # created by a concurrent sync since the update
+            cls.objects.filter(**lookup).update(**values)
+
+    @classmethod
+    def aggregate_day(cls, date):
+        """
+        Return the statistics of ``date`` computed from the messages.
+        """
+        delivered = models.Case(
+            models.When(status__in=cls.DELIVERED_STATUSES, then=1),
+            default=0, output_field=models.IntegerField()
+        )
+        failed = models.Case(
+            models.When(status__in=cls.FAILED_STATUSES, then=1),
+            default=0, output_field=models.IntegerField()
+        )
+        rows = Message.objects.filter(
+            date_sent__gte=get_day_start(date),
+            date_sent__lt=get_day_start(date + timedelta(days=1))
+        ).values(
+            'account', 'messaging_service', 'direction', 'currency'
+        ).annotate(
+            total_messages=models.Count('sid'),
+            total_segments=models.Sum('num_segments'),
+            total_delivered=models.Sum(delivered),
+            total_failed=models.Sum(failed),
+            total_price=models.Sum('price'),
+        ).order_by()
+
+        return [
+            cls(
+                date=date,
+                account_id=row['account'],
+                messaging_service_sid=row['messaging_service'] or '',
+                direction=row['direction'],
+                currency_id=row['currency'],
+                messages=row['total_messages'],
+                segments=row['total_segments'] or 0,
+                delivered=row['total_delivered'] or 0,
+                failed=row['total_failed'] or 0,
+                price=row['total_price'] or 0,
+            ) for row in rows
+        ]
+
+    @classmethod
+    def rebuild(cls, start, end):
+        """
+        Recompute the statistics of the days from ``start`` to ``end`` from
+        the messages, a day per transaction, yielding each day and its
+        number of rows.
+        """
+        date = start
+        while date <= end:
+            with transaction.atomic():
+                cls.objects.filter(date=date).delete()
+                stats = cls.aggregate_day(date)
+                cls.objects.bulk_create(stats)
+            yield date, len(stats)
+            date = date + timedelta(days=1)
+
+    @classmethod
+    def get_totals(cls, start=None, end=None, **filters):
+        """
+        Return the statistics summed over the days from ``start`` to
+        ``end``, filtered by ``filters``.
+        """
+        queryset = cls.objects.filter(**filters)
+        if start:
+            queryset = queryset.filter(date__gte=start)
+        if end:
+            queryset = queryset.filter(date__lte=end)
+
+        totals = queryset.aggregate(**dict(
+            ('total_{}'.format(name), models.Sum(name))
+            for name in cls.COUNTERS
+        ))
+        return dict(
+            (name, totals['total_{}'.format(name)] or 0)
+            for name in cls.COUNTERS
+        )
 
 
 @python_2_unicode_compatible
@@ -398,15 +1598,13 @@ class Action(CreatedUpdated):
 
     @classmethod
     def get_action(cls, message_body):
-        try:
-            return cls.objects.get(
-                name=message_body.strip().upper(), active=True
-            )
-        except cls.DoesNotExist:
-            return cls.objects.get(name='UNKNOWN', active=True)
+        return action_router.get_action(message_body)
 
     def get_active_response(self):
-        return self.response_set.filter(active=True)[0]
+        response = action_router.get_active_response(self)
+        if response is None:
+            response = self.response_set.filter(active=True)[0]
+        return response
 
     def save(self, *args, **kwargs):
         self.name = self.name.upper()
@@ -432,3 +1630,531 @@ class Response(CreatedUpdated):
             except Response.DoesNotExist:
                 pass
         super(Response, self).save(*args, **kwargs)
+
+
+@python_2_unicode_compatible
+class WebhookEvent(CreatedUpdated):
+
+    # view choices
+    CALLBACK = 0
+    INBOUND = 1
+
+    VIEW_CHOICES = (
+        (CALLBACK, 'callback'),
+        (INBOUND, 'inbound'),
+    )
+
+    # status choices
+    PENDING = 0
+    PROCESSING = 1
+    PROCESSED = 2
+    FAILED = 3
+
+    STATUS_CHOICES = (
+        (PENDING, 'pending'),
+        (PROCESSING, 'processing'),
+        (PROCESSED, 'processed'),
+        (FAILED, 'failed'),
+    )
+
+    view = models.PositiveSmallIntegerField(choices=VIEW_CHOICES)
+    payload = models.TextField()
+    status = models.PositiveSmallIntegerField(
+        choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claim = models.CharField(max_length=32, blank=True, db_index=True)
+    date_claimed = models.DateTimeField(null=True)
+    date_processed = models.DateTimeField(null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        index_together = [('status', 'date_created')]
+
+    def __str__(self):
+        return '{} {}'.format(self.get_view_display(), self.pk)
+
+    @classmethod
+    def enqueue(cls, view, parameters):
+        return cls.objects.create(view=view, payload=json.dumps(parameters))
+
+    @classmethod
+    def claim_batch(cls, batch_size):
+        """
+        Claim up to ``batch_size`` pending events, or events whose worker
+        has not finished them within the claim timeout, with a conditional
+        update so concurrent workers never claim the same event.
+        """
+        claim_timeout = getattr(
+            settings, 'DJANGO_TWILIO_SMS_WEBHOOK_QUEUE_CLAIM_TIMEOUT', 300
+        )
+        now = timezone.now()
+        claimable = cls.objects.filter(
+            models.Q(status=cls.PENDING) |
+            models.Q(
+                status=cls.PROCESSING,
+                date_claimed__lt=now - timedelta(seconds=claim_timeout)
+            )
+        )
+
+        claim = uuid.uuid4().hex
+        pks = list(
+            claimable.order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        claimable.filter(pk__in=pks).update(
+            status=cls.PROCESSING, claim=claim, date_claimed=now
+        )
+        return list(cls.objects.filter(claim=claim).order_by('pk'))
+
+    @classmethod
+    def get_stats(cls, window=60):
+        """
+        Return the queue depth, the age in seconds of the oldest pending
+        event and the number of events processed in the last ``window``
+        seconds.
+        """
+        now = timezone.now()
+        pending = cls.objects.filter(status=cls.PENDING)
+        oldest = pending.order_by('date_created').values_list(
+            'date_created', flat=True
+        ).first()
+
+        return {
+            'pending': pending.count(),
+            'processing': cls.objects.filter(status=cls.PROCESSING).count(),
+            'failed': cls.objects.filter(status=cls.FAILED).count(),
+            'lag': (now - oldest).total_seconds() if oldest else 0,
+            'processed': cls.objects.filter(
+                status=cls.PROCESSED,
+                date_processed__gte=now - timedelta(seconds=window)
+            ).count(),
+            'window': window,
+        }
+
+    @property
+    def twilio_request(self):
+        return TwilioRequest(json.loads(self.payload))
+
+    def mark_processed(self):
+        self.status = self.PROCESSED
+        self.attempts = self.attempts + 1
+        self.date_processed = timezone.now()
+        self.error = ''
+        self.save()
+
+    def mark_failed(self, exception):
+        max_attempts = getattr(
+            settings, 'DJANGO_TWILIO_SMS_WEBHOOK_QUEUE_MAX_ATTEMPTS', 3
+        )
+        self.attempts = self.attempts + 1
+        if self.attempts < max_attempts:
+            self.status = self.PENDING
+        else:
+            self.status = self.FAILED
+        self.error = '{}'.format(exception)
+        self.save()
+
+
+@python_2_unicode_compatible
+class QueuedMessage(CreatedUpdated):
+    """
+    An outbound message stored by ``Message.send_message`` when
+    ``DJANGO_TWILIO_SMS_SEND_QUEUE`` is set, to be sent by the
+    ``dispatch_messages`` management command.
+    """
+
+    # status choices
+    PENDING = 0
+    SENDING = 1
+    SENT = 2
+    FAILED = 3
+
+    STATUS_CHOICES = (
+        (PENDING, 'pending'),
+        (SENDING, 'sending'),
+        (SENT, 'sent'),
+        (FAILED, 'failed'),
+    )
+
+    class ClaimLost(Exception):
+        pass
+
+    body = models.CharField(max_length=160)
+    recipient = models.CharField(max_length=32)
+    sender = models.CharField(max_length=34)
+    messaging_service_sid = models.CharField(max_length=34, blank=True)
+    campaign = models.CharField(max_length=64, blank=True)
+    status = models.PositiveSmallIntegerField(
+        choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claim = models.CharField(max_length=32, blank=True, db_index=True)
+    date_claimed = models.DateTimeField(null=True)
+    sid = models.CharField(max_length=34, blank=True, db_index=True)
+    message = models.ForeignKey(Message, null=True)
+    date_sent = models.DateTimeField(null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        index_together = [('status', 'date_created')]
+
+    def __str__(self):
+        return '{} {}'.format(self.recipient, self.pk)
+
+    @classmethod
+    def enqueue(cls, body, to, from_=settings.TWILIO_DEFAULT_CALLERID,
+                messaging_service_sid=None, campaign=None):
+        return cls.objects.create(
+            body=body,
+            recipient='{}'.format(to),
+            sender='{}'.format(from_),
+            messaging_service_sid=messaging_service_sid or '',
+            campaign=campaign or ''
+        )
+
+    @staticmethod
+    def get_claim_timeout():
+        return getattr(
+            settings, 'DJANGO_TWILIO_SMS_SEND_QUEUE_CLAIM_TIMEOUT', 300
+        )
+
+    @classmethod
+    def claim_batch(cls, batch_size):
+        """
+        Claim up to ``batch_size`` pending messages, or messages whose
+        dispatcher has not finished them within the claim timeout, with a
+        conditional update so concurrent dispatchers never claim the same
+        message. Sent messages that could not be stored are claimed again
+        to be synced, keeping their status.
+        """
+        claim_timeout = cls.get_claim_timeout()
+        max_attempts = getattr(
+            settings, 'DJANGO_TWILIO_SMS_SEND_QUEUE_MAX_ATTEMPTS', 3
+        )
+        now = timezone.now()
+        claim_expired = now - timedelta(seconds=claim_timeout)
+        claimable = cls.objects.filter(
+            models.Q(status=cls.PENDING) |
+            models.Q(status=cls.SENDING, date_claimed__lt=claim_expired) |
+            models.Q(
+                status=cls.SENT, message__isnull=True,
+                date_claimed__lt=claim_expired, attempts__lt=max_attempts
+            )
+        )
+
+        claim = uuid.uuid4().hex
+        pks = list(
+            claimable.order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        claimable.filter(pk__in=pks).update(
+            status=models.Case(
+                models.When(status=cls.SENT, then=models.Value(cls.SENT)),
+                default=models.Value(cls.SENDING),
+                output_field=models.PositiveSmallIntegerField()
+            ),
+            claim=claim, date_claimed=now,
+            attempts=models.F('attempts') + 1
+        )
+        return list(cls.objects.filter(claim=claim).order_by('pk'))
+
+    def find_sent(self):
+        """
+        Return the twilio message an earlier attempt sent, if any, by
+        looking for a message with the same body sent to the recipient
+        since the message was queued.
+        """
+        since = self.date_created - timedelta(minutes=5)
+        for twilio_message in twilio_client.messages.iter(to=self.recipient):
+            date_created = twilio_message.date_created
+            if timezone.is_naive(date_created):
+                date_created = timezone.make_aware(date_created, timezone.utc)
+            if date_created < since:
+                break
+            if twilio_message.body == self.body:
+                return twilio_message
+
+    @instrumented('queuedmessage.send')
+    def send(self, from_=None):
+        """
+        Send the message from ``from_``, the sender it was queued with by
+        default, and return its ``Message``. A message with a sid was sent
+        by an earlier attempt and is fetched by it instead. Otherwise a
+        message claimed before, by a dispatcher that may have sent it, is
+        only sent if it cannot be found in the twilio message log. Raises
+        ``QueuedMessage.ClaimLost``, without sending, when another
+        dispatcher has claimed the message since.
+        """
+        twilio_message = None
+        if self.sid:
+            twilio_message = retry_policy.call(
+                twilio_client.messages.get, self.sid,
+                retry_statuses=RETRY_NOT_FOUND_STATUSES
+            )
+        elif self.attempts > 1:
+            twilio_message = retry_policy.call(self.find_sent)
+
+        if twilio_message is None:
+            if not self.renew_claim():
+                raise self.ClaimLost(
+                    'Queued message {} was claimed by another '
+                    'dispatcher'.format(self.pk)
+                )
+            twilio_message = Message.create_twilio_message(
+                self.body, self.recipient, from_ or self.sender,
+                self.messaging_service_sid
+            )
+        self.mark_sent(twilio_message)
+
+        message, created = Message.get_or_create(message=twilio_message)
+        QueuedMessage.objects.filter(pk=self.pk).update(message=message)
+        self.message = message
+        return message
+
+    def renew_claim(self):
+        """
+        Renew the claim with a conditional update, returning ``False`` when
+        it expired and another dispatcher claimed the message.
+        """
+        now = timezone.now()
+        renewed = QueuedMessage.objects.filter(
+            pk=self.pk, claim=self.claim
+        ).update(date_claimed=now)
+        if renewed:
+            self.date_claimed = now
+        return bool(renewed)
+
+    def mark_sent(self, twilio_message):
+        now = timezone.now()
+        self.status = self.SENT
+        self.sid = twilio_message.sid
+        self.date_sent = self.date_sent or now
+        self.error = ''
+        QueuedMessage.objects.filter(pk=self.pk, claim=self.claim).update(
+            status=self.status, sid=self.sid, date_sent=self.date_sent,
+            error=self.error, date_updated=now
+        )
+
+    def mark_failed(self, exception):
+        max_attempts = getattr(
+            settings, 'DJANGO_TWILIO_SMS_SEND_QUEUE_MAX_ATTEMPTS', 3
+        )
+        if self.sid:
+            # twilio accepted the message, only storing it failed
+            self.status = self.SENT
+        elif self.attempts < max_attempts:
+            self.status = self.PENDING
+        else:
+            self.status = self.FAILED
+        self.error = '{}'.format(exception)
+        QueuedMessage.objects.filter(pk=self.pk, claim=self.claim).update(
+            status=self.status, error=self.error, date_updated=timezone.now()
+        )
+
+
+@python_2_unicode_compatible
+class IdempotencyKey(CreatedUpdated):
+    """
+    A key a message was sent with, so a repeated call with the same key
+    returns the message sent the first time instead of sending it again.
+    Keys are kept until removed by the ``compact_idempotency_keys`` command.
+    """
+
+    class InProgress(Exception):
+        pass
+
+    key = models.CharField(max_length=255, unique=True)
+    # the sid twilio returned, recorded before the message is stored
+    sid = models.CharField(max_length=34, blank=True)
+    message = models.ForeignKey(Message, null=True)
+    queued_message = models.ForeignKey(QueuedMessage, null=True)
+
+    class Meta:
+        index_together = [('date_created', 'id')]
+
+    def __str__(self):
+        return self.key
+
+    def get_sent(self):
+        """
+        Return the ``Message``, or ``QueuedMessage``, sent with the key,
+        raising ``IdempotencyKey.InProgress`` while it is being sent. A
+        message twilio sent but that was not stored is synced by its sid.
+        """
+        sent = self.message or self.queued_message
+        if sent is None and self.sid:
+            sent, created = Message.get_or_create(message_sid=self.sid)
+            self.record_many({self.key: sent})
+            self.message = sent
+        if sent is None:
+            raise self.InProgress(
+                'A message is being sent with key {}'.format(self.key)
+            )
+        return sent
+
+    @classmethod
+    def get_many(cls, keys):
+        return dict(
+            (idempotency_key.key, idempotency_key)
+            for idempotency_key in cls.objects.select_related(
+                'message', 'queued_message'
+            ).filter(key__in=list(keys))
+        )
+
+    @classmethod
+    def reserve_many(cls, keys):
+        """
+        Reserve the keys no message was sent with yet. Returns the list of
+        reserved keys and a dict of the ``IdempotencyKey`` objects of the
+        keys already used.
+        """
+        existing = cls.get_many(keys)
+        pending = [key for key in keys if key not in existing]
+        if not pending:
+            return ([], existing)
+
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create([cls(key=key) for key in pending])
+            return (pending, existing)
+        except IntegrityError:
+            # a concurrent call reserved some of the keys since the lookup
+            pass
+
+        reserved = []
+        for key in pending:
+            try:
+                with transaction.atomic():
+                    cls.objects.create(key=key)
+            except IntegrityError:
+                continue
+            reserved.append(key)
+
+        existing.update(cls.get_many(set(pending) - set(reserved)))
+        return (reserved, existing)
+
+    @classmethod
+    def record_many(cls, sent):
+        """
+        Record the messages sent with reserved keys, ``sent`` being a dict
+        of ``Message`` or ``QueuedMessage`` objects keyed by key.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            for key, message in sent.items():
+                if isinstance(message, QueuedMessage):
+                    field = 'queued_message'
+                else:
+                    field = 'message'
+                cls.objects.filter(key=key).update(
+                    date_updated=now, **{field: message}
+                )
+
+    @classmethod
+    def record_sids(cls, sids):
+        """
+        Record the twilio sids of the messages sent with reserved keys,
+        ``sids`` being a dict keyed by key.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            for key, sid in sids.items():
+                cls.objects.filter(key=key).update(date_updated=now, sid=sid)
+
+    @classmethod
+    def release_many(cls, keys):
+        """
+        Release reserved keys whose send failed, so they can be retried.
+        Keys of messages twilio accepted are never released.
+        """
+        cls.objects.filter(
+            key__in=list(keys), sid='', message__isnull=True,
+            queued_message__isnull=True
+        ).delete()
+
+    @classmethod
+    def compact(cls, age, batch_size=1000):
+        """
+        Delete the keys created over ``age`` seconds ago, ``batch_size``
+        at a time, and return the number deleted.
+        """
+        expired = cls.objects.filter(
+            date_created__lt=timezone.now() - timedelta(seconds=age)
+        ).order_by('date_created', 'id')
+
+        deleted = 0
+        while True:
+            pks = list(expired.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            deleted = deleted + cls.objects.filter(pk__in=pks).delete()[0]
+
+
+@python_2_unicode_compatible
+class BackfillWindow(CreatedUpdated):
+    """
+    A day of the twilio message log imported by the ``backfill_messages``
+    command. Days with a completed window are skipped, so an interrupted
+    import resumes from the first day it had not finished.
+    """
+
+    date = models.DateField(unique=True)
+    messages = models.PositiveIntegerField(default=0)
+    date_completed = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return '{}'.format(self.date)
+
+    @classmethod
+    def get_pending_dates(cls, start, end):
+        """
+        Return the days from ``start`` to ``end``, inclusive, that have not
+        been completely imported.
+        """
+        completed = set(cls.objects.filter(
+            date__range=(start, end), date_completed__isnull=False
+        ).values_list('date', flat=True))
+
+        dates = []
+        date = start
+        while date <= end:
+            if date not in completed:
+                dates.append(date)
+            date = date + timedelta(days=1)
+        return dates
+
+    def complete(self, messages):
+        self.messages = messages
+        self.date_completed = timezone.now()
+        self.save()
+
+
+@python_2_unicode_compatible
+class ReconcileRun(CreatedUpdated):
+    """
+    A run of the ``reconcile_messages`` command. A run checks the pending
+    messages created up to its ``high_water_mark``, and the next run starts
+    from there, so each run only checks the messages that became candidates
+    since the last completed run. A run ends its ``high_water_mark`` at the
+    first message it could not fetch or that is still pending.
+    """
+
+    high_water_mark = models.DateTimeField()
+    checked = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    date_completed = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return '{}'.format(self.high_water_mark)
+
+    @classmethod
+    def get_low_water_mark(cls):
+        run = cls.objects.filter(
+            date_completed__isnull=False
+        ).order_by('-date_completed').first()
+        if run:
+            return run.high_water_mark
+
+    def complete(self):
+        self.date_completed = timezone.now()
+        self.save()
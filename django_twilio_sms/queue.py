@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .models import QueuedMessage, WebhookEvent
+from .scheduler import QueuedSendRequest, send_scheduler
+
+
+class DatabaseBackend(object):
+    """
+    Store webhook requests in the ``WebhookEvent`` table, to be processed by
+    the ``process_webhooks`` management command.
+    """
+
+    def enqueue(self, view, parameters):
+        return WebhookEvent.enqueue(view, parameters)
+
+
+def get_backend():
+    backend = getattr(
+        settings, 'DJANGO_TWILIO_SMS_WEBHOOK_QUEUE_BACKEND',
+        'django_twilio_sms.queue.DatabaseBackend'
+    )
+    return import_string(backend)()
+
+
+def is_enabled():
+    return getattr(settings, 'DJANGO_TWILIO_SMS_WEBHOOK_QUEUE', False)
+
+
+def process_event(event):
+    # imported here as the views enqueue through this module
+    from .views import inbound_message_view, message_view
+
+    try:
+        if event.view == WebhookEvent.INBOUND:
+            inbound_message_view(event.twilio_request)
+        else:
+            message_view(event.twilio_request)
+    except Exception as e:
+        event.mark_failed(e)
+        return False
+    else:
+        event.mark_processed()
+        return True
+
+
+def process_threaded_event(event):
+    try:
+        return process_event(event)
+    finally:
+        connection.close()
+
+
+def process_batch(batch_size=100, concurrency=1):
+    """
+    Claim and process a batch of webhook events, returning the number that
+    were processed and the number that failed.
+    """
+    events = WebhookEvent.claim_batch(batch_size)
+
+    if concurrency > 1 and len(events) > 1:
+        pool = ThreadPool(min(concurrency, len(events)))
+        try:
+            results = pool.map(process_threaded_event, events)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [process_event(event) for event in events]
+
+    processed = len([result for result in results if result])
+    return (processed, len(results) - processed)
+
+
+def dispatch_batch(batch_size=100, concurrency=1):
+    """
+    Claim a batch of queued messages and send them through the send
+    scheduler, returning the number that were sent and the number that
+    failed. No more are claimed than the slowest sender can send within half
+    the claim timeout, leaving time for retries, so claims do not expire
+    while they wait in the scheduler.
+    """
+    batch_size = min(batch_size, send_scheduler.get_batch_limit(
+        QueuedMessage.get_claim_timeout() / 2.0
+    ))
+    requests = [
+        send_scheduler.submit_request(QueuedSendRequest(queued_message))
+        for queued_message in QueuedMessage.claim_batch(batch_size)
+    ]
+    send_scheduler.dispatch(concurrency)
+
+    sent = len([request for request in requests if not request.exception])
+    return (sent, len(requests) - sent)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import lookup_cache
+from .instrumentation import instrumentation
+from .models import (
+    Account,
+    Action,
+    ApiVersion,
+    Currency,
+    Error,
+    MessagingService,
+    Response
+)
+from .router import action_router
+from .scheduler import send_scheduler
+from .signals import receiver_pool
+from .utils import AbsoluteURI, on_commit
+
+
+LOOKUP_MODELS = (Account, ApiVersion, Currency, Error, MessagingService)
+
+# the settings the instrumentation collectors are built from
+INSTRUMENTATION_SETTINGS = (
+    'DJANGO_TWILIO_SMS_INSTRUMENTATION', 'DJANGO_TWILIO_SMS_STATSD_HOST',
+    'DJANGO_TWILIO_SMS_STATSD_PORT', 'DJANGO_TWILIO_SMS_STATSD_PREFIX'
+)
+
+# the settings AbsoluteURI builds uris from
+ABSOLUTE_URI_SETTINGS = (
+    'DJANGO_TWILIO_SMS_SITE_HOST', 'ROOT_URLCONF', 'SECURE_SSL_REDIRECT'
+)
+
+
+def update_lookup_cache(sender, instance, **kwargs):
+    lookup_cache.set(
+        sender, getattr(instance, sender.LOOKUP_FIELD), instance
+    )
+
+
+def invalidate_lookup_cache(sender, instance, **kwargs):
+    lookup_cache.invalidate(sender, getattr(instance, sender.LOOKUP_FIELD))
+
+
+for model in LOOKUP_MODELS:
+    post_save.connect(update_lookup_cache, sender=model)
+    post_delete.connect(invalidate_lookup_cache, sender=model)
+
+
+def invalidate_action_router(sender, using=None, **kwargs):
+    action_router.invalidate()
+    # again once committed, as the table may be rebuilt from the rows as they
+    # were before the transaction in the meantime
+    on_commit(action_router.invalidate, using=using)
+
+
+for model in (Action, Response):
+    post_save.connect(invalidate_action_router, sender=model)
+    post_delete.connect(invalidate_action_router, sender=model)
+
+
+@receiver(setting_changed)
+def clear_lookup_cache(sender, setting, **kwargs):
+    if setting.startswith('DJANGO_TWILIO_SMS_LOOKUP_CACHE'):
+        lookup_cache.clear()
+
+
+@receiver(setting_changed)
+def clear_absolute_uri_cache(sender, setting, **kwargs):
+    if setting in ABSOLUTE_URI_SETTINGS:
+        AbsoluteURI.clear_cache()
+
+
+@receiver(setting_changed)
+def reset_send_scheduler(sender, setting, **kwargs):
+    if setting.startswith('DJANGO_TWILIO_SMS_SEND'):
+        send_scheduler.reset()
+
+
+@receiver(setting_changed)
+def close_receiver_pool(sender, setting, **kwargs):
+    if setting == 'DJANGO_TWILIO_SMS_SIGNAL_WORKERS':
+        receiver_pool.close()
+
+
+@receiver(setting_changed)
+def reset_instrumentation(sender, setting, **kwargs):
+    if setting in INSTRUMENTATION_SETTINGS:
+        instrumentation.reset()
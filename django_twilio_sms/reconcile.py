@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from datetime import timedelta
+from multiprocessing.pool import ThreadPool
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from django_twilio.client import twilio_client
+
+from .models import (
+    Currency,
+    Error,
+    Message,
+    MessageDailyStat,
+    ReconcileRun
+)
+from .retry import RateLimiter, retry_policy
+
+
+def iter_candidates(low_water_mark, high_water_mark, batch_size):
+    """
+    Yield batches of the pending messages created between the water marks,
+    paginated on ``(date_created, sid)`` so each batch is an index range
+    scan however far into the table it is.
+    """
+    queryset = Message.objects.filter(
+        status__in=Message.PENDING_STATUSES,
+        date_created__lt=high_water_mark
+    ).order_by('date_created', 'sid')
+    if low_water_mark:
+        queryset = queryset.filter(date_created__gte=low_water_mark)
+
+    last = None
+    while True:
+        batch = queryset
+        if last:
+            batch = batch.filter(
+                Q(date_created__gt=last.date_created) |
+                Q(date_created=last.date_created, sid__gt=last.sid)
+            )
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+
+        yield batch
+        last = batch[-1]
+
+
+def apply_twilio_message(message, twilio_message):
+    """
+    Set the fields of ``message`` that a status callback would have
+    updated from ``twilio_message``, returning the names of those that
+    changed.
+    """
+    original = message.get_field_values()
+
+    status = Message.get_status_choice(twilio_message.status)
+    if Message.STATUS_RANKS[status] > Message.STATUS_RANKS[message.status]:
+        message.status = status
+    if twilio_message.date_sent:
+        message.date_sent = twilio_message.date_sent
+    if twilio_message.error_code:
+        message.error = Error.get_or_create(
+            twilio_message.error_code, twilio_message.error_message
+        )
+    if twilio_message.price:
+        message.price = twilio_message.price
+        message.currency = Currency.get_or_create(twilio_message.price_unit)
+
+    return message.get_changed_fields(original)
+
+
+def update_in_bulk(messages, fields):
+    """
+    Write ``fields`` of every message in ``messages`` with a single
+    ``UPDATE``, setting each field with a ``CASE`` over the message sids.
+    """
+    values = {'date_updated': timezone.now()}
+    for name in fields:
+        field = Message._meta.get_field(name)
+        whens = []
+        for message in messages:
+            conditions = {'sid': message.sid}
+            if field.attname == 'status':
+                # a status callback may have moved it on since the fetch
+                conditions['status__in'] = Message.get_lower_statuses(
+                    message.status
+                )
+                if not conditions['status__in']:
+                    continue
+            whens.append(When(then=Value(
+                getattr(message, field.attname), output_field=field
+            ), **conditions))
+        if whens:
+            values[field.attname] = Case(
+                *whens, default=F(field.attname), output_field=field
+            )
+
+    return Message.objects.filter(
+        sid__in=[message.sid for message in messages]
+    ).update(**values)
+
+
+def reconcile(age=3600, batch_size=100, concurrency=4, rate=None,
+              full=False):
+    """
+    Refresh the messages left in a pending status for more than ``age``
+    seconds from the twilio API, ``concurrency`` API calls at a time and at
+    most ``rate`` calls a second. Unless ``full`` is set, only messages
+    created since the last completed run are checked. A message whose
+    fetch fails, or that is still pending, stops the run's water mark, so
+    the next run checks it again. Messages a status callback updated while
+    they were fetched are left as the callback stored them. Returns the
+    ``ReconcileRun``.
+    """
+    run = ReconcileRun.objects.create(
+        high_water_mark=timezone.now() - timedelta(seconds=age)
+    )
+    low_water_mark = None if full else ReconcileRun.get_low_water_mark()
+    rate_limiter = RateLimiter(rate)
+
+    def fetch(message):
+        rate_limiter.wait()
+        try:
+            return (message, retry_policy.call(
+                twilio_client.messages.get, message.sid
+            ))
+        except Exception:
+            return (message, None)
+
+    held = None
+    pool = ThreadPool(concurrency)
+    try:
+        for batch in iter_candidates(
+                low_water_mark, run.high_water_mark, batch_size):
+            # the messages the next run checks again
+            pending = []
+            changed = []
+            originals = {}
+            fields = set()
+            for message, twilio_message in pool.imap(fetch, batch):
+                if twilio_message is None:
+                    pending.append(message)
+                    run.failed = run.failed + 1
+                    continue
+
+                original = message.get_field_values()
+                message_fields = apply_twilio_message(message, twilio_message)
+                if message_fields:
+                    changed.append(message)
+                    originals[message.sid] = original
+                    fields.update(message_fields)
+                elif message.status in Message.PENDING_STATUSES:
+                    pending.append(message)
+
+            with transaction.atomic():
+                if changed:
+                    current = dict(
+                        (message.sid, message) for message in
+                        Message.objects.select_for_update().filter(
+                            sid__in=[message.sid for message in changed]
+                        )
+                    )
+                    updated = []
+                    for message in changed:
+                        current_message = current.get(message.sid)
+                        if not current_message:
+                            continue
+                        if (current_message.get_field_values() !=
+                                originals[message.sid]):
+                            # a status callback updated it since it was read
+                            message = current_message
+                        else:
+                            updated.append(message)
+                        if message.status in Message.PENDING_STATUSES:
+                            pending.append(message)
+
+                    if updated:
+                        update_in_bulk(updated, fields)
+                        MessageDailyStat.apply([
+                            (originals[message.sid],
+                             message.get_field_values())
+                            for message in updated
+                        ])
+                    run.updated = run.updated + len(updated)
+                run.checked = run.checked + len(batch)
+                run.save()
+
+            # candidates come in date_created order, so the first batch
+            # holding a message back holds the earliest
+            if pending and held is None:
+                held = min(message.date_created for message in pending)
+    finally:
+        pool.close()
+        pool.join()
+
+    if held is not None:
+        run.high_water_mark = held
+    run.complete()
+    return run
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import random
+import socket
+import threading
+import time
+
+from collections import deque
+
+from django.conf import settings
+from django.utils.six.moves.urllib.parse import parse_qs, urlparse
+
+from httplib2 import HttpLib2Error
+from twilio.rest.exceptions import TwilioRestException
+from twilio.rest.resources.util import transform_params
+
+from .instrumentation import instrumentation
+
+
+# the status of a call that failed without a response
+CONNECTION_ERROR = 'connection error'
+
+# errors raised by the twilio client when it gets no response
+CONNECTION_EXCEPTIONS = (socket.error, HttpLib2Error)
+
+# too many requests, server and connection errors, safe to retry for any
+# request
+RETRY_STATUSES = (CONNECTION_ERROR, 429, 500, 502, 503, 504)
+
+# a message fetched right after it was created may not be visible yet
+RETRY_NOT_FOUND_STATUSES = RETRY_STATUSES + (404, )
+
+# a create that failed with a server or connection error may still have
+# gone through
+RETRY_CREATE_STATUSES = (429, )
+
+
+class CircuitOpen(TwilioRestException):
+    pass
+
+
+class RetryPolicy(object):
+    """
+    Retry twilio API calls with exponential backoff and full jitter. Only
+    responses with a retryable status, and connection errors, are retried
+    within a time limit per call, a process wide retry budget caps the
+    number of retries in a rolling window, and a circuit breaker fails
+    calls fast after too many consecutive failures.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._retries = deque()
+        self._consecutive_failures = 0
+        self._open_until = 0
+        self.reset_stats()
+
+    def get_setting(self, name, default):
+        return getattr(settings, 'DJANGO_TWILIO_SMS_' + name, default)
+
+    def get_sleep(self, retries):
+        base = self.get_setting('RETRY_SLEEP', .5)
+        max_sleep = self.get_setting('RETRY_MAX_SLEEP', 8)
+        return random.uniform(0, min(max_sleep, base * 2 ** retries))
+
+    def get_status(self, exception):
+        if isinstance(exception, TwilioRestException):
+            return exception.status
+        return CONNECTION_ERROR
+
+    def is_retryable(self, exception, retry_statuses):
+        return self.get_status(exception) in retry_statuses
+
+    def get_max_retries(self, exception):
+        max_retries = self.get_setting('MAX_RETRIES', 5)
+        if self.get_status(exception) == 404:
+            return min(
+                max_retries, self.get_setting('NOT_FOUND_MAX_RETRIES', 2)
+            )
+        return max_retries
+
+    def is_open(self):
+        return self._open_until > time.time()
+
+    def use_budget(self):
+        """
+        Take one retry from the budget, returning ``False`` when it is
+        spent.
+        """
+        budget = self.get_setting('RETRY_BUDGET', 100)
+        window = self.get_setting('RETRY_BUDGET_WINDOW', 60)
+        now = time.time()
+        with self._lock:
+            while self._retries and self._retries[0] <= now - window:
+                self._retries.popleft()
+            if len(self._retries) >= budget:
+                return False
+            self._retries.append(now)
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+
+    def record_failure(self):
+        threshold = self.get_setting('CIRCUIT_BREAKER_THRESHOLD', 10)
+        cooldown = self.get_setting('CIRCUIT_BREAKER_COOLDOWN', 30)
+        with self._lock:
+            self.failures = self.failures + 1
+            self._consecutive_failures = self._consecutive_failures + 1
+            if self._consecutive_failures >= threshold:
+                self._open_until = time.time() + cooldown
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call ``func`` with ``args`` and ``kwargs``, retrying it on a
+        ``TwilioRestException``, or connection error, with a status in the
+        ``retry_statuses`` keyword argument, ``RETRY_STATUSES`` by default.
+        """
+        retry_statuses = kwargs.pop('retry_statuses', RETRY_STATUSES)
+        timeout = self.get_setting('RETRY_TIMEOUT', 10)
+
+        if self.is_open():
+            with self._lock:
+                self.short_circuits = self.short_circuits + 1
+            raise CircuitOpen(
+                status=503, uri='', msg='Circuit breaker is open.'
+            )
+
+        with self._lock:
+            self.calls = self.calls + 1
+
+        with instrumentation.measure(self.get_name(func)):
+            start = time.time()
+            retries = 0
+            while True:
+                try:
+                    result = func(*args, **kwargs)
+                except (TwilioRestException, ) + CONNECTION_EXCEPTIONS as e:
+                    sleep = self.get_sleep(retries)
+                    if (retries < self.get_max_retries(e) and
+                            self.is_retryable(e, retry_statuses) and
+                            time.time() + sleep - start <= timeout and
+                            self.use_budget()):
+                        with self._lock:
+                            self.retries = self.retries + 1
+                            self.slept = self.slept + sleep
+                        instrumentation.retry()
+                        time.sleep(sleep)
+                        retries = retries + 1
+                    else:
+                        if self.get_status(e) in RETRY_STATUSES:
+                            self.record_failure()
+                        raise
+                else:
+                    self.record_success()
+                    return result
+
+    def iter(self, resource, **params):
+        """
+        Yield the instances of the twilio list ``resource`` matching
+        ``params``, like its ``iter``, fetching each page through ``call``
+        so a failed page is retried rather than ending the iteration.
+        """
+        params = transform_params(params)
+        while True:
+            resp, page = self.call(
+                resource.request, 'GET', resource.uri, params=params
+            )
+            for data in page.get(resource.key, []):
+                yield resource.load_instance(data)
+
+            if not page.get('next_page_uri'):
+                return
+            params.update(parse_qs(urlparse(page['next_page_uri']).query))
+
+    def get_name(self, func):
+        """
+        Return the instrumentation name of a call to ``func``, such as
+        ``twilio.messages.create``.
+        """
+        name = getattr(func, '__name__', 'call')
+        owner = getattr(func, '__self__', None)
+        if owner is None:
+            return 'twilio.{}'.format(name)
+        return 'twilio.{}.{}'.format(owner.__class__.__name__.lower(), name)
+
+    def reset(self):
+        with self._lock:
+            self._retries.clear()
+            self._consecutive_failures = 0
+            self._open_until = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = 0
+            self.retries = 0
+            self.slept = 0
+            self.failures = 0
+            self.short_circuits = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'retries': self.retries,
+                'slept': self.slept,
+                'failures': self.failures,
+                'short_circuits': self.short_circuits,
+            }
+
+
+class RateLimiter(object):
+    """
+    Space calls made through ``wait`` at least ``1 / rate`` seconds apart,
+    across threads, to stay under an API rate limit. A ``rate`` of ``None``
+    does not limit.
+    """
+
+    def __init__(self, rate=None):
+        self.interval = 1.0 / rate if rate else 0
+        self._lock = threading.Lock()
+        self._next = 0
+
+    def wait(self):
+        if not self.interval:
+            return
+
+        with self._lock:
+            now = time.time()
+            sleep = self._next - now
+            self._next = max(now, self._next) + self.interval
+
+        if sleep > 0:
+            time.sleep(sleep)
+
+
+retry_policy = RetryPolicy()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import re
+import threading
+import time
+
+from django.conf import settings
+
+
+class ActionRouter(object):
+    """
+    An in memory routing table of the active ``Action`` objects and their
+    active ``Response``, built once per process so resolving the action of an
+    inbound message does not query the database. The table is invalidated
+    when an ``Action`` or ``Response`` is saved or deleted, and rebuilt after
+    ``DJANGO_TWILIO_SMS_ACTION_ROUTER_TIMEOUT`` seconds to pick up changes
+    made by other processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._table = None
+
+    def build(self):
+        # imported here as the models use the router
+        from .models import Action, Response
+
+        responses = dict(
+            (response.action_id, response) for response in
+            Response.objects.filter(active=True, action__active=True)
+        )
+        routes = {}
+        for action in Action.objects.filter(active=True):
+            routes[action.name] = (action, responses.get(action.pk))
+
+        names = sorted(routes, key=len, reverse=True)
+        prefix = re.compile(r'^({})(?:\s|$)'.format(
+            '|'.join(re.escape(name) for name in names)
+        )) if names else None
+
+        return {
+            'routes': routes,
+            'prefix': prefix,
+            'built': time.time(),
+        }
+
+    def get_table(self):
+        timeout = getattr(
+            settings, 'DJANGO_TWILIO_SMS_ACTION_ROUTER_TIMEOUT', 60
+        )
+        table = self._table
+        expired = (
+            table is not None and timeout is not None and
+            time.time() - table['built'] >= timeout
+        )
+        if table is None or expired:
+            with self._lock:
+                table = self._table = self.build()
+        return table
+
+    def invalidate(self):
+        self._table = None
+
+    def match(self, message_body):
+        """
+        Return the name of the action matching ``message_body``, trying an
+        exact match first and then ``DJANGO_TWILIO_SMS_ACTION_MATCH``, which
+        is one of ``'exact'``, ``'first_word'`` or ``'prefix'``.
+        """
+        table = self.get_table()
+        body = message_body.strip().upper()
+        if body in table['routes']:
+            return body
+
+        match = getattr(settings, 'DJANGO_TWILIO_SMS_ACTION_MATCH', 'exact')
+        if match == 'first_word' and body:
+            first_word = body.split()[0]
+            if first_word in table['routes']:
+                return first_word
+        elif match == 'prefix' and table['prefix']:
+            prefix = table['prefix'].match(body)
+            if prefix:
+                return prefix.group(1)
+
+        return 'UNKNOWN'
+
+    def get_action(self, message_body):
+        from .models import Action
+
+        try:
+            return self.get_table()['routes'][self.match(message_body)][0]
+        except KeyError:
+            raise Action.DoesNotExist(
+                'Action matching query does not exist.'
+            )
+
+    def get_active_response(self, action):
+        """
+        Return the active ``Response`` of ``action`` from the routing table,
+        or ``None`` when the action is not routed.
+        """
+        route = self.get_table()['routes'].get(action.name)
+        if route and route[0].pk == action.pk:
+            return route[1]
+
+
+action_router = ActionRouter()
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+import time
+
+from collections import deque, OrderedDict
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Message
+
+
+class TokenBucket(object):
+    """
+    Allow ``rate`` sends a second on average, with bursts of up to
+    ``capacity`` sends. Not thread safe, the scheduler guards its buckets.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = capacity or max(1, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.time()
+
+    def take(self):
+        """
+        Take a token, returning ``0``, or the seconds until one will be
+        available when the bucket is empty.
+        """
+        now = time.time()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens = self.tokens - 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class SendRequest(object):
+
+    def __init__(self, body, to, from_, messaging_service_sid=None,
+                 campaign=None):
+        self.body = body
+        self.to = to
+        self.from_ = from_
+        self.messaging_service_sid = messaging_service_sid
+        self.campaign = campaign
+        self.sender = None
+        self.message = None
+        self.exception = None
+        self._done = threading.Event()
+
+    def send(self):
+        return Message.get_or_create(message=Message.create_twilio_message(
+            self.body, self.to, self.from_, self.messaging_service_sid
+        ))[0]
+
+    def finish(self, message=None, exception=None):
+        self.message = message
+        self.exception = exception
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the request to be sent and return its ``Message``, raising
+        the exception the send failed with.
+        """
+        self._done.wait(timeout)
+        if self.exception:
+            raise self.exception
+        return self.message
+
+
+class QueuedSendRequest(SendRequest):
+    """
+    A request to send a ``QueuedMessage`` claimed by a dispatcher.
+    """
+
+    def __init__(self, queued_message):
+        super(QueuedSendRequest, self).__init__(
+            queued_message.body, queued_message.recipient,
+            queued_message.sender,
+            queued_message.messaging_service_sid or None,
+            queued_message.campaign or None
+        )
+        self.queued_message = queued_message
+
+    def send(self):
+        return self.queued_message.send(self.from_)
+
+    def finish(self, message=None, exception=None):
+        if exception:
+            self.queued_message.mark_failed(exception)
+        super(QueuedSendRequest, self).finish(message, exception)
+
+
+class SendScheduler(object):
+    """
+    Pace outbound messages to the throughput twilio allows each sender. A
+    sender is a phone number, or a messaging service when the message is
+    sent through one, and gets a token bucket of
+    ``DJANGO_TWILIO_SMS_SEND_RATES[sender]`` sends a second, or
+    ``DJANGO_TWILIO_SMS_SEND_RATE``, within this process only. Messages
+    queued for a sender are sent in turn across campaigns, so one large
+    campaign does not hold up the others. Sending from the name of a pool in
+    ``DJANGO_TWILIO_SMS_SENDER_POOLS`` sends from whichever number of the
+    pool has capacity first.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._queues = OrderedDict()
+        self._buckets = {}
+        self._stopped = False
+        self.reset_stats()
+
+    def get_setting(self, name, default):
+        return getattr(settings, 'DJANGO_TWILIO_SMS_' + name, default)
+
+    def get_bucket(self, sender):
+        if sender not in self._buckets:
+            rate = self.get_setting('SEND_RATES', {}).get(
+                sender, self.get_setting('SEND_RATE', 1)
+            )
+            self._buckets[sender] = TokenBucket(rate)
+        return self._buckets[sender]
+
+    def get_batch_limit(self, seconds):
+        """
+        Return the number of messages the slowest sender can send in
+        ``seconds``, at least one.
+        """
+        rates = [self.get_setting('SEND_RATE', 1)] + list(
+            self.get_setting('SEND_RATES', {}).values()
+        )
+        return max(1, int(min(rates) * seconds))
+
+    def get_senders(self, key):
+        return self.get_setting('SENDER_POOLS', {}).get(key, [key])
+
+    def submit(self, body, to, from_=None, messaging_service_sid=None,
+               campaign=None):
+        """
+        Queue a message, returning a ``SendRequest`` to ``wait`` on.
+        """
+        from_ = '{}'.format(from_ or settings.TWILIO_DEFAULT_CALLERID)
+        return self.submit_request(SendRequest(
+            body, to, from_, messaging_service_sid, campaign
+        ))
+
+    def submit_request(self, request):
+        key = request.messaging_service_sid or request.from_
+        campaign = request.campaign
+
+        with self._condition:
+            campaigns = self._queues.setdefault(key, OrderedDict())
+            campaigns.setdefault(campaign, deque()).append(request)
+            self._condition.notify()
+        return request
+
+    def _pop(self, key):
+        campaigns = self._queues[key]
+        campaign, requests = campaigns.popitem(last=False)
+        request = requests.popleft()
+        if requests:
+            # the campaign goes to the back of the line
+            campaigns[campaign] = requests
+        if not campaigns:
+            del self._queues[key]
+        return request
+
+    def get_next(self, block=True):
+        """
+        Return the next request a sender has capacity for, waiting for
+        capacity as needed. Returns ``None`` once the queue is empty, or
+        when blocking, once the scheduler is stopped.
+        """
+        with self._condition:
+            while not self._stopped:
+                if not self._queues:
+                    if not block:
+                        return None
+                    self._condition.wait()
+                    continue
+
+                wait = None
+                for key in list(self._queues):
+                    for sender in self.get_senders(key):
+                        delay = self.get_bucket(sender).take()
+                        if not delay:
+                            request = self._pop(key)
+                            request.sender = sender
+                            if sender != request.messaging_service_sid:
+                                request.from_ = sender
+                            return request
+                        wait = delay if wait is None else min(wait, delay)
+
+                self._condition.wait(wait)
+
+    def send(self, request):
+        try:
+            message = request.send()
+        except Exception as e:
+            self.record(request.sender, False)
+            request.finish(exception=e)
+        else:
+            self.record(request.sender, True)
+            request.finish(message=message)
+
+    def dispatch(self, concurrency=1, block=False):
+        """
+        Send queued messages with ``concurrency`` threads until the queue
+        is empty, or when ``block`` is set, until ``stop`` is called.
+        """
+        def work(threaded):
+            try:
+                while True:
+                    request = self.get_next(block)
+                    if request is None:
+                        return
+                    self.send(request)
+            finally:
+                if threaded:
+                    connection.close()
+
+        with self._condition:
+            self._stopped = False
+
+        if concurrency > 1:
+            pool = ThreadPool(concurrency)
+            try:
+                pool.map(work, [True] * concurrency)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            work(False)
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def record(self, sender, sent):
+        window = self.get_setting('SEND_RATE_WINDOW', 60)
+        now = time.time()
+        with self._condition:
+            stats = self._stats.setdefault(sender, {
+                'sent': 0, 'failed': 0, 'times': deque()
+            })
+            if sent:
+                stats['sent'] = stats['sent'] + 1
+                stats['times'].append(now)
+            else:
+                stats['failed'] = stats['failed'] + 1
+            while stats['times'] and stats['times'][0] <= now - window:
+                stats['times'].popleft()
+
+    def reset(self):
+        with self._condition:
+            self._buckets.clear()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._condition:
+            self._stats = {}
+
+    def stats(self):
+        """
+        Return the messages sent and failed per sender, and the rate each
+        sender sent at over the last ``DJANGO_TWILIO_SMS_SEND_RATE_WINDOW``
+        seconds.
+        """
+        window = self.get_setting('SEND_RATE_WINDOW', 60)
+        now = time.time()
+        with self._condition:
+            return dict(
+                (sender, {
+                    'sent': stats['sent'],
+                    'failed': stats['failed'],
+                    'rate': float(len([
+                        sent for sent in stats['times']
+                        if sent > now - window
+                    ])) / window,
+                }) for sender, stats in self._stats.items()
+            )
+
+    def queued(self):
+        with self._condition:
+            return dict(
+                (key, sum(len(requests) for requests in campaigns.values()))
+                for key, campaigns in self._queues.items()
+            )
+
+
+send_scheduler = SendScheduler()
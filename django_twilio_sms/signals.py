@@ -1,7 +1,256 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+import weakref
+
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+from django.db import connection
 from django.dispatch import Signal
+from django.utils import six
+
+from .utils import on_commit
+
+if six.PY2:
+    from django.dispatch.weakref_backports import WeakMethod
+else:
+    from weakref import WeakMethod
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReceiverPool(object):
+    """
+    A pool of ``DJANGO_TWILIO_SMS_SIGNAL_WORKERS`` threads calling the async
+    receivers of the package's signals. At most
+    ``DJANGO_TWILIO_SMS_SIGNAL_QUEUE_SIZE`` calls wait for a thread, a call
+    made while the queue is full runs in the sending thread instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._pool = None
+        self._pending = 0
+
+    def get_setting(self, name, default):
+        return getattr(settings, 'DJANGO_TWILIO_SMS_' + name, default)
+
+    def get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPool(self.get_setting('SIGNAL_WORKERS', 4))
+            return self._pool
+
+    def submit(self, func, *args):
+        with self._lock:
+            full = self._pending >= self.get_setting(
+                'SIGNAL_QUEUE_SIZE', 1000
+            )
+            if not full:
+                self._pending = self._pending + 1
+
+        if full:
+            func(*args)
+        else:
+            self.get_pool().apply_async(self.run, (func, ) + args)
+
+    def run(self, func, *args):
+        try:
+            func(*args)
+        finally:
+            connection.close()
+            with self._lock:
+                self._pending = self._pending - 1
+                self._lock.notify_all()
+
+    def wait(self, timeout=None):
+        """
+        Wait until the submitted calls have run, returning whether they have.
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self._lock:
+            while self._pending:
+                remaining = None if end is None else end - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+        return True
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+receiver_pool = ReceiverPool()
+
+
+class Receiver(object):
+    """
+    The receiver connected to an ``AsyncSignal`` in place of ``receiver``,
+    calling it in the sending thread or deferring it to the
+    ``receiver_pool``. A weakly referenced ``receiver`` is disconnected once
+    it is garbage collected.
+    """
+
+    def __init__(self, signal, receiver, sender, dispatch_uid, weak,
+                 run_async):
+        self.signal = signal
+        self.sender = sender
+        self.dispatch_uid = dispatch_uid
+        self.run_async = run_async
+
+        if not weak:
+            self.receiver = lambda: receiver
+        elif hasattr(receiver, '__self__') and hasattr(receiver, '__func__'):
+            self.receiver = WeakMethod(receiver, self.remove)
+        else:
+            self.receiver = weakref.ref(receiver, self.remove)
+
+    def __call__(self, signal, sender, **named):
+        receiver = self.receiver()
+        if receiver is None:
+            return None
+
+        if self.run_async:
+            self.signal.defer(receiver, sender, named)
+            return None
+        return self.signal.call(receiver, sender, named)
+
+    def remove(self, ref):
+        self.signal.disconnect(
+            sender=self.sender, dispatch_uid=self.dispatch_uid
+        )
+
+
+class AsyncSignal(Signal):
+    """
+    A signal whose receivers can be connected with ``run_async=True``, to be
+    called on the ``receiver_pool`` once the sending transaction commits
+    instead of in the sending thread, their response is ``None``. Other
+    receivers are called as with a ``Signal``. The calls of each receiver are
+    timed, see ``get_stats``, and receivers slower than
+    ``DJANGO_TWILIO_SMS_SIGNAL_SLOW_RECEIVER`` seconds are logged.
+    """
+
+    def __init__(self, providing_args=None, use_caching=False):
+        super(AsyncSignal, self).__init__(providing_args, use_caching)
+        self.wrappers = {}
+        self._wrappers_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def get_dispatch_uid(self, receiver):
+        if hasattr(receiver, '__self__') and hasattr(receiver, '__func__'):
+            return (__name__, id(receiver.__self__), id(receiver.__func__))
+        return (__name__, id(receiver))
+
+    def connect(self, receiver, sender=None, weak=True, dispatch_uid=None,
+                run_async=False):
+        """
+        Connect ``receiver`` through a ``Receiver`` wrapping it, replacing
+        the one connected with the same ``receiver`` and ``sender``.
+        """
+        if dispatch_uid is None:
+            dispatch_uid = self.get_dispatch_uid(receiver)
+
+        self.disconnect(sender=sender, dispatch_uid=dispatch_uid)
+        wrapper = Receiver(
+            self, receiver, sender, dispatch_uid, weak, run_async
+        )
+        with self._wrappers_lock:
+            self.wrappers[(dispatch_uid, id(sender))] = wrapper
+        super(AsyncSignal, self).connect(
+            wrapper, sender, weak=False, dispatch_uid=dispatch_uid
+        )
+
+    def disconnect(self, receiver=None, sender=None, dispatch_uid=None):
+        if dispatch_uid is None:
+            dispatch_uid = self.get_dispatch_uid(receiver)
+
+        with self._wrappers_lock:
+            self.wrappers.pop((dispatch_uid, id(sender)), None)
+        return super(AsyncSignal, self).disconnect(
+            sender=sender, dispatch_uid=dispatch_uid
+        )
+
+    def is_async(self, receiver, sender=None):
+        with self._wrappers_lock:
+            wrapper = self.wrappers.get(
+                (self.get_dispatch_uid(receiver), id(sender))
+            )
+        return wrapper is not None and wrapper.run_async
+
+    def get_name(self, receiver):
+        name = getattr(
+            receiver, '__qualname__', getattr(receiver, '__name__', None)
+        )
+        return '{}.{}'.format(
+            receiver.__module__, name or receiver.__class__.__name__
+        )
+
+    def call(self, receiver, sender, named):
+        start = time.time()
+        try:
+            response = receiver(signal=self, sender=sender, **named)
+        except Exception:
+            self.record(receiver, time.time() - start, True)
+            raise
+        self.record(receiver, time.time() - start, False)
+        return response
+
+    def call_async(self, receiver, sender, named):
+        try:
+            self.call(receiver, sender, named)
+        except Exception:
+            logger.exception(
+                'Async receiver %s failed', self.get_name(receiver)
+            )
+
+    def defer(self, receiver, sender, named):
+        on_commit(lambda: receiver_pool.submit(
+            self.call_async, receiver, sender, named
+        ))
+
+    def record(self, receiver, duration, failed):
+        name = self.get_name(receiver)
+        with self._stats_lock:
+            stats = self._stats.setdefault(name, {
+                'calls': 0, 'failed': 0, 'time': 0.0, 'max': 0.0
+            })
+            stats['calls'] = stats['calls'] + 1
+            stats['time'] = stats['time'] + duration
+            stats['max'] = max(stats['max'], duration)
+            if failed:
+                stats['failed'] = stats['failed'] + 1
+
+        slow = getattr(settings, 'DJANGO_TWILIO_SMS_SIGNAL_SLOW_RECEIVER', 0.5)
+        if slow is not None and duration > slow:
+            logger.warning('Slow receiver %s took %.3fs', name, duration)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {}
+
+    def get_stats(self):
+        """
+        Return the calls, failed calls, total and longest time in seconds of
+        each receiver, keyed by the dotted path of the receiver.
+        """
+        with self._stats_lock:
+            return dict(
+                (name, dict(stats)) for name, stats in self._stats.items()
+            )
 
 
-response_message = Signal(providing_args=['action', 'message'])
+response_message = AsyncSignal(providing_args=['action', 'message'])
 
 
-unsubscribe_signal = Signal(providing_args=['message', 'unsubscribed'])
+unsubscribe_signal = AsyncSignal(providing_args=['message', 'unsubscribed'])
@@ -1,25 +1,50 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+from datetime import datetime, time
+
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.core.urlresolvers import reverse
+from django.db import transaction
+from django.utils import timezone
 
 
 class AbsoluteURI(object):
+    """
+    Build the absolute uri of a url of the package. The uri only changes
+    with the settings, so it is resolved once per process and cached until
+    ``clear_cache`` is called, which happens when a setting changes.
+    ``host`` overrides ``DJANGO_TWILIO_SMS_SITE_HOST``.
+    """
+
+    _cache = {}
 
-    def __init__(self, namespace, url_name):
+    def __init__(self, namespace, url_name, host=None):
         self.namespace = namespace
         self.url_name = url_name
+        self.host = host
+
+    @classmethod
+    def clear_cache(cls):
+        cls._cache.clear()
 
     def get_absolute_uri(self):
-        return '{scheme}://{host}{path}'.format(
-            scheme=self.get_scheme(),
-            host=self.get_host(),
-            path=self.get_path()
-        )
+        key = (self.namespace, self.url_name, self.host)
+        absolute_uri = self._cache.get(key)
+        if absolute_uri is None:
+            absolute_uri = '{scheme}://{host}{path}'.format(
+                scheme=self.get_scheme(),
+                host=self.get_host(),
+                path=self.get_path()
+            )
+            self._cache[key] = absolute_uri
+        return absolute_uri
 
     def get_host(self):
+        if self.host:
+            return self.host
+
         try:
             return settings.DJANGO_TWILIO_SMS_SITE_HOST
         except AttributeError:
@@ -36,3 +61,38 @@ class AbsoluteURI(object):
             return 'https'
         else:
             return 'http'
+
+
+def get_day_start(date):
+    """
+    Return the datetime ``date`` starts at in the current time zone.
+    """
+    day_start = datetime.combine(date, time.min)
+    if settings.USE_TZ:
+        day_start = timezone.make_aware(
+            day_start, timezone.get_current_timezone()
+        )
+    return day_start
+
+
+def get_local_date(value):
+    """
+    Return the day ``value`` falls on in the current time zone.
+    """
+    if not isinstance(value, datetime):
+        return value
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date()
+
+
+def on_commit(func, using=None):
+    """
+    Call ``func`` once the transaction open on ``using`` commits, straight
+    away outside of one. Django 1.8 has no ``transaction.on_commit``, there
+    ``func`` is always called straight away.
+    """
+    if hasattr(transaction, 'on_commit'):
+        transaction.on_commit(func, using=using)
+    else:
+        func()
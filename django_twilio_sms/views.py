@@ -7,7 +7,8 @@ from django_twilio.decorators import twilio_view
 from django_twilio.request import decompose
 from twilio import twiml
 
-from .models import Message
+from . import queue
+from .models import Message, WebhookEvent
 
 
 @twilio_view
@@ -15,7 +16,10 @@ def callback_view(request):
     response = twiml.Response()
     twilio_request = decompose(request)
 
-    message_view(twilio_request)
+    if queue.is_enabled():
+        enqueue(request, WebhookEvent.CALLBACK)
+    else:
+        message_view(twilio_request)
 
     return response
 
@@ -26,21 +30,36 @@ def inbound_view(request):
     twilio_request = decompose(request)
 
     if twilio_request.type == 'message':
-        message_obj = message_view(twilio_request)
-        if (getattr(settings, 'DJANGO_TWILIO_SMS_RESPONSE_MESSAGE', False) or
-                getattr(settings, 'DJANGO_TWILIO_RESPONSE_MESSAGE', False)):
-            message_obj.send_response_message()
+        if queue.is_enabled():
+            enqueue(request, WebhookEvent.INBOUND)
+        else:
+            inbound_message_view(twilio_request)
     else:
         response = voice_view(response)
 
     return response
 
 
-def message_view(twilio_request):
-    message_obj, created = Message.get_or_create(twilio_request.messagesid)
-    if not created:
-        message_obj.sync_twilio_message()
+def enqueue(request, view):
+    if request.method == 'POST':
+        parameters = request.POST.dict()
+    else:
+        parameters = request.GET.dict()
+
+    queue.get_backend().enqueue(view, parameters)
+
 
+def inbound_message_view(twilio_request):
+    message_obj = message_view(twilio_request)
+    if (getattr(settings, 'DJANGO_TWILIO_SMS_RESPONSE_MESSAGE', False) or
+            getattr(settings, 'DJANGO_TWILIO_RESPONSE_MESSAGE', False)):
+        message_obj.send_response_message()
+
+    return message_obj
+
+
+def message_view(twilio_request):
+    message_obj, created = Message.get_or_create_from_request(twilio_request)
     return message_obj
 
 
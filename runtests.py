@@ -1,3 +1,4 @@
+import os
 import sys
 
 try:
@@ -9,7 +10,10 @@ try:
         USE_TZ=True,
         DATABASES={
             "default": {
-                "ENGINE": "django.db.backends.sqlite3",
+                "ENGINE": "django.db.backends." + os.environ.get(
+                    "DATABASE_ENGINE", "sqlite3"
+                ),
+                "NAME": os.environ.get("DATABASE_NAME", ""),
             }
         },
         ROOT_URLCONF="tests.urls",
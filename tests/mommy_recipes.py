@@ -1,3 +1,4 @@
+from django.utils import timezone
 from django_twilio.models import Caller
 from model_mommy.recipe import Recipe, seq
 
@@ -8,6 +9,7 @@ caller_recipe = Recipe(Caller, phone_number=seq('+1999999999'))
 phone_number_recipe = Recipe(PhoneNumber, caller=caller_recipe.make)
 message_recipe = Recipe(
     Message,
+    date_sent=timezone.now,
     from_phone_number=phone_number_recipe.make,
     to_phone_number=phone_number_recipe.make
 )
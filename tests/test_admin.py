@@ -0,0 +1,178 @@
+from django.contrib.admin.sites import AdminSite
+from django.test import override_settings, RequestFactory, TestCase
+
+from mock import patch
+from model_mommy import mommy
+
+from django_twilio_sms.admin import (
+    AccountAdmin,
+    ConversationAdmin,
+    EstimatedCountPaginator,
+    MessageAdmin
+)
+from django_twilio_sms.models import (
+    Account,
+    ApiVersion,
+    Conversation,
+    Currency,
+    Message
+)
+
+from .mommy_recipes import message_recipe, phone_number_recipe
+
+
+def make_messages(quantity):
+    return message_recipe.make(
+        account=mommy.make(Account),
+        api_version=mommy.make(ApiVersion),
+        currency=mommy.make(Currency),
+        _quantity=quantity
+    )
+
+
+class EstimatedCountPaginatorTest(TestCase):
+
+    def setUp(self):
+        super(EstimatedCountPaginatorTest, self).setUp()
+        make_messages(3)
+
+    def test_get_estimate_sqlite(self):
+        paginator = EstimatedCountPaginator(Message.objects.all(), 10)
+        self.assertEqual(None, paginator.get_estimate())
+
+    def test_count(self):
+        paginator = EstimatedCountPaginator(Message.objects.all(), 10)
+        self.assertEqual(3, paginator.count)
+
+    @override_settings(DJANGO_TWILIO_SMS_ADMIN_COUNT_LIMIT=2)
+    def test_count_limit(self):
+        paginator = EstimatedCountPaginator(Message.objects.all(), 1)
+        self.assertEqual(2, paginator.count)
+
+    @override_settings(DJANGO_TWILIO_SMS_ADMIN_COUNT_LIMIT=None)
+    def test_count_limit_none(self):
+        paginator = EstimatedCountPaginator(Message.objects.all(), 1)
+        self.assertEqual(3, paginator.count)
+
+    @override_settings(DJANGO_TWILIO_SMS_ADMIN_COUNT_LIMIT=2)
+    @patch.object(EstimatedCountPaginator, 'get_estimate')
+    def test_count_estimate(self, get_estimate):
+        get_estimate.return_value = 1000
+        paginator = EstimatedCountPaginator(Message.objects.all(), 10)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(1000, paginator.count)
+
+    @patch.object(EstimatedCountPaginator, 'get_estimate')
+    def test_count_estimate_under_limit(self, get_estimate):
+        get_estimate.return_value = 1
+        paginator = EstimatedCountPaginator(Message.objects.all(), 10)
+        self.assertEqual(3, paginator.count)
+
+    @override_settings(DJANGO_TWILIO_SMS_ADMIN_COUNT_LIMIT=2)
+    @patch.object(EstimatedCountPaginator, 'get_estimate')
+    def test_count_filtered(self, get_estimate):
+        paginator = EstimatedCountPaginator(
+            Message.objects.filter(pk__isnull=False), 10
+        )
+        self.assertEqual(2, paginator.count)
+        self.assertFalse(get_estimate.called)
+
+    def test_count_list(self):
+        paginator = EstimatedCountPaginator([1, 2, 3], 10)
+        self.assertEqual(3, paginator.count)
+
+
+class MessageAdminTest(TestCase):
+
+    def setUp(self):
+        super(MessageAdminTest, self).setUp()
+        self.model_admin = MessageAdmin(Message, AdminSite())
+        self.request = RequestFactory().get('/')
+
+    def test_get_actions_export_disabled(self):
+        actions = self.model_admin.get_actions(self.request)
+        self.assertNotIn('export_csv', actions)
+        self.assertNotIn('export_jsonl', actions)
+
+    @override_settings(DJANGO_TWILIO_SMS_ADMIN_EXPORT=True)
+    def test_get_actions(self):
+        actions = self.model_admin.get_actions(self.request)
+        self.assertIn('export_csv', actions)
+        self.assertIn('export_jsonl', actions)
+
+    def test_export_csv(self):
+        make_messages(3)
+        response = self.model_admin.export_csv(
+            self.request, Message.objects.all()
+        )
+
+        self.assertTrue(response.streaming)
+        self.assertEqual('text/csv', response['Content-Type'])
+        self.assertEqual(
+            'attachment; filename="messages.csv"',
+            response['Content-Disposition']
+        )
+        self.assertEqual(4, len(list(response.streaming_content)))
+
+    def test_export_jsonl(self):
+        make_messages(2)
+        response = self.model_admin.export_jsonl(
+            self.request, Message.objects.all()
+        )
+        self.assertEqual(2, len(list(response.streaming_content)))
+
+
+class ChangeListTest(TestCase):
+
+    def get_changelist(self, model_admin):
+        request = RequestFactory().get('/')
+        ChangeList = model_admin.get_changelist(request)
+        return ChangeList(
+            request, model_admin.model, model_admin.list_display,
+            model_admin.list_display_links, model_admin.list_filter,
+            model_admin.date_hierarchy, model_admin.search_fields,
+            model_admin.list_select_related, model_admin.list_per_page,
+            model_admin.list_max_show_all, model_admin.list_editable,
+            model_admin
+        )
+
+    def test_message_changelist_queries(self):
+        make_messages(5)
+        model_admin = MessageAdmin(Message, AdminSite())
+
+        # one paginator count and one page of results
+        with self.assertNumQueries(2):
+            changelist = self.get_changelist(model_admin)
+            for message in changelist.result_list:
+                '{} {}'.format(
+                    message.to_phone_number, message.from_phone_number
+                )
+
+        self.assertEqual(5, changelist.result_count)
+        self.assertEqual(None, changelist.full_result_count)
+
+    def test_account_changelist_queries(self):
+        owner = mommy.make(Account, sid='owner')
+        mommy.make(Account, owner_account_sid=owner, _quantity=3)
+        model_admin = AccountAdmin(Account, AdminSite())
+
+        with self.assertNumQueries(2):
+            changelist = self.get_changelist(model_admin)
+            for account in changelist.result_list:
+                '{}'.format(account.owner_account_sid)
+
+    def test_conversation_changelist_queries(self):
+        phone_number = phone_number_recipe.make()
+        for i in range(3):
+            Conversation.get_or_create(
+                phone_number, phone_number_recipe.make()
+            )
+        model_admin = ConversationAdmin(Conversation, AdminSite())
+
+        with self.assertNumQueries(2):
+            changelist = self.get_changelist(model_admin)
+            for conversation in changelist.result_list:
+                '{} {}'.format(
+                    conversation.phone_number_1, conversation.phone_number_2
+                )
@@ -0,0 +1,156 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from mock import Mock, patch
+from model_mommy import mommy
+
+from django_twilio_sms.backfill import backfill, backfill_date, iter_chunks
+from django_twilio_sms.models import Account, BackfillWindow, Message
+
+
+def mock_message(sid, to='+19999999992', from_='+19999999991'):
+    return Mock(
+        sid=sid,
+        date_sent=datetime.datetime(2016, 1, 1, tzinfo=timezone.utc),
+        account_sid='testaccount',
+        messaging_service_sid=None,
+        body='test',
+        num_media=0,
+        num_segments=1,
+        status='delivered',
+        error_code=None,
+        error_message=None,
+        direction='outbound-api',
+        price='-0.00750',
+        price_unit='USD',
+        api_version='2010-04-01',
+        from_=from_,
+        to=to,
+    )
+
+
+class BackfillWindowModelTest(TestCase):
+
+    def test_get_pending_dates(self):
+        mommy.make(
+            BackfillWindow, date=datetime.date(2016, 1, 2),
+            date_completed=timezone.now()
+        )
+        mommy.make(BackfillWindow, date=datetime.date(2016, 1, 3))
+
+        self.assertEqual(
+            [datetime.date(2016, 1, 1), datetime.date(2016, 1, 3)],
+            BackfillWindow.get_pending_dates(
+                datetime.date(2016, 1, 1), datetime.date(2016, 1, 3)
+            )
+        )
+
+    def test_complete(self):
+        window = mommy.make(BackfillWindow, date=datetime.date(2016, 1, 1))
+        window.complete(10)
+        window.refresh_from_db()
+        self.assertEqual(10, window.messages)
+        self.assertIsNotNone(window.date_completed)
+
+
+class BackfillTest(TestCase):
+
+    def setUp(self):
+        super(BackfillTest, self).setUp()
+        mommy.make(Account, sid='testaccount')
+
+    def test_iter_chunks(self):
+        self.assertEqual(
+            [[0, 1], [2, 3], [4]], list(iter_chunks(iter(range(5)), 2))
+        )
+
+    @patch('django_twilio_sms.backfill.retry_policy.iter')
+    @patch('django_twilio_sms.backfill.twilio_client')
+    def test_backfill_date(self, twilio_client, retry_iter):
+        retry_iter.return_value = iter([
+            mock_message('SM{}'.format(i), '+1999999999{}'.format(i))
+            for i in range(5)
+        ])
+
+        with patch.object(
+                Message, 'bulk_create_from_twilio',
+                wraps=Message.bulk_create_from_twilio) as bulk_create:
+            count = backfill_date(datetime.date(2016, 1, 1), batch_size=2)
+
+        self.assertEqual(5, count)
+        self.assertEqual(5, Message.objects.count())
+        self.assertEqual(3, bulk_create.call_count)
+        retry_iter.assert_called_once_with(
+            twilio_client.messages, date_sent='2016-01-01', page_size=2
+        )
+
+        window = BackfillWindow.objects.get()
+        self.assertEqual(5, window.messages)
+        self.assertIsNotNone(window.date_completed)
+
+    @patch('django_twilio_sms.backfill.retry_policy.iter')
+    def test_backfill_date_resumed(self, retry_iter):
+        retry_iter.return_value = iter([
+            mock_message('SM1'), mock_message('SM2')
+        ])
+        backfill_date(datetime.date(2016, 1, 1))
+
+        retry_iter.return_value = iter([
+            mock_message('SM1'), mock_message('SM2'), mock_message('SM3')
+        ])
+        self.assertEqual(3, backfill_date(datetime.date(2016, 1, 1)))
+        self.assertEqual(3, Message.objects.count())
+        self.assertEqual(1, BackfillWindow.objects.count())
+
+    @patch('django_twilio_sms.backfill.logger')
+    @patch('django_twilio_sms.backfill.retry_policy.iter')
+    def test_backfill_date_not_phone_number(self, retry_iter, logger):
+        retry_iter.return_value = iter([
+            mock_message('SM1'),
+            mock_message('SM2', from_='12345'),
+            mock_message('SM3', from_='ACME'),
+            mock_message('SM4', to='+19999999994'),
+        ])
+
+        self.assertEqual(2, backfill_date(datetime.date(2016, 1, 1)))
+        self.assertEqual(
+            ['SM1', 'SM4'],
+            list(Message.objects.order_by('sid').values_list('sid', flat=True))
+        )
+        self.assertEqual(2, logger.warning.call_count)
+        self.assertIsNotNone(BackfillWindow.objects.get().date_completed)
+
+    @patch('django_twilio_sms.backfill.backfill_date')
+    def test_backfill(self, backfill_date):
+        backfill_date.side_effect = [3, Exception('test')]
+        mommy.make(
+            BackfillWindow, date=datetime.date(2016, 1, 2),
+            date_completed=timezone.now()
+        )
+
+        results = list(backfill(
+            datetime.date(2016, 1, 1), datetime.date(2016, 1, 3)
+        ))
+
+        self.assertEqual(
+            [datetime.date(2016, 1, 1), datetime.date(2016, 1, 3)],
+            [result[0] for result in results]
+        )
+        self.assertEqual(3, results[0][1])
+        self.assertEqual('test', str(results[1][2]))
+
+    @patch('django_twilio_sms.backfill.backfill_date')
+    def test_backfill_workers(self, backfill_date):
+        backfill_date.return_value = 1
+
+        results = list(backfill(
+            datetime.date(2016, 1, 1), datetime.date(2016, 1, 4), workers=2
+        ))
+
+        self.assertEqual(4, backfill_date.call_count)
+        self.assertEqual(
+            [datetime.date(2016, 1, day) for day in range(1, 5)],
+            sorted(result[0] for result in results)
+        )
@@ -0,0 +1,180 @@
+from django.core.cache import caches
+from django.db import transaction
+from django.test import override_settings, TransactionTestCase
+
+from mock import Mock, patch
+from model_mommy import mommy
+
+from django_twilio_sms.cache import LookupCache, lookup_cache
+from django_twilio_sms.models import Account, Currency, Error
+
+
+@override_settings(DJANGO_TWILIO_SMS_LOOKUP_CACHE=True)
+class LookupCacheTest(TransactionTestCase):
+
+    def setUp(self):
+        super(LookupCacheTest, self).setUp()
+        self.cache = LookupCache()
+
+    def test_get_or_create_miss(self):
+        currency = Currency(code='USD')
+        create = Mock(return_value=currency)
+        self.assertEqual(
+            currency, self.cache.get_or_create(Currency, 'USD', create)
+        )
+        self.assertEqual(1, create.call_count)
+        self.assertEqual(
+            {'size': 1, 'hits': 0, 'misses': 1}, self.cache.stats()
+        )
+
+    def test_get_or_create_hit(self):
+        currency = Currency(code='USD')
+        create = Mock(return_value=currency)
+        self.cache.get_or_create(Currency, 'USD', create)
+        self.assertEqual(
+            currency, self.cache.get_or_create(Currency, 'USD', create)
+        )
+        self.assertEqual(1, create.call_count)
+        self.assertEqual(
+            {'size': 1, 'hits': 1, 'misses': 1}, self.cache.stats()
+        )
+
+    def test_get_or_create_in_transaction(self):
+        currency = Currency(code='USD')
+        with transaction.atomic():
+            self.cache.get_or_create(
+                Currency, 'USD', Mock(return_value=currency)
+            )
+            self.assertEqual(0, self.cache.stats()['size'])
+        self.assertEqual(1, self.cache.stats()['size'])
+
+    def test_get_or_create_rolled_back(self):
+        try:
+            with transaction.atomic():
+                self.cache.get_or_create(
+                    Currency, 'USD', Mock(return_value=Currency(code='USD'))
+                )
+                raise ValueError('test')
+        except ValueError:
+            pass
+        self.assertEqual(0, self.cache.stats()['size'])
+
+    @override_settings(DJANGO_TWILIO_SMS_LOOKUP_CACHE=False)
+    def test_get_or_create_not_enabled(self):
+        create = Mock(return_value=Currency(code='USD'))
+        self.cache.get_or_create(Currency, 'USD', create)
+        self.cache.get_or_create(Currency, 'USD', create)
+        self.assertEqual(2, create.call_count)
+        self.assertEqual(
+            {'size': 0, 'hits': 0, 'misses': 0}, self.cache.stats()
+        )
+
+    @override_settings(DJANGO_TWILIO_SMS_LOOKUP_CACHE_SIZE=2)
+    def test_get_or_create_max_size(self):
+        for code in ['USD', 'EUR', 'GBP']:
+            self.cache.get_or_create(
+                Currency, code, Mock(return_value=Currency(code=code))
+            )
+        self.assertEqual(2, self.cache.stats()['size'])
+        create = Mock(return_value=Currency(code='USD'))
+        self.cache.get_or_create(Currency, 'USD', create)
+        self.assertEqual(1, create.call_count)
+
+    @override_settings(
+        DJANGO_TWILIO_SMS_LOOKUP_CACHE_ALIAS='default',
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        }}
+    )
+    def test_get_or_create_shared_cache(self):
+        currency = Currency.objects.create(code='USD')
+        self.cache.get_or_create(Currency, 'USD', Mock(return_value=currency))
+        self.assertEqual(
+            currency,
+            caches['default'].get(self.cache.get_key(Currency, 'USD'))
+        )
+
+        other_cache = LookupCache()
+        create = Mock()
+        self.assertEqual(
+            currency, other_cache.get_or_create(Currency, 'USD', create)
+        )
+        self.assertFalse(create.called)
+        self.assertEqual(1, other_cache.stats()['hits'])
+        caches['default'].clear()
+
+    def test_invalidate(self):
+        self.cache.get_or_create(
+            Currency, 'USD', Mock(return_value=Currency(code='USD'))
+        )
+        self.cache.invalidate(Currency, 'USD')
+        create = Mock(return_value=Currency(code='USD'))
+        self.cache.get_or_create(Currency, 'USD', create)
+        self.assertEqual(1, create.call_count)
+
+    @override_settings(DJANGO_TWILIO_SMS_LOOKUP_CACHE=False)
+    @patch('django_twilio_sms.cache.on_commit')
+    def test_invalidate_not_enabled(self, on_commit):
+        self.cache.invalidate(Currency, 'USD')
+        self.assertFalse(on_commit.called)
+
+    def test_clear(self):
+        self.cache.get_or_create(
+            Currency, 'USD', Mock(return_value=Currency(code='USD'))
+        )
+        self.cache.clear()
+        self.assertEqual(
+            {'size': 0, 'hits': 0, 'misses': 0}, self.cache.stats()
+        )
+
+
+@override_settings(DJANGO_TWILIO_SMS_LOOKUP_CACHE=True)
+class LookupCacheModelTest(TransactionTestCase):
+
+    def tearDown(self):
+        super(LookupCacheModelTest, self).tearDown()
+        lookup_cache.clear()
+
+    def test_get_or_create_cached(self):
+        currency = Currency.get_or_create('USD')
+        with self.assertNumQueries(0):
+            self.assertEqual(currency, Currency.get_or_create('USD'))
+
+    def test_account_get_or_create_not_synced_when_cached(self):
+        account = mommy.make(Account, sid='test')
+        Account.get_or_create('test')
+        with self.assertNumQueries(0):
+            self.assertEqual(account, Account.get_or_create('test'))
+
+    def test_post_save_updates_cache(self):
+        error = Error.get_or_create('30003', 'test')
+        error.message = 'updated'
+        error.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                'updated', Error.get_or_create('30003', '').message
+            )
+
+    def test_post_save_rolled_back(self):
+        try:
+            with transaction.atomic():
+                Currency.get_or_create('USD')
+                raise ValueError('test')
+        except ValueError:
+            pass
+        self.assertFalse(Currency.objects.exists())
+        Currency.get_or_create('USD')
+        self.assertEqual(1, Currency.objects.all().count())
+
+    def test_post_delete_in_transaction_invalidates_cache(self):
+        with transaction.atomic():
+            currency = Currency.get_or_create('USD')
+            currency.save()
+            currency.delete()
+        Currency.get_or_create('USD')
+        self.assertEqual(1, Currency.objects.all().count())
+
+    def test_post_delete_invalidates_cache(self):
+        Currency.get_or_create('USD').delete()
+        Currency.get_or_create('USD')
+        self.assertEqual(1, Currency.objects.all().count())
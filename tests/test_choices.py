@@ -0,0 +1,28 @@
+from django.test import TestCase
+
+from django_twilio_sms.choices import ChoiceMap
+
+
+class ChoiceMapTest(TestCase):
+
+    def setUp(self):
+        super(ChoiceMapTest, self).setUp()
+        self.choice_map = ChoiceMap(((0, 'zero'), (1, 'one')), default=-1)
+
+    def test_get_value(self):
+        self.assertEqual(0, self.choice_map.get_value('zero'))
+        self.assertEqual(1, self.choice_map.get_value('one'))
+        self.assertFalse(self.choice_map.unknown)
+
+    def test_get_value_unknown(self):
+        self.assertEqual(-1, self.choice_map.get_value('two'))
+        self.assertEqual(-1, self.choice_map.get_value('two'))
+        self.assertEqual({'two': 2}, dict(self.choice_map.unknown))
+
+    def test_get_value_unknown_no_default(self):
+        choice_map = ChoiceMap(((0, 'zero'), ))
+        self.assertEqual(None, choice_map.get_value('one'))
+
+    def test_get_display(self):
+        self.assertEqual('one', self.choice_map.get_display(1))
+        self.assertEqual(None, self.choice_map.get_display(2))
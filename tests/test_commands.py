@@ -1,11 +1,21 @@
+import datetime
+
 from django.conf import settings
-from django.core.management import call_command
+from django.core.management import call_command, CommandError
 from django.test import override_settings, TestCase
+from django.utils import timezone
 from django.utils.six import StringIO
 
+from mock import Mock, patch
 from model_mommy import mommy
 
-from django_twilio_sms.models import Action, Response
+from django_twilio_sms.models import (
+    Action,
+    IdempotencyKey,
+    QueuedMessage,
+    Response,
+    WebhookEvent
+)
 
 
 class SyncResponsesCommandTest(TestCase):
@@ -52,3 +62,215 @@ class SyncResponsesCommandTest(TestCase):
         self.assertNotIn(
             'All saved responses have been deleted.', self.out.getvalue()
         )
+
+
+class ProcessWebhooksCommandTest(TestCase):
+
+    def setUp(self):
+        super(ProcessWebhooksCommandTest, self).setUp()
+        self.out = StringIO()
+
+    @patch('django_twilio_sms.views.message_view')
+    def test_handle(self, message_view):
+        for i in range(3):
+            WebhookEvent.enqueue(WebhookEvent.CALLBACK, {'MessageSid': i})
+        call_command('process_webhooks', batch_size=2, stdout=self.out)
+
+        self.assertEqual(3, message_view.call_count)
+        self.assertIn('PROCESSED: 2 FAILED: 0', self.out.getvalue())
+        self.assertIn('PROCESSED: 1 FAILED: 0', self.out.getvalue())
+        self.assertEqual(
+            0, WebhookEvent.objects.exclude(
+                status=WebhookEvent.PROCESSED
+            ).count()
+        )
+
+    def test_handle_empty(self):
+        call_command('process_webhooks', stdout=self.out)
+        self.assertEqual('', self.out.getvalue())
+
+    def test_handle_stats(self):
+        WebhookEvent.enqueue(WebhookEvent.CALLBACK, {})
+        call_command('process_webhooks', stats=True, stdout=self.out)
+        self.assertIn('pending: 1', self.out.getvalue())
+        self.assertEqual(
+            1, WebhookEvent.objects.filter(
+                status=WebhookEvent.PENDING
+            ).count()
+        )
+
+
+class DispatchMessagesCommandTest(TestCase):
+
+    def setUp(self):
+        super(DispatchMessagesCommandTest, self).setUp()
+        self.out = StringIO()
+
+    @patch('django_twilio_sms.models.QueuedMessage.send')
+    def test_handle(self, send):
+        for i in range(3):
+            QueuedMessage.enqueue('test', '+1999999999{}'.format(i))
+        call_command('dispatch_messages', batch_size=2, stdout=self.out)
+
+        self.assertEqual(3, send.call_count)
+        self.assertIn('SENT: 2 FAILED: 0', self.out.getvalue())
+        self.assertIn('SENT: 1 FAILED: 0', self.out.getvalue())
+
+    def test_handle_empty(self):
+        call_command('dispatch_messages', stdout=self.out)
+        self.assertEqual('', self.out.getvalue())
+
+
+class CompactIdempotencyKeysCommandTest(TestCase):
+
+    @override_settings(DJANGO_TWILIO_SMS_IDEMPOTENCY_KEY_AGE=60)
+    def test_handle(self):
+        out = StringIO()
+        IdempotencyKey.reserve_many(['test1', 'test2'])
+        IdempotencyKey.objects.filter(key='test1').update(
+            date_created=timezone.now() - datetime.timedelta(seconds=61)
+        )
+
+        call_command('compact_idempotency_keys', stdout=out)
+
+        self.assertIn('DELETED: 1', out.getvalue())
+        self.assertEqual(1, IdempotencyKey.objects.count())
+
+
+class RefreshAccountsCommandTest(TestCase):
+
+    @patch('django_twilio_sms.models.Account.refresh_stale')
+    @patch('django_twilio_sms.models.Account.preload')
+    def test_handle(self, preload, refresh_stale):
+        out = StringIO()
+        preload.return_value = (2, 1)
+        refresh_stale.return_value = (3, 0)
+
+        call_command('refresh_accounts', preload=True, stdout=out)
+
+        self.assertIn('CREATED: 2 UPDATED: 1', out.getvalue())
+        self.assertIn('REFRESHED: 3 FAILED: 0', out.getvalue())
+        refresh_stale.assert_called_once_with(86400, 100)
+
+    @override_settings(DJANGO_TWILIO_SMS_ACCOUNT_TTL=60)
+    @patch('django_twilio_sms.models.Account.refresh_stale')
+    @patch('django_twilio_sms.models.Account.preload')
+    def test_handle_without_preload(self, preload, refresh_stale):
+        refresh_stale.return_value = (0, 0)
+        call_command('refresh_accounts', stdout=StringIO())
+        self.assertFalse(preload.called)
+        refresh_stale.assert_called_once_with(60, 100)
+
+
+class ExportMessagesCommandTest(TestCase):
+
+    @patch('django_twilio_sms.management.commands.export_messages.export')
+    def test_handle(self, export):
+        out = StringIO()
+        export.return_value = iter(['header\n', 'row\n'])
+
+        call_command(
+            'export_messages', format='jsonl', start=datetime.date(2016, 1, 1),
+            statuses=['delivered'], stdout=out
+        )
+
+        self.assertEqual('header\nrow\n', out.getvalue())
+        export.assert_called_once_with(
+            format='jsonl', batch_size=1000,
+            start=datetime.date(2016, 1, 1), end=None,
+            statuses=['delivered'], directions=None, accounts=None
+        )
+
+    def test_handle_start_after_end(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                'export_messages', start=datetime.date(2016, 1, 2),
+                end=datetime.date(2016, 1, 1)
+            )
+
+
+class RebuildMessageStatsCommandTest(TestCase):
+
+    @patch('django_twilio_sms.models.MessageDailyStat.rebuild')
+    def test_handle(self, rebuild):
+        out = StringIO()
+        rebuild.return_value = iter([
+            (datetime.date(2016, 1, 1), 2), (datetime.date(2016, 1, 2), 3)
+        ])
+
+        call_command(
+            'rebuild_message_stats', '2016-01-01', '2016-01-02', stdout=out
+        )
+
+        self.assertIn('REBUILT: 2016-01-01 2', out.getvalue())
+        self.assertIn('TOTAL: 5', out.getvalue())
+        rebuild.assert_called_once_with(
+            datetime.date(2016, 1, 1), datetime.date(2016, 1, 2)
+        )
+
+    def test_handle_start_after_end(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                'rebuild_message_stats', '2016-01-02', '2016-01-01'
+            )
+
+
+class BuildConversationsCommandTest(TestCase):
+
+    @patch('django_twilio_sms.models.Conversation.build')
+    def test_handle(self, build):
+        out = StringIO()
+        build.return_value = 3
+        call_command('build_conversations', batch_size=10, stdout=out)
+        self.assertIn('ADDED: 3', out.getvalue())
+        build.assert_called_once_with(10)
+
+
+class BackfillMessagesCommandTest(TestCase):
+
+    def setUp(self):
+        super(BackfillMessagesCommandTest, self).setUp()
+        self.out = StringIO()
+        self.err = StringIO()
+
+    @patch('django_twilio_sms.management.commands.backfill_messages.backfill')
+    def test_handle(self, backfill):
+        backfill.return_value = iter([
+            (datetime.date(2016, 1, 1), 3, None),
+            (datetime.date(2016, 1, 2), None, Exception('test')),
+        ])
+        call_command(
+            'backfill_messages', '2016-01-01', '2016-01-02', workers=2,
+            stdout=self.out, stderr=self.err
+        )
+
+        backfill.assert_called_once_with(
+            datetime.date(2016, 1, 1), datetime.date(2016, 1, 2), 1000, 2
+        )
+        self.assertIn('IMPORTED: 2016-01-01 3', self.out.getvalue())
+        self.assertIn('TOTAL: 3 FAILED DAYS: 1', self.out.getvalue())
+        self.assertIn('FAILED: 2016-01-02 test', self.err.getvalue())
+
+    def test_handle_if_start_after_end(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                'backfill_messages', '2016-01-02', '2016-01-01',
+                stdout=self.out
+            )
+
+
+class ReconcileMessagesCommandTest(TestCase):
+
+    @patch(
+        'django_twilio_sms.management.commands.reconcile_messages.reconcile'
+    )
+    def test_handle(self, reconcile):
+        reconcile.return_value = Mock(checked=3, updated=2, failed=1)
+        out = StringIO()
+        call_command(
+            'reconcile_messages', age=60, concurrency=2, rate=5.0,
+            stdout=out
+        )
+
+        reconcile.assert_called_once_with(60, 100, 2, 5.0, False)
+        self.assertIn('CHECKED: 3 UPDATED: 2 FAILED: 1', out.getvalue())
@@ -0,0 +1,126 @@
+import datetime
+import json
+
+from django.test import TestCase
+from django.utils import timezone
+
+from model_mommy import mommy
+
+from django_twilio_sms.export import (
+    export,
+    FIELDS,
+    filter_messages,
+    iter_messages
+)
+from django_twilio_sms.models import Account, ApiVersion, Currency, Message
+
+from .mommy_recipes import message_recipe
+
+
+def make_message(sid, date_sent, **kwargs):
+    fields = {
+        'account': Account.objects.get_or_create(sid='test', defaults={
+            'friendly_name': 'test', 'account_type': Account.FULL,
+            'status': Account.ACTIVE,
+        })[0],
+        'api_version': ApiVersion.objects.get_or_create(
+            date=datetime.date(2010, 4, 1)
+        )[0],
+        'currency': mommy.make(Currency, code='USD'),
+        'body': 'test',
+        'status': Message.DELIVERED,
+        'direction': Message.OUTBOUND_API,
+        'price': '-0.00750',
+    }
+    fields.update(kwargs)
+    return message_recipe.make(sid=sid, date_sent=date_sent, **fields)
+
+
+def day(day, hour=12):
+    return datetime.datetime(2016, 1, day, hour, tzinfo=timezone.utc)
+
+
+class IterMessagesTest(TestCase):
+
+    def test_iter_messages(self):
+        make_message('SM3', day(2))
+        make_message('SM2', day(1))
+        make_message('SM1', day(1))
+        make_message('SM0', None)
+
+        # a query per batch and one to find the last is empty, for the sent
+        # and then the unsent messages
+        with self.assertNumQueries(5):
+            sids = [
+                message.sid for message in iter_messages(
+                    Message.objects.all(), batch_size=2
+                )
+            ]
+        self.assertEqual(['SM1', 'SM2', 'SM3', 'SM0'], sids)
+
+    def test_iter_messages_select_related(self):
+        make_message('SM1', day(1))
+        message = next(iter_messages(Message.objects.all()))
+        with self.assertNumQueries(0):
+            '{} {} {}'.format(
+                message.from_phone_number, message.to_phone_number,
+                message.api_version
+            )
+
+
+class FilterMessagesTest(TestCase):
+
+    def setUp(self):
+        super(FilterMessagesTest, self).setUp()
+        make_message('SM1', day(1))
+        make_message('SM2', day(2, 23), status=Message.FAILED)
+        make_message('SM3', day(3), direction=Message.INBOUND)
+        make_message('SM4', day(3), account=mommy.make(Account, sid='other'))
+
+    def get_sids(self, **filters):
+        return sorted(
+            filter_messages(**filters).values_list('sid', flat=True)
+        )
+
+    def test_date_range(self):
+        self.assertEqual(['SM2'], self.get_sids(
+            start=datetime.date(2016, 1, 2), end=datetime.date(2016, 1, 2)
+        ))
+
+    def test_statuses(self):
+        self.assertEqual(['SM2'], self.get_sids(statuses=['failed']))
+
+    def test_directions(self):
+        self.assertEqual(['SM3'], self.get_sids(directions=['inbound']))
+
+    def test_accounts(self):
+        self.assertEqual(['SM4'], self.get_sids(accounts=['other']))
+
+
+class ExportTest(TestCase):
+
+    def setUp(self):
+        super(ExportTest, self).setUp()
+        self.message = make_message('SM1', day(1), body='caf\xe9, "ok"')
+
+    def test_csv(self):
+        lines = list(export())
+        self.assertEqual(2, len(lines))
+        self.assertEqual(','.join(FIELDS) + '\r\n', lines[0])
+        self.assertTrue(lines[1].startswith(
+            'SM1,2016-01-01T12:00:00+00:00,test,,{},{},'
+            '"caf\xe9, ""ok""",'.format(
+                self.message.from_phone_number,
+                self.message.to_phone_number
+            )
+        ))
+
+    def test_jsonl(self):
+        lines = list(export(format='jsonl'))
+        row = json.loads(lines[0])
+        self.assertEqual('SM1', row['sid'])
+        self.assertEqual('caf\xe9, "ok"', row['body'])
+        self.assertEqual('delivered', row['status'])
+        self.assertEqual('outbound-api', row['direction'])
+        self.assertEqual('-0.00750', row['price'])
+        self.assertIsNone(row['error_code'])
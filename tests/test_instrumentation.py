@@ -0,0 +1,217 @@
+import socket
+
+from django.test import override_settings, TestCase
+
+from mock import Mock, patch
+from model_mommy import mommy
+from twilio.rest.exceptions import TwilioRestException
+
+from django_twilio_sms.instrumentation import (
+    aggregator,
+    Aggregator,
+    Event,
+    Histogram,
+    instrumentation,
+    instrumented,
+    NULL_MEASUREMENT,
+    StatsdExporter
+)
+from django_twilio_sms.models import Account
+from django_twilio_sms.retry import RetryPolicy
+
+
+INSTRUMENTATION = ['django_twilio_sms.instrumentation.aggregator']
+
+
+class Messages(object):
+
+    def __init__(self, results):
+        self.results = list(results)
+
+    def create(self, **kwargs):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class Accounts(object):
+
+    def get(self, sid):
+        return Mock(
+            sid=sid, owner_account_sid=sid, friendly_name='test',
+            type='Full', status='active'
+        )
+
+
+def make_event(name='test', duration=.01, outcome='ok', queries=0,
+               retries=0):
+    event = Event(name)
+    event.duration = duration
+    event.outcome = outcome
+    event.queries = queries
+    event.retries = retries
+    return event
+
+
+class HistogramTest(TestCase):
+
+    def test_percentile(self):
+        histogram = Histogram()
+        for i in range(1, 101):
+            histogram.add(i / 1000.0)
+
+        self.assertAlmostEqual(.05, histogram.percentile(50), delta=.0025)
+        self.assertAlmostEqual(.09, histogram.percentile(90), delta=.0045)
+        self.assertEqual(.1, histogram.percentile(100))
+        self.assertEqual(100, histogram.count)
+
+    def test_percentile_empty(self):
+        self.assertEqual(0, Histogram().percentile(50))
+
+    def test_add_zero(self):
+        histogram = Histogram()
+        histogram.add(0)
+        self.assertEqual(0, histogram.percentile(50))
+
+
+class AggregatorTest(TestCase):
+
+    def test_stats(self):
+        collector = Aggregator()
+        collector.handle(make_event(queries=2, retries=1))
+        collector.handle(make_event(outcome='error', queries=1))
+
+        stats = collector.stats()['test']
+        self.assertEqual(2, stats['calls'])
+        self.assertEqual(1, stats['errors'])
+        self.assertEqual(1, stats['retries'])
+        self.assertEqual(3, stats['queries'])
+        self.assertAlmostEqual(.01, stats['p99'], delta=.0005)
+
+        collector.reset()
+        self.assertEqual({}, collector.stats())
+
+
+class StatsdExporterTest(TestCase):
+
+    def setUp(self):
+        super(StatsdExporterTest, self).setUp()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.settimeout(5)
+        self.addCleanup(self.server.close)
+
+    def test_handle(self):
+        port = self.server.getsockname()[1]
+        with override_settings(
+                DJANGO_TWILIO_SMS_STATSD_HOST='127.0.0.1',
+                DJANGO_TWILIO_SMS_STATSD_PORT=port,
+                DJANGO_TWILIO_SMS_STATSD_PREFIX='test'):
+            exporter = StatsdExporter()
+        exporter.handle(make_event(
+            name='twilio.messages.create', queries=2, retries=1
+        ))
+
+        self.assertEqual([
+            'test.twilio.messages.create.duration:10.000|ms',
+            'test.twilio.messages.create.ok:1|c',
+            'test.twilio.messages.create.queries:2|c',
+            'test.twilio.messages.create.retries:1|c',
+        ], self.server.recv(4096).decode('utf-8').split('\n'))
+
+    def test_handle_socket_error(self):
+        exporter = StatsdExporter('127.0.0.1', 1)
+        exporter.socket = Mock()
+        exporter.socket.sendto.side_effect = socket.error
+        exporter.handle(make_event())
+
+
+class InstrumentationTest(TestCase):
+
+    def setUp(self):
+        super(InstrumentationTest, self).setUp()
+        aggregator.reset()
+
+    def test_measure_disabled(self):
+        self.assertEqual(NULL_MEASUREMENT, instrumentation.measure('test'))
+        with instrumentation.measure('test') as event:
+            self.assertIsNone(event)
+
+    @override_settings(DJANGO_TWILIO_SMS_INSTRUMENTATION=INSTRUMENTATION)
+    def test_measure(self):
+        with instrumentation.measure('outer'):
+            with instrumentation.measure('inner'):
+                instrumentation.retry()
+                mommy.make(Account)
+
+        stats = aggregator.stats()
+        self.assertEqual(1, stats['inner']['retries'])
+        self.assertEqual(1, stats['outer']['retries'])
+        # an update and an insert saving an object with its primary key
+        self.assertEqual(2, stats['inner']['queries'])
+        self.assertEqual(2, stats['outer']['queries'])
+
+    @override_settings(DJANGO_TWILIO_SMS_INSTRUMENTATION=INSTRUMENTATION)
+    def test_measure_exception(self):
+        with self.assertRaises(ValueError):
+            with instrumentation.measure('test'):
+                raise ValueError()
+        self.assertEqual(1, aggregator.stats()['test']['errors'])
+
+    @override_settings(DJANGO_TWILIO_SMS_INSTRUMENTATION=INSTRUMENTATION)
+    def test_instrumented(self):
+        func = instrumented('test')(lambda: 'result')
+        self.assertEqual('result', func())
+        self.assertEqual(1, aggregator.stats()['test']['calls'])
+
+    @override_settings(DJANGO_TWILIO_SMS_INSTRUMENTATION=[
+        'django_twilio_sms.instrumentation.Aggregator'
+    ])
+    def test_get_collectors_class(self):
+        collectors = instrumentation.get_collectors()
+        self.assertIsInstance(collectors[0], Aggregator)
+        self.assertIsNot(aggregator, collectors[0])
+
+    @override_settings(DJANGO_TWILIO_SMS_INSTRUMENTATION=INSTRUMENTATION)
+    @patch('django_twilio_sms.instrumentation.logger')
+    def test_emit_collector_exception(self, logger):
+        with patch.object(aggregator, 'handle') as handle:
+            handle.side_effect = Exception('test')
+            with instrumentation.measure('test'):
+                pass
+        self.assertTrue(logger.exception.called)
+
+    @override_settings(
+        DJANGO_TWILIO_SMS_INSTRUMENTATION=INSTRUMENTATION,
+        DJANGO_TWILIO_SMS_RETRY_SLEEP=0
+    )
+    def test_retry_policy_call(self):
+        messages = Messages([
+            TwilioRestException(status=429, uri='test'), 'message'
+        ])
+
+        self.assertEqual('message', RetryPolicy().call(messages.create))
+        stats = aggregator.stats()['twilio.messages.create']
+        self.assertEqual(1, stats['calls'])
+        self.assertEqual(1, stats['retries'])
+
+    def test_retry_policy_get_name(self):
+        self.assertEqual(
+            'twilio.messages.create',
+            RetryPolicy().get_name(Messages([]).create)
+        )
+        self.assertEqual(
+            'twilio.call', RetryPolicy().get_name(Mock(spec=[]))
+        )
+
+    @override_settings(DJANGO_TWILIO_SMS_INSTRUMENTATION=INSTRUMENTATION)
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_models(self, twilio_client):
+        twilio_client.accounts = Accounts()
+        Account.get_or_create('test')
+
+        stats = aggregator.stats()
+        self.assertEqual(1, stats['account.sync_twilio_account']['calls'])
+        self.assertEqual(2, stats['account.sync_twilio_account']['queries'])
+        self.assertEqual(1, stats['twilio.accounts.get']['calls'])
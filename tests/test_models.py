@@ -1,8 +1,17 @@
 import datetime
+import random
+import threading
+import time
 
-from django.test import override_settings, TestCase
+from decimal import Decimal
+
+from django.db import connection, OperationalError
+from django.test import override_settings, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from django_twilio.models import Caller
+from django_twilio.request import TwilioRequest
 from mock import Mock, patch, PropertyMock
 from model_mommy import mommy
 from twilio.rest.exceptions import TwilioRestException
@@ -12,15 +21,36 @@ from django_twilio_sms.models import (
     Account,
     Action,
     ApiVersion,
+    Conversation,
     Currency,
     Error,
+    IdempotencyKey,
     Message,
+    MessageDailyStat,
     MessagingService,
     PhoneNumber,
-    Response
+    QueuedMessage,
+    Response,
+    WebhookEvent
 )
 
 
+def message_fields():
+    return {
+        'date_sent': timezone.now(),
+        'account': mommy.make(Account),
+        'from_phone_number': phone_number_recipe.make(),
+        'to_phone_number': phone_number_recipe.make(),
+        'body': 'test',
+        'num_media': 0,
+        'num_segments': 1,
+        'direction': Message.OUTBOUND_API,
+        'price': '-0.0075',
+        'currency': mommy.make(Currency),
+        'api_version': mommy.make(ApiVersion),
+    }
+
+
 class CommonTestCase(TestCase):
 
     def string_test(self, model, test_value, **kwargs):
@@ -122,6 +152,85 @@ class AccountModelTest(CommonTestCase):
         self.assertEqual(Account.ACTIVE, account.status)
         self.assertEqual(owner_account, account.owner_account_sid)
 
+    @override_settings(DJANGO_TWILIO_SMS_ACCOUNT_STUBS=True)
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_get_or_create_stub(self, twilio_client):
+        account = Account.get_or_create('test')
+        self.assertFalse(twilio_client.accounts.get.called)
+        self.assertEqual('test', Account.objects.get().sid)
+        self.assertIsNone(account.date_synced)
+
+    @override_settings(DJANGO_TWILIO_SMS_ACCOUNT_STUBS=True)
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_sync_twilio_account_owner_stub(self, twilio_client):
+        account = Account(sid='test')
+        account.sync_twilio_account(self.mock_account('ownertest'))
+        self.assertFalse(twilio_client.accounts.get.called)
+        self.assertIsNotNone(account.date_synced)
+        self.assertIsNone(Account.objects.get(sid='ownertest').date_synced)
+
+    def test_create_stub_existing(self):
+        mommy.make(Account, sid='test', friendly_name='existing')
+        self.assertEqual('existing', Account.create_stub('test').friendly_name)
+
+    def test_preload(self):
+        stale = mommy.make(Account, sid='sub1', friendly_name='old')
+        Account.create_stub('sub2')
+
+        # a select, an update per changed account and a single insert, with
+        # the savepoints of the transaction and the insert
+        with self.assertNumQueries(8):
+            created, updated = Account.preload([
+                self.mock_account('ownertest'),
+                Mock(
+                    sid='sub1', owner_account_sid='ownertest',
+                    friendly_name='sub1', type='Trial', status='suspended'
+                ),
+                Mock(
+                    sid='sub2', owner_account_sid='sub2',
+                    friendly_name='sub2', type='Full', status='active'
+                ),
+            ])
+
+        self.assertEqual((2, 2), (created, updated))
+        self.assertEqual(4, Account.objects.count())
+        self.assertIsNone(Account.objects.get(sid='ownertest').date_synced)
+
+        account = Account.objects.get(sid='test')
+        self.assertEqual('ownertest', account.owner_account_sid_id)
+        self.assertIsNotNone(account.date_synced)
+
+        stale.refresh_from_db()
+        self.assertEqual('sub1', stale.friendly_name)
+        self.assertEqual(Account.TRIAL, stale.account_type)
+        self.assertEqual(Account.SUSPENDED, stale.status)
+        self.assertEqual('ownertest', stale.owner_account_sid_id)
+        self.assertIsNone(Account.objects.get(sid='sub2').owner_account_sid)
+
+    @patch('django_twilio_sms.models.retry_policy.iter')
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_preload_lists_accounts(self, twilio_client, retry_iter):
+        retry_iter.return_value = iter([self.mock_account()])
+        self.assertEqual((1, 0), Account.preload())
+        retry_iter.assert_called_once_with(
+            twilio_client.accounts, page_size=1000
+        )
+
+    @patch('django_twilio_sms.models.logger')
+    @patch('django_twilio_sms.models.Account.sync_twilio_account')
+    def test_refresh_stale(self, sync_twilio_account, logger):
+        sync_twilio_account.side_effect = [None, Exception('test')]
+        Account.create_stub('stub')
+        mommy.make(
+            Account, sid='stale',
+            date_synced=timezone.now() - datetime.timedelta(seconds=61)
+        )
+        mommy.make(Account, sid='fresh', date_synced=timezone.now())
+
+        self.assertEqual((1, 1), Account.refresh_stale(ttl=60, batch_size=1))
+        self.assertEqual(2, sync_twilio_account.call_count)
+        self.assertTrue(logger.exception.called)
+
 
 class ApiVersionModelTest(CommonTestCase):
 
@@ -231,6 +340,77 @@ class PhoneNumberModelTest(CommonTestCase):
         self.assertEqual(1, Caller.objects.all().count())
         self.assertEqual(1, PhoneNumber.objects.all().count())
 
+    def test_get_or_create_many(self):
+        phone_number = phone_number_recipe.make()
+        numbers = ['{}'.format(phone_number.caller.phone_number),
+                   '+19999999998', '+19999999999']
+        phone_numbers = PhoneNumber.get_or_create_many(numbers)
+        self.assertEqual(set(numbers), set(phone_numbers))
+        self.assertEqual(phone_number, phone_numbers[numbers[0]])
+        self.assertEqual(
+            '+19999999998', phone_numbers['+19999999998'].as_e164
+        )
+        self.assertEqual(3, Caller.objects.all().count())
+        self.assertEqual(3, PhoneNumber.objects.all().count())
+
+    def test_get_or_create_many_caller_exists(self):
+        caller = caller_recipe.make()
+        phone_numbers = PhoneNumber.get_or_create_many(
+            ['{}'.format(caller.phone_number)]
+        )
+        self.assertEqual(
+            caller, phone_numbers['{}'.format(caller.phone_number)].caller
+        )
+        self.assertEqual(1, Caller.objects.all().count())
+        self.assertEqual(1, PhoneNumber.objects.all().count())
+
+    def test_get_or_create_many_normalizes_phone_numbers(self):
+        phone_numbers = PhoneNumber.get_or_create_many(
+            ['+19999999999', '+1 999 999 9999']
+        )
+        self.assertEqual(
+            phone_numbers['+19999999999'], phone_numbers['+1 999 999 9999']
+        )
+        self.assertEqual(1, PhoneNumber.objects.all().count())
+
+    def test_get_or_create_many_is_instance(self):
+        phone_number = phone_number_recipe.make()
+        with self.assertNumQueries(0):
+            phone_numbers = PhoneNumber.get_or_create_many([phone_number])
+        self.assertEqual({phone_number: phone_number}, phone_numbers)
+
+    def test_get_or_create_many_all_exist(self):
+        phone_numbers = phone_number_recipe.make(_quantity=3)
+        numbers = [phone_number.as_e164 for phone_number in phone_numbers]
+        with self.assertNumQueries(1):
+            resolved = PhoneNumber.get_or_create_many(numbers)
+        self.assertEqual(phone_numbers, [resolved[n] for n in numbers])
+
+    def test_get_or_create_many_invalid(self):
+        for phone_number in ['', None, 'test']:
+            with self.assertRaises(ValueError):
+                PhoneNumber.get_or_create_many(['+19999999999', phone_number])
+        self.assertFalse(PhoneNumber.objects.exists())
+
+    def test_get_or_create_many_unsubscribed(self):
+        phone_numbers = PhoneNumber.get_or_create_many(
+            ['+19999999999'], unsubscribed=True
+        )
+        self.assertTrue(phone_numbers['+19999999999'].unsubscribed)
+
+    @patch('django_twilio_sms.models.PhoneNumber.get_or_create')
+    def test_get_or_create_many_integrity_error(self, get_or_create):
+        caller = caller_recipe.make()
+        mommy.make(PhoneNumber, caller=caller)
+        with patch.object(
+                PhoneNumber.objects, 'filter',
+                side_effect=[PhoneNumber.objects.none(),
+                             PhoneNumber.objects.all()]):
+            PhoneNumber.get_or_create_many([caller.phone_number.as_e164])
+        get_or_create.assert_called_once_with(
+            caller.phone_number.as_e164, False
+        )
+
     def test_as_164(self):
         phone_number = phone_number_recipe.make()
         self.assertEqual('+19999999991', phone_number.as_e164)
@@ -245,6 +425,16 @@ class PhoneNumberModelTest(CommonTestCase):
         phone_number.unsubscribe()
         self.assertTrue(phone_number.unsubscribed)
 
+    def test_subscribe_if_subscribed(self):
+        phone_number = phone_number_recipe.make(unsubscribed=False)
+        with self.assertNumQueries(0):
+            phone_number.subscribe()
+
+    def test_unsubscribe_if_unsubscribed(self):
+        phone_number = phone_number_recipe.make(unsubscribed=True)
+        with self.assertNumQueries(0):
+            phone_number.unsubscribe()
+
 
 class MessageModelTest(CommonTestCase):
 
@@ -302,7 +492,16 @@ class MessageModelTest(CommonTestCase):
         )
 
     def test_get_status_choice_status_display_not_equal_choice(self):
-        self.assertEqual(None, Message.get_status_choice('test'))
+        unknown = Message.STATUS_MAP.unknown['test']
+        self.assertEqual(Message.UNKNOWN, Message.get_status_choice('test'))
+        self.assertEqual(unknown + 1, Message.STATUS_MAP.unknown['test'])
+
+    def test_get_status_choice_twilio_statuses(self):
+        for status in ('scheduled', 'read', 'partially_delivered',
+                       'canceled'):
+            self.assertNotEqual(
+                Message.UNKNOWN, Message.get_status_choice(status)
+            )
 
     def test_get_or_create_if_not_message_sid_no_exception(self):
         message_1 = message_recipe.make(sid='test')
@@ -335,6 +534,98 @@ class MessageModelTest(CommonTestCase):
         self.assertEqual(message, Message.objects.first())
         self.assertEqual(1, Message.objects.all().count())
 
+    @patch(
+        'django_twilio_sms.models.Message.twilio_message',
+        new_callable=PropertyMock
+        )
+    def test_get_or_create_from_request_does_not_exist(self, twilio_message):
+        twilio_message.return_value = self.mock_message()
+        message, created = Message.get_or_create_from_request(
+            TwilioRequest({'MessageSid': 'test', 'MessageStatus': 'sent'})
+        )
+        self.assertTrue(created)
+        self.assertEqual(message, Message.objects.first())
+        self.assertEqual(1, twilio_message.call_count)
+
+    def inbound_request(self, body='test'):
+        return TwilioRequest({
+            'MessageSid': 'test',
+            'SmsStatus': 'received',
+            'AccountSid': 'testaccount',
+            'MessagingServiceSid': 'testservice',
+            'From': '+19999999991',
+            'To': '+19999999992',
+            'Body': body,
+            'NumMedia': '0',
+            'NumSegments': '2',
+            'ApiVersion': '2010-04-01',
+        })
+
+    @override_settings(DJANGO_TWILIO_SMS_SYNC_PRICE=False)
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_get_or_create_from_request_inbound(self, mock_client):
+        mommy.make(Account, sid='testaccount')
+        message, created = Message.get_or_create_from_request(
+            self.inbound_request()
+        )
+        self.assertTrue(created)
+        self.assertFalse(mock_client.messages.get.called)
+
+        message = Message.objects.get(sid='test')
+        self.assertEqual(Message.INBOUND, message.direction)
+        self.assertEqual(Message.RECEIVED, message.status)
+        self.assertEqual('testaccount', message.account.sid)
+        self.assertEqual('testservice', message.messaging_service.sid)
+        self.assertEqual('+19999999991', message.from_phone_number.as_e164)
+        self.assertEqual('+19999999992', message.to_phone_number.as_e164)
+        self.assertEqual('test', message.body)
+        self.assertEqual(2, message.num_segments)
+        self.assertEqual('2010-04-01', message.api_version.date.isoformat())
+        self.assertIsNotNone(message.date_sent)
+        self.assertEqual(Decimal('0'), message.price)
+        self.assertEqual('USD', message.currency.code)
+
+    @patch(
+        'django_twilio_sms.models.Message.twilio_message',
+        new_callable=PropertyMock
+        )
+    def test_get_or_create_from_request_inbound_price(self, twilio_message):
+        twilio_message.return_value = self.mock_message()
+        message, created = Message.get_or_create_from_request(
+            self.inbound_request()
+        )
+        self.assertTrue(created)
+        self.assertEqual(1, twilio_message.call_count)
+
+        message = Message.objects.get(sid='test')
+        self.assertEqual(Decimal('-0.00750'), message.price)
+        self.assertEqual(2016, message.date_sent.year)
+
+    @override_settings(DJANGO_TWILIO_SMS_SYNC_PRICE=False)
+    @patch('django_twilio_sms.models.unsubscribe_signal')
+    def test_get_or_create_from_request_inbound_unsubscribe(
+            self, unsubscribe_signal):
+        mommy.make(Account, sid='testaccount')
+        message, created = Message.get_or_create_from_request(
+            self.inbound_request(body='STOP')
+        )
+        self.assertTrue(message.from_phone_number.unsubscribed)
+        self.assertTrue(unsubscribe_signal.send_robust.called)
+
+    @patch(
+        'django_twilio_sms.models.Message.twilio_message',
+        new_callable=PropertyMock
+        )
+    def test_get_or_create_from_request_exists(self, twilio_message):
+        message_1 = message_recipe.make(sid='test', status=Message.QUEUED)
+        message_2, created = Message.get_or_create_from_request(
+            TwilioRequest({'MessageSid': 'test', 'MessageStatus': 'sent'})
+        )
+        self.assertFalse(created)
+        self.assertEqual(message_1, message_2)
+        self.assertEqual(Message.SENT, message_2.status)
+        self.assertFalse(twilio_message.called)
+
     @patch('django_twilio_sms.models.Message.get_status_callback')
     @patch('django_twilio_sms.models.twilio_client')
     def test_send_message(self, mock_client, mock_status_callback):
@@ -354,6 +645,294 @@ class MessageModelTest(CommonTestCase):
             status_callback='test'
         )
 
+    @patch('django_twilio_sms.models.Message.get_status_callback')
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_send_message_if_idempotency_key(
+            self, mock_client, mock_status_callback):
+        mock_client.messages.create.return_value = self.mock_message()
+        mock_status_callback.return_value = 'test'
+
+        message_1, created_1 = Message.send_message(
+            body='test', to='+19999999992', from_='+19999999991',
+            idempotency_key='test'
+        )
+        with self.assertNumQueries(1):
+            message_2, created_2 = Message.send_message(
+                body='test', to='+19999999992', from_='+19999999991',
+                idempotency_key='test'
+            )
+
+        self.assertTrue(created_1)
+        self.assertFalse(created_2)
+        self.assertEqual(message_1, message_2)
+        self.assertEqual(1, mock_client.messages.create.call_count)
+        self.assertEqual(
+            message_1, IdempotencyKey.objects.get(key='test').message
+        )
+
+    @patch('django_twilio_sms.models.Message.create_twilio_message')
+    def test_send_message_if_idempotency_key_exception(
+            self, create_twilio_message):
+        create_twilio_message.side_effect = Exception('test')
+
+        with self.assertRaises(Exception):
+            Message.send_message(
+                body='test', to='+19999999992', idempotency_key='test'
+            )
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    @patch('django_twilio_sms.models.Message.get_status_callback')
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_send_message_if_idempotency_key_store_exception(
+            self, mock_client, mock_status_callback):
+        twilio_message = self.mock_message()
+        mock_client.messages.create.return_value = twilio_message
+        mock_client.messages.get.return_value = twilio_message
+        mock_status_callback.return_value = 'test'
+
+        with patch.object(Message, 'get_or_create') as get_or_create:
+            get_or_create.side_effect = Exception('test')
+            with self.assertRaises(Exception):
+                Message.send_message(
+                    body='test', to='+19999999992', from_='+19999999991',
+                    idempotency_key='test'
+                )
+        self.assertEqual('test', IdempotencyKey.objects.get(key='test').sid)
+
+        message, created = Message.send_message(
+            body='test', to='+19999999992', from_='+19999999991',
+            idempotency_key='test'
+        )
+
+        self.assertFalse(created)
+        self.assertEqual('test', message.sid)
+        self.assertEqual(1, mock_client.messages.create.call_count)
+        mock_client.messages.get.assert_called_once_with('test')
+        self.assertEqual(
+            message, IdempotencyKey.objects.get(key='test').message
+        )
+
+    @patch('django_twilio_sms.models.Message.create_twilio_message')
+    def test_send_message_if_idempotency_key_in_progress(
+            self, create_twilio_message):
+        IdempotencyKey.objects.create(key='test')
+
+        with self.assertRaises(IdempotencyKey.InProgress):
+            Message.send_message(
+                body='test', to='+19999999992', idempotency_key='test'
+            )
+        self.assertFalse(create_twilio_message.called)
+
+    @override_settings(DJANGO_TWILIO_SMS_SEND_QUEUE=True)
+    def test_send_message_if_send_queue_idempotency_key(self):
+        queued_message, created = Message.send_message(
+            body='test', to='+19999999992', idempotency_key='test'
+        )
+        self.assertEqual(
+            (queued_message, False), Message.send_message(
+                body='test', to='+19999999992', idempotency_key='test'
+            )
+        )
+        self.assertEqual(1, QueuedMessage.objects.count())
+
+    @override_settings(DJANGO_TWILIO_SMS_SEND_QUEUE=True)
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_send_message_if_send_queue(self, mock_client):
+        queued_message, created = Message.send_message(
+            body='test', to='+19999999992', from_='+19999999991'
+        )
+
+        self.assertIsInstance(queued_message, QueuedMessage)
+        self.assertEqual(QueuedMessage.PENDING, queued_message.status)
+        self.assertEqual('+19999999992', queued_message.recipient)
+        self.assertFalse(mock_client.messages.create.called)
+
+    @patch('django_twilio_sms.models.Message.get_status_callback')
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_send_message_if_messaging_service_sid(
+            self, mock_client, mock_status_callback):
+        mock_client.messages.create.return_value = self.mock_message()
+        mock_status_callback.return_value = 'test'
+
+        Message.send_message(
+            body='test', to='+19999999992', messaging_service_sid='MGtest'
+        )
+
+        mock_client.messages.create.assert_called_with(
+            body='test',
+            to='+19999999992',
+            status_callback='test',
+            messaging_service_sid='MGtest'
+        )
+
+    def mock_create(self, **kwargs):
+        return Mock(
+            sid='SM{}'.format(kwargs['to']),
+            date_sent=None,
+            account_sid='testaccount',
+            messaging_service_sid=None,
+            body=kwargs['body'],
+            num_media=0,
+            num_segments=1,
+            status='queued',
+            error_code=None,
+            error_message=None,
+            direction='outbound-api',
+            price=None,
+            price_unit='USD',
+            api_version='2016-01-01',
+            from_=kwargs['from_'],
+            to=kwargs['to'],
+        )
+
+    @patch('django_twilio_sms.models.Message.get_status_callback')
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_send_bulk(self, mock_client, mock_status_callback):
+        mommy.make(Account, sid='testaccount')
+        mock_client.messages.create.side_effect = self.mock_create
+        mock_status_callback.return_value = 'test'
+        recipients = ['+19999999992', '+19999999993', '+19999999992']
+
+        sent, failed = Message.send_bulk(
+            body='test', recipients=recipients, from_='+19999999991'
+        )
+
+        self.assertEqual(['+19999999992', '+19999999993'], list(sent))
+        self.assertEqual({}, failed)
+        self.assertEqual(2, mock_client.messages.create.call_count)
+        mock_client.messages.create.assert_any_call(
+            body='test',
+            to='+19999999993',
+            from_='+19999999991',
+            status_callback='test'
+        )
+        self.assertEqual(2, Message.objects.all().count())
+        message = Message.objects.get(sid='SM+19999999993')
+        self.assertEqual(sent['+19999999993'], message)
+        self.assertEqual('+19999999993', message.to_phone_number.as_e164)
+        self.assertEqual('+19999999991', message.from_phone_number.as_e164)
+        self.assertEqual(Message.QUEUED, message.status)
+        self.assertEqual(Message.OUTBOUND_API, message.direction)
+        self.assertEqual('testaccount', message.account.sid)
+
+    @patch('django_twilio_sms.models.Message.get_status_callback')
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_send_bulk_invalid_recipients(
+            self, mock_client, mock_status_callback):
+        mommy.make(Account, sid='testaccount')
+        mock_client.messages.create.side_effect = self.mock_create
+        mock_status_callback.return_value = 'test'
+
+        sent, failed = Message.send_bulk(
+            body='test', recipients=['', '+19999999992', None, 'test'],
+            from_='+19999999991'
+        )
+
+        self.assertEqual(['+19999999992'], list(sent))
+        self.assertEqual(['', None, 'test'], list(failed))
+        for exception in failed.values():
+            self.assertIsInstance(exception, ValueError)
+        self.assertEqual(1, mock_client.messages.create.call_count)
+
+    @patch('django_twilio_sms.models.Message.get_status_callback')
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_send_bulk_with_exception(self, mock_client, mock_status_callback):
+        mommy.make(Account, sid='testaccount')
+        exception = TwilioRestException(
+            status=400, method='test', uri='test', msg='test', code=21211
+        )
+
+        def create(**kwargs):
+            if kwargs['to'] == '+19999999993':
+                raise exception
+            return self.mock_create(**kwargs)
+
+        mock_client.messages.create.side_effect = create
+        mock_status_callback.return_value = 'test'
+
+        sent, failed = Message.send_bulk(
+            body='test', recipients=['+19999999992', '+19999999993'],
+            from_='+19999999991'
+        )
+
+        self.assertEqual(['+19999999992'], list(sent))
+        self.assertEqual({'+19999999993': exception}, failed)
+        self.assertEqual(1, Message.objects.all().count())
+
+    @patch('django_twilio_sms.models.Message.get_status_callback')
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_send_bulk_if_idempotency_key(
+            self, mock_client, mock_status_callback):
+        mommy.make(Account, sid='testaccount')
+        exception = Exception('test')
+
+        def create(**kwargs):
+            if kwargs['to'] == '+19999999993':
+                raise exception
+            return self.mock_create(**kwargs)
+
+        mock_client.messages.create.side_effect = create
+        mock_status_callback.return_value = 'test'
+        recipients = ['+19999999992', '+19999999993']
+
+        sent_1, failed_1 = Message.send_bulk(
+            body='test', recipients=recipients, from_='+19999999991',
+            idempotency_key='test'
+        )
+        mock_client.messages.create.side_effect = self.mock_create
+        sent_2, failed_2 = Message.send_bulk(
+            body='test', recipients=recipients, from_='+19999999991',
+            idempotency_key='test'
+        )
+
+        self.assertEqual({'+19999999993': exception}, failed_1)
+        self.assertEqual({}, failed_2)
+        self.assertEqual(sent_1['+19999999992'], sent_2['+19999999992'])
+        self.assertEqual(3, mock_client.messages.create.call_count)
+        self.assertEqual(2, Message.objects.all().count())
+        self.assertEqual(
+            ['test:+19999999992', 'test:+19999999993'],
+            list(IdempotencyKey.objects.filter(
+                message__isnull=False
+            ).order_by('key').values_list('key', flat=True))
+        )
+
+    @override_settings(DJANGO_TWILIO_SMS_BULK_BATCH_SIZE=1)
+    @patch('django_twilio_sms.models.Message.get_status_callback')
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_send_bulk_batch_size(self, mock_client, mock_status_callback):
+        mommy.make(Account, sid='testaccount')
+        mock_client.messages.create.side_effect = self.mock_create
+        mock_status_callback.return_value = 'test'
+
+        with patch.object(
+                Message, 'bulk_create_from_twilio',
+                wraps=Message.bulk_create_from_twilio) as bulk_create:
+            sent, failed = Message.send_bulk(
+                body='test', recipients=['+19999999992', '+19999999993'],
+                from_='+19999999991'
+            )
+
+        self.assertEqual(2, bulk_create.call_count)
+        self.assertEqual(2, Message.objects.all().count())
+
+    def test_bulk_create_from_twilio_if_message_exists(self):
+        mommy.make(Account, sid='testaccount')
+        message = message_recipe.make(sid='SM+19999999992')
+        phone_numbers = PhoneNumber.get_or_create_many(
+            ['+19999999991', '+19999999992']
+        )
+        twilio_message = self.mock_create(
+            body='test', to='+19999999992', from_='+19999999991'
+        )
+
+        messages = Message.bulk_create_from_twilio(
+            {'+19999999992': twilio_message}, phone_numbers
+        )
+
+        self.assertEqual(message, messages['+19999999992'])
+        self.assertEqual(1, Message.objects.all().count())
+
     @patch('django_twilio_sms.models.twilio_client')
     def test_twilio_message_no_exception(self, mock_client):
         mock_message = self.mock_message()
@@ -367,13 +946,23 @@ class MessageModelTest(CommonTestCase):
     @patch('django_twilio_sms.models.twilio_client')
     def test_twilio_message_with_exception_less_than_five(self, mock_client):
         mock_client.messages.get.side_effect = TwilioRestException(
-            status='test', method='test', uri='test', msg='test', code='test'
+            status=404, method='test', uri='test', msg='test', code='test'
         )
         message = message_recipe.make(sid='test')
         with self.assertRaises(TwilioRestException):
             message.twilio_message
         self.assertEqual(3, mock_client.messages.get.call_count)
 
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_twilio_message_with_fatal_exception(self, mock_client):
+        mock_client.messages.get.side_effect = TwilioRestException(
+            status=401, method='test', uri='test', msg='test', code='test'
+        )
+        message = message_recipe.make(sid='test')
+        with self.assertRaises(TwilioRestException):
+            message.twilio_message
+        self.assertEqual(1, mock_client.messages.get.call_count)
+
     @override_settings(DJANGO_TWILIO_SMS_SITE_HOST='www.test.com')
     @override_settings(SECURE_SSL_REDIRECT=True)
     def test_get_status_callback(self):
@@ -382,6 +971,42 @@ class MessageModelTest(CommonTestCase):
             'https://www.test.com/twilio-integration/webhooks/callback-view/'
         )
 
+    @override_settings(DJANGO_TWILIO_SMS_SITE_HOST='www.test.com')
+    def test_get_status_callback_if_host(self):
+        self.assertEqual(
+            Message.get_status_callback('other.test.com'),
+            'http://other.test.com/twilio-integration/webhooks/callback-view/'
+        )
+
+    @override_settings(
+        DJANGO_TWILIO_SMS_SITE_HOST='www.test.com',
+        DJANGO_TWILIO_SMS_STATUS_CALLBACK_HOSTS={
+            'testservice': 'other.test.com'
+        }
+    )
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_send_message_if_status_callback_host(self, mock_client):
+        mock_client.messages.create.return_value = self.mock_message()
+
+        Message.send_message(
+            body='test', to='+19999999992', from_='+19999999991',
+            messaging_service_sid='testservice'
+        )
+        Message.send_message(
+            body='test', to='+19999999992', from_='+19999999991',
+            messaging_service_sid='otherservice'
+        )
+
+        calls = mock_client.messages.create.call_args_list
+        self.assertEqual(
+            'http://other.test.com/twilio-integration/webhooks/callback-view/',
+            calls[0][1]['status_callback']
+        )
+        self.assertEqual(
+            'http://www.test.com/twilio-integration/webhooks/callback-view/',
+            calls[1][1]['status_callback']
+        )
+
     @patch('django_twilio_sms.models.unsubscribe_signal')
     def test_check_for_subscription_message_if_direction_is_not_inbound(
             self, unsubscribe_signal):
@@ -531,6 +1156,30 @@ class MessageModelTest(CommonTestCase):
         )
         check_for_subscription_message.assert_called_once()
 
+    def test_sync_twilio_message_if_unchanged(self):
+        twilio_message = self.mock_message()
+        message = message_recipe.make()
+        message.sync_twilio_message(twilio_message)
+        message = Message.objects.get(pk=message.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            message.sync_twilio_message(twilio_message)
+
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE'))
+        ])
+
+    @patch('django_twilio_sms.models.Message.check_for_subscription_message')
+    def test_sync_twilio_message_atomic(self, check_for_subscription_message):
+        savepoints = len(connection.savepoint_ids)
+        check_for_subscription_message.side_effect = lambda: self.assertEqual(
+            savepoints + 1, len(connection.savepoint_ids)
+        )
+        message = message_recipe.make()
+        message.sync_twilio_message(self.mock_message())
+        check_for_subscription_message.assert_called_once()
+
     def test_sync_twilio_message_if_message_service_sid(self):
         message = message_recipe.make()
         message.sync_twilio_message(self.mock_message(
@@ -579,6 +1228,661 @@ class MessageModelTest(CommonTestCase):
         message.sync_twilio_message(self.mock_message(price=None))
         self.assertEqual('0.0', message.price)
 
+    def test_sync_twilio_price(self):
+        message = message_recipe.make()
+        message.sync_twilio_price(self.mock_message())
+        self.assertEqual('-0.00750', message.price)
+        self.assertEqual('USD', message.currency.code)
+
+    def test_sync_twilio_price_if_not_price(self):
+        message = message_recipe.make()
+        message.sync_twilio_price(self.mock_message(price=None))
+        self.assertEqual('0.0', message.price)
+
+    @patch(
+        'django_twilio_sms.models.Message.twilio_message',
+        new_callable=PropertyMock
+        )
+    def test_sync_twilio_request(self, twilio_message):
+        message = message_recipe.make(status=Message.QUEUED, price='0.0')
+        message.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid,
+            'MessageStatus': 'sent',
+            'MessagingServiceSid': 'test',
+            'NumMedia': '1',
+            'NumSegments': '2',
+            'Body': 'test body',
+        }))
+        message.refresh_from_db()
+        self.assertEqual(Message.SENT, message.status)
+        self.assertEqual('test', message.messaging_service.sid)
+        self.assertEqual(1, message.num_media)
+        self.assertEqual(2, message.num_segments)
+        self.assertEqual('test body', message.body)
+        self.assertEqual(None, message.error)
+        self.assertFalse(twilio_message.called)
+
+    def test_sync_twilio_request_if_sms_status(self):
+        message = message_recipe.make(status=Message.QUEUED, price='0.0')
+        message.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid, 'SmsStatus': 'sending'
+        }))
+        self.assertEqual(Message.SENDING, message.status)
+
+    def test_sync_twilio_request_if_not_status(self):
+        message = message_recipe.make(status=Message.SENT, price='0.0')
+        message.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid
+        }))
+        self.assertEqual(Message.SENT, message.status)
+
+    def test_sync_twilio_request_update_fields(self):
+        message = message_recipe.make(status=Message.QUEUED, price='0.0')
+        with CaptureQueriesContext(connection) as queries:
+            message.sync_twilio_request(TwilioRequest({
+                'MessageSid': message.sid, 'MessageStatus': 'sent'
+            }))
+
+        updates = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE')]
+        self.assertEqual(1, len(updates))
+        self.assertIn('"status"', updates[0])
+        self.assertNotIn('"body"', updates[0])
+
+    def test_sync_twilio_request_if_unchanged(self):
+        message = message_recipe.make(status=Message.SENT, price='0.0')
+        message = Message.objects.get(pk=message.pk)
+
+        # the savepoint of the transaction and nothing else
+        with self.assertNumQueries(2):
+            message.sync_twilio_request(TwilioRequest({
+                'MessageSid': message.sid, 'MessageStatus': 'sent'
+            }))
+
+    def test_sync_twilio_request_if_error_code(self):
+        message = message_recipe.make(status=Message.SENT, price='-0.0075')
+        message.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid,
+            'MessageStatus': 'undelivered',
+            'ErrorCode': '30003',
+        }))
+        self.assertEqual(Message.UNDELIVERED, message.status)
+        self.assertEqual('30003', message.error.code)
+
+    @patch(
+        'django_twilio_sms.models.Message.twilio_message',
+        new_callable=PropertyMock
+        )
+    def test_sync_twilio_request_if_priced_status_not_price(
+            self, twilio_message):
+        twilio_message.return_value = self.mock_message()
+        message = message_recipe.make(status=Message.SENT, price='0.0')
+        message.refresh_from_db()
+        message.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid, 'MessageStatus': 'delivered'
+        }))
+        self.assertEqual(1, twilio_message.call_count)
+        self.assertEqual('-0.00750', message.price)
+        self.assertEqual('USD', message.currency.code)
+
+    @patch(
+        'django_twilio_sms.models.Message.twilio_message',
+        new_callable=PropertyMock
+        )
+    def test_sync_twilio_request_if_priced_status_and_price(
+            self, twilio_message):
+        message = message_recipe.make(status=Message.SENT, price='-0.0075')
+        message.refresh_from_db()
+        message.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid, 'MessageStatus': 'delivered'
+        }))
+        self.assertFalse(twilio_message.called)
+
+    @patch(
+        'django_twilio_sms.models.Message.twilio_message',
+        new_callable=PropertyMock
+        )
+    def test_sync_twilio_request_if_sent_not_date_sent(self, twilio_message):
+        date_sent = datetime.datetime(2016, 1, 1, tzinfo=timezone.utc)
+        twilio_message.return_value = Mock(date_sent=date_sent, price=None)
+        message = message_recipe.make(
+            status=Message.QUEUED, price='-0.0075', date_sent=None
+        )
+        message.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid, 'MessageStatus': 'sending'
+        }))
+        self.assertFalse(twilio_message.called)
+
+        for status in ('sent', 'delivered'):
+            message.sync_twilio_request(TwilioRequest({
+                'MessageSid': message.sid, 'MessageStatus': status
+            }))
+
+        message.refresh_from_db()
+        self.assertEqual(1, twilio_message.call_count)
+        self.assertEqual(date_sent, message.date_sent)
+        self.assertEqual(Message.DELIVERED, message.status)
+        self.assertEqual(Decimal('-0.0075'), message.price)
+
+    @override_settings(DJANGO_TWILIO_SMS_SYNC_PRICE=False)
+    @patch(
+        'django_twilio_sms.models.Message.twilio_message',
+        new_callable=PropertyMock
+        )
+    def test_sync_twilio_request_if_not_sync_price(self, twilio_message):
+        message = message_recipe.make(status=Message.SENT, price='0.0')
+        message.refresh_from_db()
+        message.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid, 'MessageStatus': 'delivered'
+        }))
+        self.assertFalse(twilio_message.called)
+
+
+class MessageStatusTest(CommonTestCase):
+
+    def test_get_lower_statuses(self):
+        self.assertEqual(
+            set([Message.UNKNOWN, Message.SCHEDULED, Message.ACCEPTED]),
+            set(Message.get_lower_statuses(Message.QUEUED))
+        )
+
+    def test_status_ranks(self):
+        self.assertEqual(
+            set(choice[0] for choice in Message.STATUS_CHOICES),
+            set(Message.STATUS_RANKS)
+        )
+
+    def test_advance_status(self):
+        message = message_recipe.make(status=Message.SENT)
+        with self.assertNumQueries(1):
+            self.assertTrue(message.advance_status(Message.DELIVERED))
+        message.refresh_from_db()
+        self.assertEqual(Message.DELIVERED, message.status)
+
+    def test_advance_status_if_lower(self):
+        message = message_recipe.make(status=Message.DELIVERED)
+        self.assertFalse(message.advance_status(Message.SENT))
+        message.refresh_from_db()
+        self.assertEqual(Message.DELIVERED, message.status)
+
+    def test_sync_twilio_request_if_status_behind(self):
+        message = message_recipe.make(status=Message.SENT, price='-0.0075')
+        stale = Message.objects.get(pk=message.pk)
+        message.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid, 'MessageStatus': 'delivered'
+        }))
+
+        stale.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid, 'MessageStatus': 'sending'
+        }))
+        stale.refresh_from_db()
+        self.assertEqual(Message.DELIVERED, stale.status)
+
+    def test_sync_twilio_request_if_status_lower(self):
+        message = message_recipe.make(
+            status=Message.DELIVERED, price='-0.0075'
+        )
+        with self.assertNumQueries(2):
+            message.sync_twilio_request(TwilioRequest({
+                'MessageSid': message.sid, 'MessageStatus': 'sent'
+            }))
+        self.assertEqual(Message.DELIVERED, message.status)
+
+    def test_upsert(self):
+        message = Message(sid='test', status=Message.SENT, **message_fields())
+        self.assertTrue(message.upsert())
+        self.assertEqual(Message.SENT, Message.objects.get(sid='test').status)
+
+    def test_upsert_if_exists(self):
+        fields = message_fields()
+        Message.objects.create(sid='test', status=Message.SENT, **fields)
+        duplicate = Message(sid='test', status=Message.DELIVERED, **fields)
+
+        self.assertFalse(duplicate.upsert())
+        self.assertEqual(1, Message.objects.count())
+        self.assertEqual(
+            Message.DELIVERED, Message.objects.get(sid='test').status
+        )
+
+
+class MessageStatusRaceTest(TransactionTestCase):
+    """
+    Apply status updates to the same messages from many threads at once and
+    check the final status is always the furthest along.
+    """
+
+    def run_threads(self, targets):
+        start = threading.Event()
+        errors = []
+
+        def run(target):
+            start.wait()
+            try:
+                while True:
+                    try:
+                        return target()
+                    except OperationalError as e:
+                        # the shared in memory sqlite database raises rather
+                        # than waiting for a lock, retry as a busy timeout
+                        # would
+                        if 'locked' not in '{}'.format(e):
+                            raise
+                        time.sleep(random.random() / 1000)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=run, args=(target, ))
+            for target in targets
+        ]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+
+    def test_concurrent_callbacks(self):
+        fields = message_fields()
+        sids = ['SM{}'.format(i) for i in range(5)]
+        for sid in sids:
+            Message.objects.create(sid=sid, status=Message.ACCEPTED, **fields)
+
+        def callback(sid, status):
+            def target():
+                Message.objects.get(sid=sid).sync_twilio_request(
+                    TwilioRequest({'MessageSid': sid, 'MessageStatus': status})
+                )
+            return target
+
+        statuses = ['queued', 'sending', 'sent', 'delivered', 'read'] * 4
+        targets = [
+            callback(sid, status) for sid in sids for status in statuses
+        ]
+        random.shuffle(targets)
+        self.run_threads(targets)
+
+        self.assertEqual(
+            [Message.READ] * 5,
+            list(Message.objects.values_list('status', flat=True))
+        )
+
+    def test_concurrent_inserts(self):
+        fields = message_fields()
+
+        def insert(status):
+            def target():
+                Message(sid='test', status=status, **fields).upsert()
+            return target
+
+        statuses = [
+            Message.QUEUED, Message.SENT, Message.FAILED, Message.SENDING
+        ] * 5
+        random.shuffle(statuses)
+        self.run_threads([insert(status) for status in statuses])
+
+        self.assertEqual(1, Message.objects.count())
+        self.assertEqual(Message.FAILED, Message.objects.get().status)
+
+
+@override_settings(DJANGO_TWILIO_SMS_DAILY_STATS=True)
+class MessageDailyStatModelTest(CommonTestCase):
+
+    def setUp(self):
+        super(MessageDailyStatModelTest, self).setUp()
+        self.fields = message_fields()
+        self.date_sent = datetime.datetime(2016, 1, 1, 12, tzinfo=timezone.utc)
+
+    def make_message(self, sid='test', status=Message.SENT, **kwargs):
+        fields = dict(self.fields, date_sent=self.date_sent)
+        fields.update(kwargs)
+        return Message.objects.create(sid=sid, status=status, **fields)
+
+    def mock_message(self, status='sent', date_sent=None):
+        return Mock(
+            sid='test',
+            date_sent=date_sent or self.date_sent,
+            account_sid=self.fields['account'].sid,
+            messaging_service_sid=None,
+            body='test',
+            num_media=0,
+            num_segments=2,
+            status=status,
+            error_code=None,
+            error_message=None,
+            direction='outbound-api',
+            price='-0.00750',
+            price_unit=self.fields['currency'].code,
+            api_version='{}'.format(self.fields['api_version']),
+            from_='{}'.format(self.fields['from_phone_number']),
+            to='{}'.format(self.fields['to_phone_number']),
+        )
+
+    def test_unicode(self):
+        stat = mommy.make(
+            MessageDailyStat, date=datetime.date(2016, 1, 1),
+            account=self.fields['account']
+        )
+        self.assertEqual(
+            '2016-01-01 {}'.format(self.fields['account'].sid),
+            '{}'.format(stat)
+        )
+
+    def test_sync_twilio_message(self):
+        Message(sid='test').sync_twilio_message(self.mock_message())
+
+        stat = MessageDailyStat.objects.get()
+        self.assertEqual(datetime.date(2016, 1, 1), stat.date)
+        self.assertEqual(Message.OUTBOUND_API, stat.direction)
+        self.assertEqual(1, stat.messages)
+        self.assertEqual(2, stat.segments)
+        self.assertEqual(0, stat.delivered)
+        self.assertEqual(Decimal('-0.0075'), stat.price)
+
+        message = Message.objects.get()
+        message.sync_twilio_message(self.mock_message('delivered'))
+
+        stat = MessageDailyStat.objects.get()
+        self.assertEqual(1, stat.messages)
+        self.assertEqual(1, stat.delivered)
+
+    def test_sync_twilio_message_unchanged(self):
+        Message(sid='test').sync_twilio_message(self.mock_message())
+        message = Message.objects.get()
+        with self.assertNumQueries(0):
+            MessageDailyStat.apply([(
+                message.get_field_values(), message.get_field_values()
+            )])
+
+    def test_sync_twilio_message_date_changed(self):
+        Message(sid='test').sync_twilio_message(self.mock_message())
+        Message.objects.get().sync_twilio_message(self.mock_message(
+            date_sent=self.date_sent + datetime.timedelta(days=1)
+        ))
+
+        self.assertEqual([
+            (datetime.date(2016, 1, 1), 0), (datetime.date(2016, 1, 2), 1)
+        ], list(MessageDailyStat.objects.order_by('date').values_list(
+            'date', 'messages'
+        )))
+
+    def test_sync_twilio_request(self):
+        message = self.make_message(price='-0.0075')
+        MessageDailyStat.apply([(None, message.get_field_values())])
+
+        message.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid, 'MessageStatus': 'undelivered'
+        }))
+
+        stat = MessageDailyStat.objects.get()
+        self.assertEqual(1, stat.messages)
+        self.assertEqual(1, stat.failed)
+
+    @patch('django_twilio_sms.models.Message.get_status_callback')
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_send_message_delivered(self, mock_client, mock_status_callback):
+        created = self.mock_message('queued')
+        created.date_sent = None
+        created.price = None
+        mock_client.messages.create.return_value = created
+        mock_client.messages.get.return_value = self.mock_message(
+            'delivered'
+        )
+        mock_status_callback.return_value = 'test'
+
+        message, created = Message.send_message(
+            body='test', to=self.fields['to_phone_number'],
+            from_=self.fields['from_phone_number']
+        )
+        self.assertFalse(MessageDailyStat.objects.exists())
+
+        message.sync_twilio_request(TwilioRequest({
+            'MessageSid': message.sid, 'MessageStatus': 'delivered'
+        }))
+
+        stat = MessageDailyStat.objects.get()
+        self.assertEqual(datetime.date(2016, 1, 1), stat.date)
+        self.assertEqual(1, stat.messages)
+        self.assertEqual(1, stat.delivered)
+        mock_client.messages.get.assert_called_once_with('test')
+
+    def test_apply_unsent(self):
+        message = self.make_message(date_sent=None)
+        MessageDailyStat.apply([(None, message.get_field_values())])
+        self.assertFalse(MessageDailyStat.objects.exists())
+
+    @override_settings(DJANGO_TWILIO_SMS_DAILY_STATS=False)
+    def test_apply_disabled(self):
+        Message(sid='test').sync_twilio_message(self.mock_message())
+        self.assertFalse(MessageDailyStat.objects.exists())
+
+    def test_add_if_created_concurrently(self):
+        message = self.make_message()
+        key, counts = MessageDailyStat.get_counts(message.get_field_values())
+        MessageDailyStat.add(key, counts)
+
+        with patch.object(MessageDailyStat.objects, 'filter') as filter:
+            filter.side_effect = [
+                Mock(**{'update.return_value': 0}),
+                MessageDailyStat.objects.all()
+            ]
+            MessageDailyStat.add(key, counts)
+
+        self.assertEqual(2, MessageDailyStat.objects.get().messages)
+
+    def test_rebuild(self):
+        self.make_message('SM1', status=Message.DELIVERED, num_segments=3)
+        self.make_message('SM2', status=Message.FAILED, num_segments=1)
+        self.make_message('SM3', direction=Message.INBOUND)
+        mommy.make(
+            MessageDailyStat, date=datetime.date(2016, 1, 1),
+            account=self.fields['account'], messages=10
+        )
+
+        self.assertEqual(
+            [(datetime.date(2016, 1, 1), 2), (datetime.date(2016, 1, 2), 0)],
+            list(MessageDailyStat.rebuild(
+                datetime.date(2016, 1, 1), datetime.date(2016, 1, 2)
+            ))
+        )
+
+        stat = MessageDailyStat.objects.get(direction=Message.OUTBOUND_API)
+        self.assertEqual(2, stat.messages)
+        self.assertEqual(4, stat.segments)
+        self.assertEqual(1, stat.delivered)
+        self.assertEqual(1, stat.failed)
+        self.assertEqual(Decimal('-0.015'), stat.price)
+
+    def test_rebuild_matches_apply(self):
+        for i, status in enumerate([Message.SENT, Message.DELIVERED]):
+            message = self.make_message('SM{}'.format(i), status=status)
+            MessageDailyStat.apply([(None, message.get_field_values())])
+        applied = MessageDailyStat.get_totals()
+
+        list(MessageDailyStat.rebuild(
+            datetime.date(2016, 1, 1), datetime.date(2016, 1, 1)
+        ))
+        self.assertEqual(applied, MessageDailyStat.get_totals())
+
+    def test_get_totals(self):
+        for day in range(1, 4):
+            mommy.make(
+                MessageDailyStat, date=datetime.date(2016, 1, day),
+                account=self.fields['account'], messages=day, price='-1'
+            )
+
+        totals = MessageDailyStat.get_totals(
+            datetime.date(2016, 1, 2), datetime.date(2016, 1, 3),
+            account=self.fields['account']
+        )
+        self.assertEqual(5, totals['messages'])
+        self.assertEqual(Decimal('-2'), totals['price'])
+        self.assertEqual(0, MessageDailyStat.get_totals(
+            start=datetime.date(2016, 2, 1)
+        )['messages'])
+
+
+@override_settings(DJANGO_TWILIO_SMS_CONVERSATIONS=True)
+class ConversationModelTest(CommonTestCase):
+
+    def setUp(self):
+        super(ConversationModelTest, self).setUp()
+        self.fields = message_fields()
+        self.site = self.fields['from_phone_number']
+        self.customer = self.fields['to_phone_number']
+        self.date_sent = datetime.datetime(2016, 1, 1, 12, tzinfo=timezone.utc)
+
+    def mock_message(self, sid='test', direction='outbound-api', minutes=0,
+                     date_sent=True):
+        from_, to = self.site, self.customer
+        if direction == 'inbound':
+            from_, to = to, from_
+        return Mock(
+            sid=sid,
+            date_sent=(
+                self.date_sent + datetime.timedelta(minutes=minutes)
+                if date_sent else None
+            ),
+            account_sid=self.fields['account'].sid,
+            messaging_service_sid=None,
+            body='test',
+            num_media=0,
+            num_segments=1,
+            status='received' if direction == 'inbound' else 'sent',
+            error_code=None,
+            error_message=None,
+            direction=direction,
+            price='-0.00750',
+            price_unit=self.fields['currency'].code,
+            api_version='{}'.format(self.fields['api_version']),
+            from_='{}'.format(from_),
+            to='{}'.format(to),
+        )
+
+    def sync(self, *args, **kwargs):
+        message = Message(sid=kwargs.get('sid', 'test'))
+        message.sync_twilio_message(self.mock_message(*args, **kwargs))
+        return message
+
+    def test_unicode(self):
+        conversation = Conversation.get_or_create(self.site, self.customer)
+        self.assertEqual(
+            '{} {}'.format(self.site.pk, self.customer.pk),
+            '{}'.format(conversation)
+        )
+
+    def test_get_or_create(self):
+        conversation = Conversation.get_or_create(self.customer, self.site)
+        self.assertEqual(
+            conversation, Conversation.get_or_create(self.site, self.customer)
+        )
+        self.assertEqual(self.site, conversation.phone_number_1)
+
+    def test_sync_twilio_message(self):
+        self.sync(sid='SM1', minutes=1)
+        message = self.sync(sid='SM2', direction='inbound')
+
+        conversation = Conversation.objects.get()
+        self.assertEqual(conversation, message.conversation)
+        self.assertEqual(2, conversation.message_count)
+        self.assertEqual(1, conversation.unread_count)
+        self.assertEqual(
+            self.date_sent + datetime.timedelta(minutes=1),
+            conversation.last_message_at
+        )
+
+        Message.objects.get(sid='SM2').sync_twilio_message(
+            self.mock_message(sid='SM2', direction='inbound')
+        )
+        self.assertEqual(2, Conversation.objects.get().message_count)
+
+    @override_settings(DJANGO_TWILIO_SMS_CONVERSATIONS=False)
+    def test_sync_twilio_message_disabled(self):
+        self.assertIsNone(self.sync().conversation)
+        self.assertFalse(Conversation.objects.exists())
+
+    def test_bulk_create_from_twilio(self):
+        phone_numbers = PhoneNumber.get_or_create_many(
+            ['{}'.format(self.site), '{}'.format(self.customer)]
+        )
+        messages = Message.bulk_create_from_twilio(
+            {'{}'.format(self.customer): self.mock_message()}, phone_numbers
+        )
+
+        conversation = Conversation.objects.get()
+        self.assertEqual(
+            conversation, messages['{}'.format(self.customer)].conversation
+        )
+        self.assertEqual(1, conversation.message_count)
+
+    def test_build(self):
+        with override_settings(DJANGO_TWILIO_SMS_CONVERSATIONS=False):
+            for i in range(3):
+                self.sync(sid='SM{}'.format(i), direction='inbound')
+
+        self.assertEqual(3, Conversation.build(batch_size=2))
+        conversation = Conversation.objects.get()
+        self.assertEqual(3, conversation.message_count)
+        self.assertEqual(3, conversation.unread_count)
+        self.assertEqual(3, conversation.message_set.count())
+        self.assertEqual(0, Conversation.build())
+
+    def test_get_messages(self):
+        for i in range(3):
+            self.sync(sid='SM{}'.format(i), minutes=i)
+        self.sync(sid='SM3', date_sent=False)
+        self.sync(sid='SM4', date_sent=False)
+        conversation = Conversation.objects.get()
+
+        pages = []
+        before = None
+        while True:
+            page = conversation.get_messages(before, limit=2)
+            if not page:
+                break
+            pages.append([message.sid for message in page])
+            before = page[-1]
+
+        self.assertEqual(
+            [['SM4', 'SM3'], ['SM2', 'SM1'], ['SM0']], pages
+        )
+
+    def test_get_messages_queries(self):
+        for i in range(3):
+            self.sync(sid='SM{}'.format(i), minutes=i)
+        conversation = Conversation.objects.get()
+        before = conversation.get_messages(limit=1)[0]
+
+        with self.assertNumQueries(1):
+            messages = conversation.get_messages(before)
+            for message in messages:
+                '{} {}'.format(
+                    message.from_phone_number, message.to_phone_number
+                )
+        self.assertEqual(['SM1', 'SM0'], [message.sid for message in messages])
+
+    def test_for_phone_number(self):
+        self.sync(sid='SM1')
+        other = phone_number_recipe.make()
+        Conversation.get_or_create(self.site, other)
+        self.sync(sid='SM2', minutes=1)
+
+        conversations = list(Conversation.for_phone_number(self.site))
+        self.assertEqual(1, len(conversations))
+        self.assertEqual(self.customer, conversations[0].phone_number_2)
+        self.assertFalse(Conversation.for_phone_number(other).exists())
+
+    def test_mark_read(self):
+        self.sync(direction='inbound')
+        conversation = Conversation.objects.get()
+        conversation.mark_read()
+
+        conversation.refresh_from_db()
+        self.assertEqual(0, conversation.unread_count)
+        self.assertIsNotNone(conversation.last_read_at)
+
 
 class ActionModelTest(CommonTestCase):
 
@@ -653,3 +1957,393 @@ class ResponseModelTest(CommonTestCase):
         response.save()
         self.assertEqual(1, Response.objects.all().count())
         self.assertEqual(response, Response.objects.first())
+
+
+class WebhookEventModelTest(CommonTestCase):
+
+    def test_unicode(self):
+        event = WebhookEvent.enqueue(WebhookEvent.INBOUND, {})
+        self.assertEqual('inbound {}'.format(event.pk), event.__str__())
+
+    def test_enqueue(self):
+        event = WebhookEvent.enqueue(
+            WebhookEvent.CALLBACK, {'MessageSid': 'test', 'From': '+1999'}
+        )
+        self.assertEqual(WebhookEvent.PENDING, event.status)
+        self.assertEqual('test', event.twilio_request.messagesid)
+        self.assertEqual('+1999', event.twilio_request.from_)
+
+    def test_claim_batch(self):
+        events = [
+            WebhookEvent.enqueue(WebhookEvent.CALLBACK, {}) for i in range(3)
+        ]
+        claimed = WebhookEvent.claim_batch(2)
+        self.assertEqual(events[:2], claimed)
+        self.assertEqual(WebhookEvent.PROCESSING, claimed[0].status)
+        self.assertEqual(claimed[0].claim, claimed[1].claim)
+        self.assertEqual(events[2:], WebhookEvent.claim_batch(2))
+        self.assertEqual([], WebhookEvent.claim_batch(2))
+
+    @override_settings(DJANGO_TWILIO_SMS_WEBHOOK_QUEUE_CLAIM_TIMEOUT=60)
+    def test_claim_batch_claim_timeout(self):
+        event = WebhookEvent.enqueue(WebhookEvent.CALLBACK, {})
+        WebhookEvent.claim_batch(1)
+        self.assertEqual([], WebhookEvent.claim_batch(1))
+        WebhookEvent.objects.filter(pk=event.pk).update(
+            date_claimed=timezone.now() - datetime.timedelta(seconds=61)
+        )
+        self.assertEqual([event], WebhookEvent.claim_batch(1))
+
+    def test_get_stats(self):
+        WebhookEvent.enqueue(WebhookEvent.CALLBACK, {})
+        WebhookEvent.objects.update(
+            date_created=timezone.now() - datetime.timedelta(seconds=30)
+        )
+        WebhookEvent.enqueue(WebhookEvent.CALLBACK, {}).mark_processed()
+        stats = WebhookEvent.get_stats()
+        self.assertEqual(1, stats['pending'])
+        self.assertEqual(1, stats['processed'])
+        self.assertEqual(0, stats['failed'])
+        self.assertGreaterEqual(stats['lag'], 30)
+
+    def test_get_stats_empty(self):
+        stats = WebhookEvent.get_stats()
+        self.assertEqual(0, stats['pending'])
+        self.assertEqual(0, stats['lag'])
+
+    def test_mark_processed(self):
+        event = WebhookEvent.enqueue(WebhookEvent.CALLBACK, {})
+        event.mark_processed()
+        self.assertEqual(WebhookEvent.PROCESSED, event.status)
+        self.assertEqual(1, event.attempts)
+        self.assertIsNotNone(event.date_processed)
+
+    @override_settings(DJANGO_TWILIO_SMS_WEBHOOK_QUEUE_MAX_ATTEMPTS=2)
+    def test_mark_failed(self):
+        event = WebhookEvent.enqueue(WebhookEvent.CALLBACK, {})
+        event.mark_failed(Exception('test'))
+        self.assertEqual(WebhookEvent.PENDING, event.status)
+        self.assertEqual('test', event.error)
+        event.mark_failed(Exception('test'))
+        self.assertEqual(WebhookEvent.FAILED, event.status)
+        self.assertEqual(2, event.attempts)
+
+
+class QueuedMessageModelTest(CommonTestCase):
+
+    def mock_twilio_message(self, sid='SMtest', body='test', minutes=0):
+        return Mock(
+            sid=sid, body=body, date_created=datetime.datetime.utcnow() -
+            datetime.timedelta(minutes=minutes)
+        )
+
+    def test_unicode(self):
+        queued_message = QueuedMessage.enqueue('test', '+19999999992')
+        self.assertEqual(
+            '+19999999992 {}'.format(queued_message.pk),
+            queued_message.__str__()
+        )
+
+    def test_enqueue(self):
+        queued_message = QueuedMessage.enqueue(
+            'test', '+19999999992', '+19999999991', 'MGtest', 'test'
+        )
+        self.assertEqual(QueuedMessage.PENDING, queued_message.status)
+        self.assertEqual('+19999999991', queued_message.sender)
+        self.assertEqual('MGtest', queued_message.messaging_service_sid)
+        self.assertEqual('test', queued_message.campaign)
+
+    def test_claim_batch(self):
+        queued_messages = [
+            QueuedMessage.enqueue('test', '+19999999992') for i in range(3)
+        ]
+        claimed = QueuedMessage.claim_batch(2)
+        self.assertEqual(queued_messages[:2], claimed)
+        self.assertEqual(QueuedMessage.SENDING, claimed[0].status)
+        self.assertEqual(1, claimed[0].attempts)
+        self.assertEqual(claimed[0].claim, claimed[1].claim)
+        self.assertEqual(queued_messages[2:], QueuedMessage.claim_batch(2))
+        self.assertEqual([], QueuedMessage.claim_batch(2))
+
+    @override_settings(DJANGO_TWILIO_SMS_SEND_QUEUE_CLAIM_TIMEOUT=60)
+    def test_claim_batch_claim_timeout(self):
+        queued_message = QueuedMessage.enqueue('test', '+19999999992')
+        QueuedMessage.claim_batch(1)
+        self.assertEqual([], QueuedMessage.claim_batch(1))
+        QueuedMessage.objects.filter(pk=queued_message.pk).update(
+            date_claimed=timezone.now() - datetime.timedelta(seconds=61)
+        )
+        claimed = QueuedMessage.claim_batch(1)
+        self.assertEqual([queued_message], claimed)
+        self.assertEqual(2, claimed[0].attempts)
+
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_find_sent(self, mock_client):
+        twilio_message = self.mock_twilio_message()
+        mock_client.messages.iter.return_value = iter([
+            self.mock_twilio_message(body='other'), twilio_message
+        ])
+        queued_message = QueuedMessage.enqueue('test', '+19999999992')
+
+        self.assertEqual(twilio_message, queued_message.find_sent())
+        mock_client.messages.iter.assert_called_with(to='+19999999992')
+
+    @patch('django_twilio_sms.models.twilio_client')
+    def test_find_sent_before_queued(self, mock_client):
+        mock_client.messages.iter.return_value = iter([
+            self.mock_twilio_message(minutes=10)
+        ])
+        queued_message = QueuedMessage.enqueue('test', '+19999999992')
+        self.assertIsNone(queued_message.find_sent())
+
+    @patch('django_twilio_sms.models.Message.get_or_create')
+    @patch('django_twilio_sms.models.Message.create_twilio_message')
+    def test_send(self, create_twilio_message, get_or_create):
+        message = message_recipe.make()
+        create_twilio_message.return_value = self.mock_twilio_message()
+        get_or_create.return_value = (message, True)
+        QueuedMessage.enqueue('test', '+19999999992', '+19999999991')
+        queued_message = QueuedMessage.claim_batch(1)[0]
+
+        self.assertEqual(message, queued_message.send('+19999999993'))
+        create_twilio_message.assert_called_with(
+            'test', '+19999999992', '+19999999993', ''
+        )
+
+        queued_message.refresh_from_db()
+        self.assertEqual(QueuedMessage.SENT, queued_message.status)
+        self.assertEqual('SMtest', queued_message.sid)
+        self.assertEqual(message, queued_message.message)
+        self.assertIsNotNone(queued_message.date_sent)
+
+    @patch('django_twilio_sms.models.QueuedMessage.find_sent')
+    @patch('django_twilio_sms.models.Message.get_or_create')
+    @patch('django_twilio_sms.models.Message.create_twilio_message')
+    def test_send_if_sent_before(
+            self, create_twilio_message, get_or_create, find_sent):
+        find_sent.return_value = self.mock_twilio_message()
+        get_or_create.return_value = (message_recipe.make(), True)
+        QueuedMessage.enqueue('test', '+19999999992')
+        QueuedMessage.objects.update(attempts=1)
+        queued_message = QueuedMessage.claim_batch(1)[0]
+
+        queued_message.send()
+        self.assertFalse(create_twilio_message.called)
+        self.assertEqual('SMtest', queued_message.sid)
+
+    @override_settings(DJANGO_TWILIO_SMS_SEND_QUEUE_CLAIM_TIMEOUT=60)
+    @patch('django_twilio_sms.models.twilio_client')
+    @patch('django_twilio_sms.models.QueuedMessage.find_sent')
+    @patch('django_twilio_sms.models.Message.get_or_create')
+    @patch('django_twilio_sms.models.Message.create_twilio_message')
+    def test_send_if_sid(
+            self, create_twilio_message, get_or_create, find_sent,
+            mock_client):
+        message = message_recipe.make()
+        twilio_message = self.mock_twilio_message()
+        create_twilio_message.return_value = twilio_message
+        get_or_create.side_effect = [Exception('test'), (message, True)]
+        mock_client.messages.get.return_value = twilio_message
+        QueuedMessage.enqueue('test', '+19999999992')
+        queued_message = QueuedMessage.claim_batch(1)[0]
+
+        with self.assertRaises(Exception):
+            queued_message.send()
+        queued_message.mark_failed(Exception('test'))
+        queued_message.refresh_from_db()
+        self.assertEqual(QueuedMessage.SENT, queued_message.status)
+        self.assertEqual('test', queued_message.error)
+
+        self.assertEqual([], QueuedMessage.claim_batch(1))
+        QueuedMessage.objects.update(
+            date_claimed=timezone.now() - datetime.timedelta(seconds=61)
+        )
+        queued_message = QueuedMessage.claim_batch(1)[0]
+        self.assertEqual(QueuedMessage.SENT, queued_message.status)
+
+        self.assertEqual(message, queued_message.send())
+        self.assertEqual(1, create_twilio_message.call_count)
+        self.assertFalse(find_sent.called)
+        mock_client.messages.get.assert_called_once_with('SMtest')
+        get_or_create.assert_called_with(message=twilio_message)
+
+        queued_message.refresh_from_db()
+        self.assertEqual(QueuedMessage.SENT, queued_message.status)
+        self.assertEqual(message, queued_message.message)
+        self.assertEqual([], QueuedMessage.claim_batch(1))
+
+    @patch('django_twilio_sms.models.QueuedMessage.find_sent')
+    @patch('django_twilio_sms.models.Message.get_or_create')
+    @patch('django_twilio_sms.models.Message.create_twilio_message')
+    def test_send_first_attempt(
+            self, create_twilio_message, get_or_create, find_sent):
+        create_twilio_message.return_value = self.mock_twilio_message()
+        get_or_create.return_value = (message_recipe.make(), True)
+        QueuedMessage.enqueue('test', '+19999999992')
+
+        QueuedMessage.claim_batch(1)[0].send()
+        self.assertFalse(find_sent.called)
+        self.assertTrue(create_twilio_message.called)
+
+    @patch('django_twilio_sms.models.Message.create_twilio_message')
+    def test_send_if_claim_lost(self, create_twilio_message):
+        QueuedMessage.enqueue('test', '+19999999992')
+        queued_message = QueuedMessage.claim_batch(1)[0]
+        QueuedMessage.objects.update(claim='other')
+
+        with self.assertRaises(QueuedMessage.ClaimLost):
+            queued_message.send()
+        self.assertFalse(create_twilio_message.called)
+
+    def test_renew_claim(self):
+        QueuedMessage.enqueue('test', '+19999999992')
+        queued_message = QueuedMessage.claim_batch(1)[0]
+        QueuedMessage.objects.update(
+            date_claimed=timezone.now() - datetime.timedelta(seconds=60)
+        )
+
+        self.assertTrue(queued_message.renew_claim())
+        self.assertEqual(
+            queued_message.date_claimed,
+            QueuedMessage.objects.get().date_claimed
+        )
+
+    @patch('django_twilio_sms.models.Message.create_twilio_message')
+    def test_mark_sent_if_reclaimed(self, create_twilio_message):
+        QueuedMessage.enqueue('test', '+19999999992')
+        queued_message = QueuedMessage.claim_batch(1)[0]
+        QueuedMessage.objects.update(claim='other')
+
+        queued_message.mark_sent(self.mock_twilio_message())
+        queued_message.refresh_from_db()
+        self.assertEqual(QueuedMessage.SENDING, queued_message.status)
+
+    @override_settings(DJANGO_TWILIO_SMS_SEND_QUEUE_MAX_ATTEMPTS=2)
+    def test_mark_failed(self):
+        QueuedMessage.enqueue('test', '+19999999992')
+        queued_message = QueuedMessage.claim_batch(1)[0]
+        queued_message.mark_failed(Exception('test'))
+        self.assertEqual(QueuedMessage.PENDING, queued_message.status)
+        self.assertEqual('test', queued_message.error)
+
+        queued_message = QueuedMessage.claim_batch(1)[0]
+        queued_message.mark_failed(Exception('test'))
+        self.assertEqual(QueuedMessage.FAILED, queued_message.status)
+        self.assertEqual(2, queued_message.attempts)
+
+    def test_mark_failed_if_reclaimed(self):
+        QueuedMessage.enqueue('test', '+19999999992')
+        queued_message = QueuedMessage.claim_batch(1)[0]
+        QueuedMessage.objects.update(claim='other')
+
+        queued_message.mark_failed(Exception('test'))
+        queued_message.refresh_from_db()
+        self.assertEqual(QueuedMessage.SENDING, queued_message.status)
+        self.assertEqual('', queued_message.error)
+
+
+class IdempotencyKeyModelTest(CommonTestCase):
+
+    def test_unicode(self):
+        self.string_test('IdempotencyKey', 'test', key='test')
+
+    def test_get_sent(self):
+        message = message_recipe.make()
+        idempotency_key = mommy.make(
+            IdempotencyKey, message=message, queued_message=None
+        )
+        self.assertEqual(message, idempotency_key.get_sent())
+
+    def test_get_sent_in_progress(self):
+        idempotency_key = IdempotencyKey.objects.create(key='test')
+        with self.assertRaises(IdempotencyKey.InProgress):
+            idempotency_key.get_sent()
+
+    @patch('django_twilio_sms.models.Message.get_or_create')
+    def test_get_sent_if_sid(self, get_or_create):
+        message = message_recipe.make()
+        get_or_create.return_value = (message, True)
+        idempotency_key = IdempotencyKey.objects.create(key='test', sid='SM1')
+
+        self.assertEqual(message, idempotency_key.get_sent())
+        get_or_create.assert_called_once_with(message_sid='SM1')
+        self.assertEqual(
+            message, IdempotencyKey.objects.get(key='test').message
+        )
+
+    def test_reserve_many(self):
+        existing = IdempotencyKey.objects.create(key='test1')
+
+        reserved, used = IdempotencyKey.reserve_many(['test1', 'test2'])
+
+        self.assertEqual(['test2'], reserved)
+        self.assertEqual({'test1': existing}, used)
+        self.assertEqual(2, IdempotencyKey.objects.count())
+
+    def test_reserve_many_if_reserved_concurrently(self):
+        IdempotencyKey.objects.create(key='test1')
+
+        with patch.object(IdempotencyKey, 'get_many') as get_many:
+            get_many.side_effect = [{}, {'test1': 'existing'}]
+            reserved, used = IdempotencyKey.reserve_many(['test1', 'test2'])
+
+        self.assertEqual(['test2'], reserved)
+        self.assertEqual({'test1': 'existing'}, used)
+        get_many.assert_called_with(set(['test1']))
+
+    def test_record_many(self):
+        message = message_recipe.make()
+        queued_message = QueuedMessage.enqueue('test', '+19999999992')
+        IdempotencyKey.reserve_many(['test1', 'test2'])
+
+        IdempotencyKey.record_many(
+            {'test1': message, 'test2': queued_message}
+        )
+
+        self.assertEqual(
+            message, IdempotencyKey.objects.get(key='test1').get_sent()
+        )
+        self.assertEqual(
+            queued_message, IdempotencyKey.objects.get(key='test2').get_sent()
+        )
+
+    def test_record_sids(self):
+        IdempotencyKey.reserve_many(['test1', 'test2'])
+
+        IdempotencyKey.record_sids({'test1': 'SM1'})
+
+        self.assertEqual(
+            [('test1', 'SM1'), ('test2', '')], list(
+                IdempotencyKey.objects.order_by('key').values_list(
+                    'key', 'sid'
+                )
+            )
+        )
+
+    def test_release_many(self):
+        IdempotencyKey.reserve_many(['test1', 'test2', 'test3'])
+        IdempotencyKey.record_many({'test1': message_recipe.make()})
+        IdempotencyKey.record_sids({'test3': 'SM3'})
+
+        IdempotencyKey.release_many(['test1', 'test2', 'test3'])
+
+        self.assertEqual(
+            ['test1', 'test3'], list(
+                IdempotencyKey.objects.order_by('key').values_list(
+                    'key', flat=True
+                )
+            )
+        )
+
+    def test_compact(self):
+        IdempotencyKey.reserve_many(['test1', 'test2', 'test3'])
+        IdempotencyKey.objects.exclude(key='test3').update(
+            date_created=timezone.now() - datetime.timedelta(seconds=61)
+        )
+
+        self.assertEqual(2, IdempotencyKey.compact(60, batch_size=1))
+        self.assertEqual(
+            ['test3'], list(
+                IdempotencyKey.objects.values_list('key', flat=True)
+            )
+        )
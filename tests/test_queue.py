@@ -0,0 +1,161 @@
+from django.test import override_settings, TestCase
+
+from mock import Mock, patch
+
+from django_twilio_sms.models import QueuedMessage, WebhookEvent
+from django_twilio_sms.queue import (
+    DatabaseBackend,
+    dispatch_batch,
+    get_backend,
+    is_enabled,
+    process_batch,
+    process_event
+)
+
+from .mommy_recipes import message_recipe
+
+
+class DummyBackend(object):
+    pass
+
+
+class DatabaseBackendTest(TestCase):
+
+    def test_enqueue(self):
+        event = DatabaseBackend().enqueue(
+            WebhookEvent.CALLBACK, {'MessageSid': 'test'}
+        )
+        self.assertEqual(event, WebhookEvent.objects.get())
+        self.assertEqual(WebhookEvent.PENDING, event.status)
+
+
+class QueueTest(TestCase):
+
+    def test_get_backend_default(self):
+        self.assertIsInstance(get_backend(), DatabaseBackend)
+
+    @override_settings(
+        DJANGO_TWILIO_SMS_WEBHOOK_QUEUE_BACKEND='tests.test_queue.DummyBackend'
+    )
+    def test_get_backend(self):
+        self.assertIsInstance(get_backend(), DummyBackend)
+
+    @override_settings(DJANGO_TWILIO_SMS_WEBHOOK_QUEUE=True)
+    def test_is_enabled(self):
+        self.assertTrue(is_enabled())
+
+    def test_is_enabled_default(self):
+        self.assertFalse(is_enabled())
+
+    @patch('django_twilio_sms.views.inbound_message_view')
+    @patch('django_twilio_sms.views.message_view')
+    def test_process_event_callback(
+            self, message_view, inbound_message_view):
+        event = WebhookEvent.enqueue(
+            WebhookEvent.CALLBACK, {'MessageSid': 'test'}
+        )
+        self.assertTrue(process_event(event))
+        self.assertEqual('test', message_view.call_args[0][0].messagesid)
+        self.assertFalse(inbound_message_view.called)
+        self.assertEqual(WebhookEvent.PROCESSED, event.status)
+
+    @patch('django_twilio_sms.views.inbound_message_view')
+    @patch('django_twilio_sms.views.message_view')
+    def test_process_event_inbound(self, message_view, inbound_message_view):
+        event = WebhookEvent.enqueue(
+            WebhookEvent.INBOUND, {'MessageSid': 'test'}
+        )
+        self.assertTrue(process_event(event))
+        self.assertEqual(
+            'test', inbound_message_view.call_args[0][0].messagesid
+        )
+        self.assertFalse(message_view.called)
+
+    @patch('django_twilio_sms.views.message_view')
+    def test_process_event_exception(self, message_view):
+        message_view.side_effect = Exception('test')
+        event = WebhookEvent.enqueue(
+            WebhookEvent.CALLBACK, {'MessageSid': 'test'}
+        )
+        self.assertFalse(process_event(event))
+        self.assertEqual(WebhookEvent.PENDING, event.status)
+        self.assertEqual('test', event.error)
+
+    @patch('django_twilio_sms.views.message_view')
+    def test_process_batch(self, message_view):
+        message_view.side_effect = [None, Exception('test'), None]
+        for i in range(3):
+            WebhookEvent.enqueue(WebhookEvent.CALLBACK, {'MessageSid': i})
+        self.assertEqual((2, 1), process_batch(batch_size=3))
+        self.assertEqual(
+            2, WebhookEvent.objects.filter(
+                status=WebhookEvent.PROCESSED
+            ).count()
+        )
+        self.assertEqual(
+            1, WebhookEvent.objects.filter(status=WebhookEvent.PENDING).count()
+        )
+
+    def test_process_batch_empty(self):
+        self.assertEqual((0, 0), process_batch())
+
+
+class DispatchBatchTest(TestCase):
+
+    @patch('django_twilio_sms.models.QueuedMessage.send')
+    def test_dispatch_batch(self, send):
+        send.side_effect = [None, Exception('test'), None]
+        for i in range(3):
+            QueuedMessage.enqueue('test', '+1999999999{}'.format(i))
+
+        self.assertEqual((2, 1), dispatch_batch(batch_size=3))
+        self.assertEqual(
+            1, QueuedMessage.objects.filter(
+                status=QueuedMessage.PENDING, error='test'
+            ).count()
+        )
+
+    @override_settings(DJANGO_TWILIO_SMS_SEND_RATE=100)
+    @patch('django_twilio_sms.models.Message.get_or_create')
+    @patch('django_twilio_sms.models.Message.create_twilio_message')
+    def test_dispatch_batch_if_claim_expires(
+            self, create_twilio_message, get_or_create):
+        queued_messages = [
+            QueuedMessage.enqueue('test', '+1999999999{}'.format(i))
+            for i in range(2)
+        ]
+
+        def create(body, to, from_, messaging_service_sid):
+            # the second message waits past its claim and is reclaimed
+            QueuedMessage.objects.filter(pk=queued_messages[1].pk).update(
+                claim='other'
+            )
+            return Mock(sid='SM{}'.format(to))
+        create_twilio_message.side_effect = create
+        get_or_create.return_value = (message_recipe.make(), True)
+
+        self.assertEqual((1, 1), dispatch_batch(batch_size=2))
+        self.assertEqual(1, create_twilio_message.call_count)
+        reclaimed = QueuedMessage.objects.get(pk=queued_messages[1].pk)
+        self.assertEqual(QueuedMessage.SENDING, reclaimed.status)
+        self.assertEqual('other', reclaimed.claim)
+        self.assertEqual('', reclaimed.sid)
+
+    @override_settings(
+        DJANGO_TWILIO_SMS_SEND_RATE=.01,
+        DJANGO_TWILIO_SMS_SEND_QUEUE_CLAIM_TIMEOUT=300
+    )
+    @patch('django_twilio_sms.models.QueuedMessage.send')
+    def test_dispatch_batch_limited_to_send_rate(self, send):
+        for i in range(3):
+            QueuedMessage.enqueue('test', '+1999999999{}'.format(i))
+
+        self.assertEqual((1, 0), dispatch_batch(batch_size=3))
+        self.assertEqual(
+            2, QueuedMessage.objects.filter(
+                status=QueuedMessage.PENDING
+            ).count()
+        )
+
+    def test_dispatch_batch_empty(self):
+        self.assertEqual((0, 0), dispatch_batch())
@@ -0,0 +1,283 @@
+import datetime
+
+from django.test import override_settings, TestCase
+from django.utils import timezone
+
+from mock import Mock, patch
+from model_mommy import mommy
+from twilio.rest.exceptions import TwilioRestException
+
+from django_twilio_sms.models import (
+    Account,
+    ApiVersion,
+    Currency,
+    Message,
+    MessageDailyStat,
+    ReconcileRun
+)
+from django_twilio_sms.reconcile import (
+    apply_twilio_message,
+    iter_candidates,
+    reconcile,
+    update_in_bulk
+)
+
+from .mommy_recipes import message_recipe
+
+
+def mock_message(status='delivered', price='-0.00750', error_code=None,
+                 date_sent=datetime.datetime(2016, 1, 1, tzinfo=timezone.utc)):
+    return Mock(
+        date_sent=date_sent,
+        status=status,
+        error_code=error_code,
+        error_message='error' if error_code else None,
+        price=price,
+        price_unit='USD',
+    )
+
+
+class ReconcileTest(TestCase):
+
+    def setUp(self):
+        super(ReconcileTest, self).setUp()
+        self.account = mommy.make(Account)
+        self.api_version = mommy.make(ApiVersion)
+        self.currency = mommy.make(Currency, code='USD')
+
+    def make_message(self, age=7200, **kwargs):
+        message = message_recipe.make(
+            account=self.account, api_version=self.api_version,
+            currency=self.currency, price='0.0', **kwargs
+        )
+        Message.objects.filter(pk=message.pk).update(
+            date_created=timezone.now() - datetime.timedelta(seconds=age)
+        )
+        return Message.objects.get(pk=message.pk)
+
+    def test_iter_candidates(self):
+        messages = [
+            self.make_message(sid='SM{}'.format(i), status=Message.SENT)
+            for i in range(5)
+        ]
+        self.make_message(sid='SMdelivered', status=Message.DELIVERED)
+        self.make_message(sid='SMnew', status=Message.SENT, age=0)
+
+        batches = list(iter_candidates(
+            None, timezone.now() - datetime.timedelta(seconds=3600), 2
+        ))
+
+        self.assertEqual([2, 2, 1], [len(batch) for batch in batches])
+        self.assertEqual(
+            sorted(message.sid for message in messages),
+            sorted(message.sid for batch in batches for message in batch)
+        )
+
+    def test_iter_candidates_low_water_mark(self):
+        self.make_message(sid='SMold', status=Message.SENT, age=10000)
+        self.make_message(sid='SMnew', status=Message.SENT, age=5000)
+
+        batches = list(iter_candidates(
+            timezone.now() - datetime.timedelta(seconds=7200),
+            timezone.now(), 10
+        ))
+
+        self.assertEqual(['SMnew'], [message.sid for message in batches[0]])
+
+    def test_apply_twilio_message(self):
+        message = self.make_message(status=Message.SENT)
+        fields = apply_twilio_message(message, mock_message(error_code=1))
+
+        self.assertEqual(Message.DELIVERED, message.status)
+        self.assertEqual(1, message.error.code)
+        self.assertEqual(
+            sorted(['status', 'date_sent', 'error_id', 'price']),
+            sorted(fields)
+        )
+
+    def test_apply_twilio_message_if_unchanged(self):
+        message = self.make_message(status=Message.SENT)
+        message.date_sent = datetime.datetime(
+            2016, 1, 1, tzinfo=timezone.utc
+        )
+        self.assertEqual([], apply_twilio_message(
+            message, mock_message(status='sent', price=None)
+        ))
+
+    def test_update_in_bulk(self):
+        sent = self.make_message(sid='SM1', status=Message.SENT)
+        queued = self.make_message(sid='SM2', status=Message.QUEUED)
+        untouched = self.make_message(sid='SM3', status=Message.QUEUED)
+        sent.status = Message.DELIVERED
+        sent.price = '-0.00750'
+        queued.status = Message.FAILED
+
+        with self.assertNumQueries(1):
+            update_in_bulk([sent, queued], ['status', 'price'])
+
+        sent.refresh_from_db()
+        queued.refresh_from_db()
+        untouched.refresh_from_db()
+        self.assertEqual(Message.DELIVERED, sent.status)
+        self.assertEqual(-0.0075, float(sent.price))
+        self.assertEqual(Message.FAILED, queued.status)
+        self.assertEqual(Message.QUEUED, untouched.status)
+
+    @patch('django_twilio_sms.reconcile.twilio_client')
+    def test_reconcile(self, twilio_client):
+        self.make_message(sid='SM1', status=Message.SENT)
+        self.make_message(sid='SM2', status=Message.SENT)
+        self.make_message(sid='SM3', status=Message.QUEUED)
+
+        def get(sid):
+            if sid == 'SM2':
+                raise TwilioRestException(status=401, uri='test', msg='test')
+            if sid == 'SM3':
+                return mock_message(
+                    status='queued', price=None, date_sent=None
+                )
+            return mock_message()
+        twilio_client.messages.get.side_effect = get
+
+        run = reconcile(concurrency=2)
+
+        self.assertEqual(3, run.checked)
+        self.assertEqual(1, run.updated)
+        self.assertEqual(1, run.failed)
+        self.assertIsNotNone(run.date_completed)
+        self.assertEqual(
+            Message.DELIVERED, Message.objects.get(sid='SM1').status
+        )
+
+    @override_settings(DJANGO_TWILIO_SMS_DAILY_STATS=True)
+    @patch('django_twilio_sms.reconcile.twilio_client')
+    def test_reconcile_daily_stats(self, twilio_client):
+        twilio_client.messages.get.return_value = mock_message()
+        message = self.make_message(
+            sid='SM1', status=Message.SENT,
+            date_sent=datetime.datetime(2016, 1, 1, tzinfo=timezone.utc)
+        )
+        MessageDailyStat.apply([(None, message.get_field_values())])
+
+        reconcile()
+
+        stat = MessageDailyStat.objects.get()
+        self.assertEqual(1, stat.messages)
+        self.assertEqual(1, stat.delivered)
+        self.assertEqual(-0.0075, float(stat.price))
+
+    @patch('django_twilio_sms.reconcile.twilio_client')
+    def test_reconcile_high_water_mark(self, twilio_client):
+        twilio_client.messages.get.return_value = mock_message()
+        self.make_message(sid='SM1', status=Message.SENT)
+        reconcile()
+
+        self.make_message(sid='SM2', status=Message.SENT, age=1800)
+        run = reconcile(age=1000)
+        self.assertEqual(1, run.checked)
+        twilio_client.messages.get.assert_called_with('SM2')
+
+        Message.objects.update(status=Message.SENT)
+        run = reconcile(age=1000, full=True)
+        self.assertEqual(2, run.checked)
+
+    @patch('django_twilio_sms.reconcile.twilio_client')
+    def test_reconcile_high_water_mark_if_pending(self, twilio_client):
+        twilio_client.messages.get.return_value = mock_message(
+            status='sent', price=None
+        )
+        pending = self.make_message(sid='SM1', status=Message.QUEUED, age=7300)
+        self.make_message(sid='SM2', status=Message.SENT)
+
+        run = reconcile(age=3600)
+        self.assertEqual(2, run.updated)
+        self.assertEqual(pending.date_created, run.high_water_mark)
+
+        twilio_client.messages.get.return_value = mock_message()
+        run = reconcile(age=3600)
+        self.assertEqual(2, run.checked)
+        self.assertEqual(0, reconcile(age=3600).checked)
+
+    @patch('django_twilio_sms.reconcile.twilio_client')
+    def test_reconcile_high_water_mark_if_failed(self, twilio_client):
+        twilio_client.messages.get.return_value = mock_message()
+        failed = self.make_message(sid='SM1', status=Message.SENT, age=7300)
+        self.make_message(sid='SM2', status=Message.SENT)
+
+        def get(sid):
+            if sid == 'SM1':
+                raise TwilioRestException(status=401, uri='test', msg='test')
+            return mock_message()
+        twilio_client.messages.get.side_effect = get
+
+        run = reconcile(age=3600)
+        self.assertEqual(1, run.failed)
+        self.assertEqual(failed.date_created, run.high_water_mark)
+
+        twilio_client.messages.get.side_effect = None
+        twilio_client.messages.get.reset_mock()
+        run = reconcile(age=3600)
+        self.assertEqual(1, run.checked)
+        self.assertEqual(0, run.failed)
+        twilio_client.messages.get.assert_called_once_with('SM1')
+
+        run = reconcile(age=3600)
+        self.assertEqual(0, run.checked)
+
+    @patch('django_twilio_sms.reconcile.twilio_client')
+    def test_reconcile_unknown_status(self, twilio_client):
+        self.make_message(sid='SM1', status=Message.SENT)
+        self.make_message(sid='SM2', status=Message.SENT)
+
+        def get(sid):
+            if sid == 'SM2':
+                return mock_message(status='unmapped')
+            return mock_message()
+        twilio_client.messages.get.side_effect = get
+
+        run = reconcile()
+
+        self.assertEqual(2, run.updated)
+        sent = Message.objects.get(sid='SM2')
+        self.assertEqual(
+            Message.DELIVERED, Message.objects.get(sid='SM1').status
+        )
+        self.assertEqual(Message.SENT, sent.status)
+        self.assertEqual(-0.0075, float(sent.price))
+
+    @override_settings(DJANGO_TWILIO_SMS_DAILY_STATS=True)
+    @patch('django_twilio_sms.reconcile.twilio_client')
+    def test_reconcile_if_updated_by_callback(self, twilio_client):
+        twilio_client.messages.get.return_value = mock_message()
+        message = self.make_message(
+            sid='SM1', status=Message.SENT,
+            date_sent=datetime.datetime(2016, 1, 1, tzinfo=timezone.utc)
+        )
+        MessageDailyStat.apply([(None, message.get_field_values())])
+
+        def apply(fetched, twilio_message):
+            # a delivered callback is stored while the message is fetched
+            original = message.get_field_values()
+            message.status = Message.DELIVERED
+            message.save()
+            MessageDailyStat.apply([(original, message.get_field_values())])
+            return apply_twilio_message(fetched, twilio_message)
+
+        with patch(
+                'django_twilio_sms.reconcile.apply_twilio_message', apply):
+            run = reconcile()
+
+        self.assertEqual(0, run.updated)
+        stat = MessageDailyStat.objects.get()
+        self.assertEqual(1, stat.messages)
+        self.assertEqual(1, stat.delivered)
+
+    def test_get_low_water_mark(self):
+        self.assertEqual(None, ReconcileRun.get_low_water_mark())
+        high_water_mark = timezone.now()
+        mommy.make(
+            ReconcileRun, high_water_mark=high_water_mark,
+            date_completed=timezone.now()
+        )
+        mommy.make(ReconcileRun, high_water_mark=timezone.now())
+        self.assertEqual(high_water_mark, ReconcileRun.get_low_water_mark())
@@ -0,0 +1,201 @@
+import socket
+
+from django.test import override_settings, TestCase
+
+from httplib2 import ServerNotFoundError
+from mock import Mock, patch
+from twilio.rest.exceptions import TwilioRestException
+
+from django_twilio_sms.retry import (
+    CircuitOpen,
+    RateLimiter,
+    RETRY_CREATE_STATUSES,
+    RETRY_NOT_FOUND_STATUSES,
+    RetryPolicy
+)
+
+
+def twilio_exception(status):
+    return TwilioRestException(
+        status=status, method='test', uri='test', msg='test', code='test'
+    )
+
+
+@override_settings(DJANGO_TWILIO_SMS_RETRY_SLEEP=.001)
+class RetryPolicyTest(TestCase):
+
+    def setUp(self):
+        super(RetryPolicyTest, self).setUp()
+        self.policy = RetryPolicy()
+
+    def test_call(self):
+        func = Mock(return_value='test')
+        self.assertEqual('test', self.policy.call(func, 'a', b='b'))
+        func.assert_called_once_with('a', b='b')
+        self.assertEqual(1, self.policy.stats()['calls'])
+
+    def test_call_retryable(self):
+        func = Mock(side_effect=[twilio_exception(503), 'test'])
+        self.assertEqual('test', self.policy.call(func))
+        self.assertEqual(2, func.call_count)
+        self.assertEqual(1, self.policy.stats()['retries'])
+        self.assertGreater(self.policy.stats()['slept'], 0)
+
+    def test_call_not_retryable(self):
+        func = Mock(side_effect=twilio_exception(400))
+        with self.assertRaises(TwilioRestException):
+            self.policy.call(func)
+        self.assertEqual(1, func.call_count)
+        self.assertEqual(0, self.policy.stats()['failures'])
+
+    def test_call_not_found(self):
+        func = Mock(side_effect=twilio_exception(404))
+        with self.assertRaises(TwilioRestException):
+            self.policy.call(func)
+        self.assertEqual(1, func.call_count)
+
+    def test_call_retry_statuses(self):
+        func = Mock(side_effect=[twilio_exception(404), 'test'])
+        self.assertEqual('test', self.policy.call(
+            func, retry_statuses=RETRY_NOT_FOUND_STATUSES
+        ))
+        self.assertEqual(2, func.call_count)
+
+    def test_call_not_found_max_retries(self):
+        func = Mock(side_effect=twilio_exception(404))
+        with self.assertRaises(TwilioRestException):
+            self.policy.call(func, retry_statuses=RETRY_NOT_FOUND_STATUSES)
+        self.assertEqual(3, func.call_count)
+        self.assertEqual(0, self.policy.stats()['failures'])
+
+    def test_call_connection_error(self):
+        func = Mock(side_effect=[
+            socket.timeout('test'), ServerNotFoundError('test'), 'test'
+        ])
+        self.assertEqual('test', self.policy.call(func))
+        self.assertEqual(3, func.call_count)
+        self.assertEqual(2, self.policy.stats()['retries'])
+
+    def test_call_connection_error_not_retryable(self):
+        func = Mock(side_effect=socket.error('test'))
+        with self.assertRaises(socket.error):
+            self.policy.call(func, retry_statuses=RETRY_CREATE_STATUSES)
+        self.assertEqual(1, func.call_count)
+        self.assertEqual(1, self.policy.stats()['failures'])
+
+    @override_settings(DJANGO_TWILIO_SMS_RETRY_TIMEOUT=.05)
+    def test_call_retry_timeout(self):
+        func = Mock(side_effect=twilio_exception(503))
+        with patch.object(self.policy, 'get_sleep') as get_sleep:
+            get_sleep.return_value = .03
+            with self.assertRaises(TwilioRestException):
+                self.policy.call(func)
+        self.assertEqual(2, func.call_count)
+        self.assertEqual(1, self.policy.stats()['retries'])
+        self.assertEqual(1, self.policy.stats()['failures'])
+
+    @override_settings(DJANGO_TWILIO_SMS_MAX_RETRIES=2)
+    def test_call_max_retries(self):
+        func = Mock(side_effect=twilio_exception(503))
+        with self.assertRaises(TwilioRestException):
+            self.policy.call(func)
+        self.assertEqual(3, func.call_count)
+        self.assertEqual(1, self.policy.stats()['failures'])
+
+    @override_settings(DJANGO_TWILIO_SMS_RETRY_BUDGET=1)
+    def test_call_retry_budget(self):
+        func = Mock(side_effect=twilio_exception(503))
+        with self.assertRaises(TwilioRestException):
+            self.policy.call(func)
+        self.assertEqual(2, func.call_count)
+        with self.assertRaises(TwilioRestException):
+            self.policy.call(func)
+        self.assertEqual(3, func.call_count)
+
+    @override_settings(
+        DJANGO_TWILIO_SMS_MAX_RETRIES=0,
+        DJANGO_TWILIO_SMS_CIRCUIT_BREAKER_THRESHOLD=2
+    )
+    def test_call_circuit_breaker(self):
+        func = Mock(side_effect=twilio_exception(500))
+        for i in range(2):
+            with self.assertRaises(TwilioRestException):
+                self.policy.call(func)
+        with self.assertRaises(CircuitOpen):
+            self.policy.call(func)
+        self.assertEqual(2, func.call_count)
+        self.assertEqual(1, self.policy.stats()['short_circuits'])
+
+        self.policy.reset()
+        func.side_effect = None
+        self.policy.call(func)
+        self.assertEqual(3, func.call_count)
+
+    @override_settings(
+        DJANGO_TWILIO_SMS_MAX_RETRIES=0,
+        DJANGO_TWILIO_SMS_CIRCUIT_BREAKER_THRESHOLD=2
+    )
+    def test_call_success_closes_circuit_breaker(self):
+        func = Mock(side_effect=[twilio_exception(500), 'test',
+                                 twilio_exception(500), 'test'])
+        for i in range(4):
+            try:
+                self.policy.call(func)
+            except TwilioRestException:
+                pass
+        self.assertFalse(self.policy.is_open())
+
+    def test_iter(self):
+        resource = Mock(uri='/Messages', key='messages')
+        resource.load_instance.side_effect = lambda data: data['sid']
+        resource.request.side_effect = [
+            (None, {
+                'messages': [{'sid': 'SM1'}, {'sid': 'SM2'}],
+                'next_page_uri': '/Messages?PageSize=2&PageToken=PA2'
+            }),
+            twilio_exception(503),
+            (None, {'messages': [{'sid': 'SM3'}], 'next_page_uri': None}),
+        ]
+
+        self.assertEqual(['SM1', 'SM2', 'SM3'], list(self.policy.iter(
+            resource, date_sent='2016-01-01', page_size=2
+        )))
+        self.assertEqual(3, resource.request.call_count)
+        resource.request.assert_called_with('GET', '/Messages', params={
+            'DateSent': '2016-01-01', 'PageSize': ['2'],
+            'PageToken': ['PA2']
+        })
+        self.assertEqual(1, self.policy.stats()['retries'])
+
+    @override_settings(
+        DJANGO_TWILIO_SMS_RETRY_SLEEP=1, DJANGO_TWILIO_SMS_RETRY_MAX_SLEEP=4
+    )
+    @patch('django_twilio_sms.retry.random.uniform')
+    def test_get_sleep(self, uniform):
+        self.policy.get_sleep(0)
+        uniform.assert_called_with(0, 1)
+        self.policy.get_sleep(2)
+        uniform.assert_called_with(0, 4)
+        self.policy.get_sleep(5)
+        uniform.assert_called_with(0, 4)
+
+
+class RateLimiterTest(TestCase):
+
+    @patch('django_twilio_sms.retry.time')
+    def test_wait(self, time):
+        time.time.return_value = 100
+        rate_limiter = RateLimiter(2)
+
+        rate_limiter.wait()
+        self.assertFalse(time.sleep.called)
+        rate_limiter.wait()
+        time.sleep.assert_called_once_with(.5)
+        rate_limiter.wait()
+        time.sleep.assert_called_with(1)
+
+    @patch('django_twilio_sms.retry.time')
+    def test_wait_if_no_rate(self, time):
+        RateLimiter().wait()
+        self.assertFalse(time.time.called)
+        self.assertFalse(time.sleep.called)
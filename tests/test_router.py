@@ -0,0 +1,132 @@
+from django.db import transaction
+from django.test import override_settings, TestCase, TransactionTestCase
+
+from model_mommy import mommy
+
+from django_twilio_sms.models import Action, Response
+from django_twilio_sms.router import action_router, ActionRouter
+
+
+class ActionRouterTest(TestCase):
+
+    def setUp(self):
+        super(ActionRouterTest, self).setUp()
+        self.router = ActionRouter()
+        self.unknown = mommy.make(Action, name='UNKNOWN')
+        self.help = mommy.make(Action, name='HELP')
+        self.opt_out = mommy.make(Action, name='OPT OUT')
+        self.response = mommy.make(Response, action=self.help, body='test')
+
+    def test_build(self):
+        table = self.router.build()
+        self.assertEqual(
+            (self.help, self.response), table['routes']['HELP']
+        )
+        self.assertEqual((self.unknown, None), table['routes']['UNKNOWN'])
+
+    def test_build_inactive(self):
+        mommy.make(Action, name='INACTIVE', active=False)
+        mommy.make(Response, action=self.unknown, active=False)
+        table = self.router.build()
+        self.assertNotIn('INACTIVE', table['routes'])
+        self.assertEqual(None, table['routes']['UNKNOWN'][1])
+
+    def test_get_table_cached(self):
+        self.router.get_table()
+        with self.assertNumQueries(0):
+            self.router.get_table()
+
+    @override_settings(DJANGO_TWILIO_SMS_ACTION_ROUTER_TIMEOUT=0)
+    def test_get_table_timeout(self):
+        self.router.get_table()
+        with self.assertNumQueries(2):
+            self.router.get_table()
+
+    def test_invalidate(self):
+        self.router.get_table()
+        self.router.invalidate()
+        with self.assertNumQueries(2):
+            self.router.get_table()
+
+    def test_match_exact(self):
+        self.assertEqual('HELP', self.router.match(' help '))
+        self.assertEqual('UNKNOWN', self.router.match('help me'))
+
+    @override_settings(DJANGO_TWILIO_SMS_ACTION_MATCH='first_word')
+    def test_match_first_word(self):
+        self.assertEqual('HELP', self.router.match('help me'))
+        self.assertEqual('UNKNOWN', self.router.match('helpme'))
+        self.assertEqual('UNKNOWN', self.router.match(''))
+
+    @override_settings(DJANGO_TWILIO_SMS_ACTION_MATCH='prefix')
+    def test_match_prefix(self):
+        self.assertEqual('OPT OUT', self.router.match('opt out please'))
+        self.assertEqual('HELP', self.router.match('help me'))
+        self.assertEqual('UNKNOWN', self.router.match('helpme'))
+
+    def test_get_action(self):
+        self.assertEqual(self.help, self.router.get_action('help'))
+        self.assertEqual(self.unknown, self.router.get_action('test'))
+
+    def test_get_action_does_not_exist(self):
+        self.unknown.delete()
+        with self.assertRaises(Action.DoesNotExist):
+            self.router.get_action('test')
+
+    def test_get_active_response(self):
+        self.assertEqual(
+            self.response, self.router.get_active_response(self.help)
+        )
+        self.assertEqual(None, self.router.get_active_response(self.unknown))
+
+
+class ActionRouterInvalidationTest(TestCase):
+
+    def setUp(self):
+        super(ActionRouterInvalidationTest, self).setUp()
+        action_router.invalidate()
+
+    def test_get_action_no_queries(self):
+        action = mommy.make(Action, name='HELP')
+        response = mommy.make(Response, action=action)
+        Action.get_action('help').get_active_response()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                response, Action.get_action('help').get_active_response()
+            )
+
+    def test_action_post_save(self):
+        mommy.make(Action, name='UNKNOWN')
+        action_router.get_table()
+        action = mommy.make(Action, name='HELP')
+        self.assertEqual(action, Action.get_action('help'))
+
+    def test_response_post_save(self):
+        action = mommy.make(Action, name='HELP')
+        mommy.make(Response, action=action)
+        action_router.get_table()
+        response = mommy.make(Response, action=action)
+        self.assertEqual(response, action.get_active_response())
+
+    def test_post_delete(self):
+        unknown = mommy.make(Action, name='UNKNOWN')
+        action = mommy.make(Action, name='HELP')
+        action_router.get_table()
+        action.delete()
+        self.assertEqual(unknown, Action.get_action('help'))
+
+
+class ActionRouterCommitTest(TransactionTestCase):
+
+    def setUp(self):
+        super(ActionRouterCommitTest, self).setUp()
+        action_router.invalidate()
+
+    def test_invalidate_on_commit(self):
+        with transaction.atomic():
+            mommy.make(Action, name='HELP')
+            # rebuilt by a request before the commit
+            action_router.get_table()
+
+        with self.assertNumQueries(2):
+            action_router.get_table()
@@ -0,0 +1,165 @@
+import threading
+
+from django.test import override_settings, TestCase
+
+from mock import Mock, patch
+
+from django_twilio_sms.scheduler import (
+    send_scheduler,
+    SendScheduler,
+    TokenBucket
+)
+
+
+class TokenBucketTest(TestCase):
+
+    @patch('django_twilio_sms.scheduler.time')
+    def test_take(self, time):
+        time.time.return_value = 100
+        bucket = TokenBucket(2)
+
+        self.assertEqual(0, bucket.take())
+        self.assertEqual(0, bucket.take())
+        self.assertEqual(.5, bucket.take())
+
+        time.time.return_value = 100.5
+        self.assertEqual(0, bucket.take())
+        self.assertEqual(.5, bucket.take())
+
+    @patch('django_twilio_sms.scheduler.time')
+    def test_take_capacity(self, time):
+        time.time.return_value = 100
+        bucket = TokenBucket(.5)
+        self.assertEqual(1, bucket.capacity)
+        self.assertEqual(0, bucket.take())
+        self.assertEqual(2, bucket.take())
+
+        time.time.return_value = 1000
+        self.assertEqual(0, bucket.take())
+        self.assertEqual(2, bucket.take())
+
+
+@override_settings(DJANGO_TWILIO_SMS_SEND_RATE=1000)
+class SendSchedulerTest(TestCase):
+
+    def setUp(self):
+        super(SendSchedulerTest, self).setUp()
+        self.scheduler = SendScheduler()
+
+    @override_settings(
+        DJANGO_TWILIO_SMS_SEND_RATE=10,
+        DJANGO_TWILIO_SMS_SEND_RATES={'+19999999991': .5}
+    )
+    def test_get_batch_limit(self):
+        self.assertEqual(75, self.scheduler.get_batch_limit(150))
+        self.assertEqual(1, self.scheduler.get_batch_limit(1))
+
+    def test_get_next_empty(self):
+        self.assertEqual(None, self.scheduler.get_next(block=False))
+
+    def test_get_next_campaigns(self):
+        for i in range(3):
+            self.scheduler.submit('a', i, '+19999999991', campaign='a')
+        self.scheduler.submit('b', 0, '+19999999991', campaign='b')
+
+        bodies = []
+        while True:
+            request = self.scheduler.get_next(block=False)
+            if request is None:
+                break
+            bodies.append(request.body)
+        self.assertEqual(['a', 'b', 'a', 'a'], bodies)
+
+    @override_settings(DJANGO_TWILIO_SMS_SEND_RATES={'+19999999991': 1})
+    @patch('django_twilio_sms.scheduler.time')
+    def test_get_next_rate_limited(self, time):
+        time.time.return_value = 100
+        self.scheduler.submit('test', '+19999999993', '+19999999991')
+        self.scheduler.submit('test', '+19999999994', '+19999999991')
+        self.scheduler.submit('test', '+19999999993', '+19999999992')
+
+        self.assertEqual('+19999999991', self.scheduler.get_next().from_)
+        # the second sender is not held up by the first
+        self.assertEqual('+19999999992', self.scheduler.get_next().from_)
+        self.assertEqual(
+            {'+19999999991': 1}, self.scheduler.queued()
+        )
+
+    @override_settings(
+        DJANGO_TWILIO_SMS_SENDER_POOLS={
+            'pool': ['+19999999991', '+19999999992']
+        },
+        DJANGO_TWILIO_SMS_SEND_RATE=1
+    )
+    @patch('django_twilio_sms.scheduler.time')
+    def test_get_next_pool(self, time):
+        time.time.return_value = 100
+        for i in range(2):
+            self.scheduler.submit('test', '+19999999993', 'pool')
+
+        self.assertEqual(
+            ['+19999999991', '+19999999992'],
+            [self.scheduler.get_next().from_ for i in range(2)]
+        )
+
+    def test_get_next_messaging_service(self):
+        self.scheduler.submit(
+            'test', '+19999999993', '+19999999991',
+            messaging_service_sid='MGtest'
+        )
+        request = self.scheduler.get_next()
+        self.assertEqual('MGtest', request.sender)
+        self.assertEqual('+19999999991', request.from_)
+
+    def test_get_next_stopped(self):
+        thread = threading.Thread(target=self.scheduler.get_next)
+        thread.start()
+        self.scheduler.stop()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+    @patch('django_twilio_sms.scheduler.Message.get_or_create')
+    @patch('django_twilio_sms.scheduler.Message.create_twilio_message')
+    def test_dispatch(self, create_twilio_message, get_or_create):
+        message = Mock()
+        get_or_create.return_value = (message, True)
+        create_twilio_message.side_effect = [Mock(), Exception('test')]
+        sent = self.scheduler.submit('test', '+19999999993', '+19999999991')
+        failed = self.scheduler.submit(
+            'test', '+19999999994', '+19999999991'
+        )
+
+        self.scheduler.dispatch()
+
+        self.assertEqual(message, sent.wait())
+        with self.assertRaises(Exception):
+            failed.wait()
+        create_twilio_message.assert_any_call(
+            'test', '+19999999993', '+19999999991', None
+        )
+        stats = self.scheduler.stats()['+19999999991']
+        self.assertEqual(1, stats['sent'])
+        self.assertEqual(1, stats['failed'])
+        self.assertEqual(1.0 / 60, stats['rate'])
+
+    @patch('django_twilio_sms.scheduler.connection')
+    @patch('django_twilio_sms.scheduler.SendRequest.send')
+    def test_dispatch_concurrency(self, send, connection):
+        send.return_value = Mock()
+        requests = [
+            self.scheduler.submit('test', i, '+19999999991')
+            for i in range(10)
+        ]
+
+        self.scheduler.dispatch(concurrency=3)
+
+        self.assertEqual(10, send.call_count)
+        self.assertTrue(all(request.message for request in requests))
+        self.assertEqual(3, connection.close.call_count)
+
+    def test_reset_on_setting_changed(self):
+        send_scheduler.get_bucket('+19999999991')
+        with self.settings(DJANGO_TWILIO_SMS_SEND_RATE=5):
+            self.assertEqual(
+                5, send_scheduler.get_bucket('+19999999991').rate
+            )
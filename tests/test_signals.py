@@ -0,0 +1,201 @@
+import gc
+import threading
+
+from django.db import transaction
+from django.test import override_settings, TestCase, TransactionTestCase
+
+from mock import Mock, patch
+
+from django_twilio_sms.signals import AsyncSignal, ReceiverPool, receiver_pool
+
+
+def sync_receiver(sender, **kwargs):
+    return 'sync'
+
+
+def failing_receiver(sender, **kwargs):
+    raise Exception('test')
+
+
+class ReceiverPoolTest(TestCase):
+
+    def setUp(self):
+        super(ReceiverPoolTest, self).setUp()
+        self.pool = ReceiverPool()
+        self.addCleanup(self.pool.close)
+
+    @patch('django_twilio_sms.signals.connection')
+    def test_submit(self, connection):
+        func = Mock()
+        self.pool.submit(func, 'test')
+        self.assertTrue(self.pool.wait(5))
+        func.assert_called_once_with('test')
+        self.assertTrue(connection.close.called)
+
+    @override_settings(DJANGO_TWILIO_SMS_SIGNAL_QUEUE_SIZE=0)
+    def test_submit_if_full(self):
+        threads = []
+        self.pool.submit(
+            lambda: threads.append(threading.current_thread())
+        )
+        self.assertEqual([threading.current_thread()], threads)
+
+    @override_settings(DJANGO_TWILIO_SMS_SIGNAL_WORKERS=1)
+    @patch('django_twilio_sms.signals.connection')
+    def test_wait_timeout(self, connection):
+        event = threading.Event()
+        self.pool.submit(event.wait, 5)
+        self.assertFalse(self.pool.wait(.01))
+        event.set()
+        self.assertTrue(self.pool.wait(5))
+
+
+class AsyncSignalTest(TestCase):
+
+    def setUp(self):
+        super(AsyncSignalTest, self).setUp()
+        self.signal = AsyncSignal(providing_args=['message'])
+
+    @patch('django_twilio_sms.signals.on_commit')
+    def test_send_robust(self, on_commit):
+        async_receiver = Mock(__name__='async_receiver')
+        self.signal.connect(sync_receiver)
+        self.signal.connect(failing_receiver)
+        self.signal.connect(async_receiver, run_async=True)
+
+        responses = self.signal.send_robust(sender=None, message='test')
+
+        self.assertEqual('sync', responses[0][1])
+        self.assertEqual('test', str(responses[1][1]))
+        self.assertIsNone(responses[2][1])
+        self.assertFalse(async_receiver.called)
+        self.assertTrue(on_commit.called)
+
+    @patch('django_twilio_sms.signals.on_commit')
+    def test_send_async(self, on_commit):
+        async_receiver = Mock(__name__='async_receiver')
+        self.signal.connect(async_receiver, run_async=True)
+
+        self.signal.send(sender=None, message='test')
+        on_commit.call_args[0][0]()
+        self.assertTrue(receiver_pool.wait(5))
+
+        async_receiver.assert_called_once_with(
+            signal=self.signal, sender=None, message='test'
+        )
+
+    def test_send_robust_no_receivers(self):
+        self.assertEqual([], self.signal.send_robust(sender=None))
+
+    def test_send(self):
+        self.signal.connect(failing_receiver)
+        with self.assertRaises(Exception):
+            self.signal.send(sender=None, message='test')
+
+    def test_connect_sync_after_async(self):
+        self.signal.connect(sync_receiver, run_async=True)
+        self.signal.connect(sync_receiver)
+        self.assertFalse(self.signal.is_async(sync_receiver))
+
+    def test_connect_twice(self):
+        self.signal.connect(sync_receiver)
+        self.signal.connect(sync_receiver)
+        self.assertEqual(1, len(self.signal.send(sender=None)))
+
+    def test_connect_sender(self):
+        self.signal.connect(sync_receiver, sender=str, run_async=True)
+        self.assertTrue(self.signal.is_async(sync_receiver, str))
+        self.assertFalse(self.signal.is_async(sync_receiver))
+        self.assertEqual([], self.signal.send(sender=int))
+
+    def test_disconnect(self):
+        self.signal.connect(sync_receiver, run_async=True)
+        self.signal.disconnect(sync_receiver)
+        self.assertFalse(self.signal.is_async(sync_receiver))
+        self.assertEqual([], self.signal.send_robust(sender=None))
+
+    def test_disconnect_dispatch_uid(self):
+        self.signal.connect(sync_receiver, dispatch_uid='test')
+        self.signal.disconnect(dispatch_uid='test')
+        self.assertEqual([], self.signal.send(sender=None))
+
+    def test_weak_receiver_collected(self):
+        def receiver(sender, **kwargs):
+            pass
+
+        self.signal.connect(receiver)
+        del receiver
+        gc.collect()
+        self.assertFalse(self.signal.has_listeners())
+
+    def test_weak_method_collected(self):
+        class Receiver(object):
+            def receive(self, sender, **kwargs):
+                return 'method'
+
+        receiver = Receiver()
+        self.signal.connect(receiver.receive)
+        self.assertEqual('method', self.signal.send(sender=None)[0][1])
+
+        del receiver
+        gc.collect()
+        self.assertFalse(self.signal.has_listeners())
+
+    def test_strong_receiver(self):
+        self.signal.connect(lambda sender, **kwargs: 'lambda', weak=False)
+        gc.collect()
+        self.assertEqual('lambda', self.signal.send(sender=None)[0][1])
+
+    def test_get_stats(self):
+        self.signal.connect(sync_receiver)
+        self.signal.connect(failing_receiver)
+        self.signal.send_robust(sender=None, message='test')
+        self.signal.send_robust(sender=None, message='test')
+
+        stats = self.signal.get_stats()
+        self.assertEqual(2, stats['tests.test_signals.sync_receiver']['calls'])
+        self.assertEqual(
+            0, stats['tests.test_signals.sync_receiver']['failed']
+        )
+        self.assertEqual(
+            2, stats['tests.test_signals.failing_receiver']['failed']
+        )
+
+        self.signal.reset_stats()
+        self.assertEqual({}, self.signal.get_stats())
+
+    @override_settings(DJANGO_TWILIO_SMS_SIGNAL_SLOW_RECEIVER=0)
+    @patch('django_twilio_sms.signals.logger')
+    def test_record_slow(self, logger):
+        self.signal.record(sync_receiver, .1, False)
+        logger.warning.assert_called_with(
+            'Slow receiver %s took %.3fs', 'tests.test_signals.sync_receiver',
+            .1
+        )
+
+    @patch('django_twilio_sms.signals.logger')
+    def test_call_async_exception(self, logger):
+        self.signal.call_async(failing_receiver, None, {})
+        self.assertTrue(logger.exception.called)
+
+
+class AsyncSignalTransactionTest(TransactionTestCase):
+
+    def test_send_robust_after_commit(self):
+        signal = AsyncSignal(providing_args=['message'])
+        called = []
+
+        def async_receiver(sender, **kwargs):
+            called.append(
+                (kwargs['message'], threading.current_thread())
+            )
+
+        signal.connect(async_receiver, run_async=True)
+
+        with transaction.atomic():
+            signal.send_robust(sender=None, message='test')
+            self.assertEqual([], called)
+
+        self.assertTrue(receiver_pool.wait(5))
+        self.assertEqual('test', called[0][0])
+        self.assertNotEqual(threading.current_thread(), called[0][1])
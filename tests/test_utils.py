@@ -2,9 +2,9 @@ from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.test import override_settings, TestCase
 
-from mock import patch
+from mock import Mock, patch
 
-from django_twilio_sms.utils import AbsoluteURI
+from django_twilio_sms.utils import AbsoluteURI, on_commit
 
 
 class AbsoluteURITest(TestCase):
@@ -15,6 +15,11 @@ class AbsoluteURITest(TestCase):
         absolute_uri = AbsoluteURI(namespace, url_name)
         self.assertEqual(namespace, absolute_uri.namespace)
         self.assertEqual(url_name, absolute_uri.url_name)
+        self.assertEqual(None, absolute_uri.host)
+
+    def test_get_host_if_host(self):
+        absolute_uri = AbsoluteURI('test', 'test', 'www.test.com')
+        self.assertEqual('www.test.com', absolute_uri.get_host())
 
     @override_settings(DJANGO_TWILIO_SMS_SITE_HOST='www.test.com')
     @override_settings(SECURE_SSL_REDIRECT=True)
@@ -26,6 +31,42 @@ class AbsoluteURITest(TestCase):
             'https://www.test.com/test/', absolute_uri.get_absolute_uri()
         )
 
+    @override_settings(DJANGO_TWILIO_SMS_SITE_HOST='www.test.com')
+    @patch('django_twilio_sms.utils.reverse')
+    def test_get_absolute_uri_cached(self, mock_reverse):
+        mock_reverse.return_value = '/test/'
+        AbsoluteURI('test', 'test').get_absolute_uri()
+        self.assertEqual(
+            'http://www.test.com/test/',
+            AbsoluteURI('test', 'test').get_absolute_uri()
+        )
+        mock_reverse.assert_called_once_with('test:test')
+
+    @override_settings(DJANGO_TWILIO_SMS_SITE_HOST='www.test.com')
+    @patch('django_twilio_sms.utils.reverse')
+    def test_get_absolute_uri_host(self, mock_reverse):
+        mock_reverse.return_value = '/test/'
+        AbsoluteURI('test', 'test').get_absolute_uri()
+        self.assertEqual(
+            'http://other.test.com/test/',
+            AbsoluteURI('test', 'test', 'other.test.com').get_absolute_uri()
+        )
+        self.assertEqual(
+            'http://www.test.com/test/',
+            AbsoluteURI('test', 'test').get_absolute_uri()
+        )
+
+    @override_settings(DJANGO_TWILIO_SMS_SITE_HOST='www.test.com')
+    def test_get_absolute_uri_setting_changed(self):
+        absolute_uri = AbsoluteURI('django_twilio_sms', 'callback_view')
+        self.assertTrue(
+            absolute_uri.get_absolute_uri().startswith('http://www.test.com')
+        )
+        with self.settings(DJANGO_TWILIO_SMS_SITE_HOST='new.test.com'):
+            self.assertTrue(absolute_uri.get_absolute_uri().startswith(
+                'http://new.test.com'
+            ))
+
     @override_settings(DJANGO_TWILIO_SMS_SITE_HOST='www.test.com')
     def test_get_host_no_exception(self):
         absolute_uri = AbsoluteURI('test', 'test')
@@ -53,3 +94,19 @@ class AbsoluteURITest(TestCase):
     def test_get_scheme_if_not_secure_ssl_redirect(self):
         absolute_uri = AbsoluteURI('test', 'test')
         self.assertEqual('http', absolute_uri.get_scheme())
+
+
+class OnCommitTest(TestCase):
+
+    @patch('django_twilio_sms.utils.transaction')
+    def test_on_commit(self, transaction):
+        func = Mock()
+        on_commit(func, using='default')
+        transaction.on_commit.assert_called_once_with(func, using='default')
+        self.assertFalse(func.called)
+
+    @patch('django_twilio_sms.utils.transaction', Mock(spec=[]))
+    def test_on_commit_without_on_commit(self):
+        func = Mock()
+        on_commit(func)
+        func.assert_called_once_with()
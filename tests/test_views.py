@@ -4,7 +4,12 @@ from django.test import override_settings, TestCase
 from mock import patch, Mock
 
 from .mommy_recipes import message_recipe
-from django_twilio_sms.views import message_view, voice_view
+from django_twilio_sms.models import WebhookEvent
+from django_twilio_sms.views import (
+    inbound_message_view,
+    message_view,
+    voice_view
+)
 
 
 @override_settings(DJANGO_TWILIO_FORGERY_PROTECTION=False)
@@ -18,6 +23,19 @@ class CallbackViewTest(TestCase):
         self.assertTrue(mock_message_view.called)
         self.assertIn('<Response />', str(response.content))
 
+    @override_settings(DJANGO_TWILIO_SMS_WEBHOOK_QUEUE=True)
+    @patch('django_twilio_sms.views.message_view')
+    def test_if_webhook_queue(self, mock_message_view):
+        response = self.client.post(
+            reverse('django_twilio_sms:callback_view'),
+            {'MessageSid': 'test', 'MessageStatus': 'sent'}
+        )
+        self.assertFalse(mock_message_view.called)
+        self.assertIn('<Response />', str(response.content))
+        event = WebhookEvent.objects.get()
+        self.assertEqual(WebhookEvent.CALLBACK, event.view)
+        self.assertEqual('sent', event.twilio_request.messagestatus)
+
 
 @override_settings(DJANGO_TWILIO_FORGERY_PROTECTION=False)
 class InboundViewTest(TestCase):
@@ -67,29 +85,65 @@ class InboundViewTest(TestCase):
         )
         self.assertIn('<Response><Reject /></Response>', str(response.content))
 
+    @override_settings(DJANGO_TWILIO_SMS_WEBHOOK_QUEUE=True)
+    @patch('django_twilio_sms.views.message_view')
+    def test_if_twilio_request_type_is_message_if_webhook_queue(
+            self, mock_message_view):
+        response = self.client.post(
+            reverse('django_twilio_sms:inbound_view'), {'MessageSid': 'test'}
+        )
+        self.assertFalse(mock_message_view.called)
+        self.assertIn('<Response />', str(response.content))
+        event = WebhookEvent.objects.get()
+        self.assertEqual(WebhookEvent.INBOUND, event.view)
+        self.assertEqual('test', event.twilio_request.messagesid)
+
+    @override_settings(DJANGO_TWILIO_SMS_WEBHOOK_QUEUE=True)
+    def test_if_not_twilio_request_type_is_message_if_webhook_queue(self):
+        response = self.client.post(
+            reverse('django_twilio_sms:inbound_view')
+        )
+        self.assertIn('<Response><Reject /></Response>', str(response.content))
+        self.assertEqual(0, WebhookEvent.objects.all().count())
 
-class MessageViewTest(TestCase):
 
-    @patch('django_twilio_sms.views.Message')
-    def test_if_created(self, mock_message):
-        mock_message.get_or_create.return_value = (mock_message, True)
-        message_view(Mock(messagesid='test'))
-        self.assertTrue(mock_message.get_or_create.called)
-        self.assertFalse(mock_message.sync_twilio_message.called)
-        mock_message.get_or_create.assert_called_with('test')
+class InboundMessageViewTest(TestCase):
+
+    @override_settings(DJANGO_TWILIO_SMS_RESPONSE_MESSAGE=False)
+    @patch('django_twilio_sms.views.message_view')
+    def test_if_not_response_message(self, mock_message_view):
+        mock = Mock()
+        mock_message_view.return_value = mock
+        self.assertEqual(mock, inbound_message_view(Mock()))
+        self.assertFalse(mock.send_response_message.called)
+
+    @override_settings(DJANGO_TWILIO_SMS_RESPONSE_MESSAGE=True)
+    @patch('django_twilio_sms.views.message_view')
+    def test_if_response_message(self, mock_message_view):
+        mock = Mock()
+        mock_message_view.return_value = mock
+        self.assertEqual(mock, inbound_message_view(Mock()))
+        self.assertTrue(mock.send_response_message.called)
+
+
+class MessageViewTest(TestCase):
 
     @patch('django_twilio_sms.views.Message')
-    def test_if_not_created(self, mock_message):
-        mock_message.get_or_create.return_value = (mock_message, False)
-        message_view(Mock(messagesid='test'))
-        self.assertTrue(mock_message.get_or_create.called)
-        self.assertTrue(mock_message.sync_twilio_message.called)
-        mock_message.get_or_create.assert_called_with('test')
+    def test_get_or_create_from_request(self, mock_message):
+        twilio_request = Mock(messagesid='test')
+        mock_message.get_or_create_from_request.return_value = (
+            mock_message, False
+        )
+        message_view(twilio_request)
+        mock_message.get_or_create_from_request.assert_called_with(
+            twilio_request
+        )
+        self.assertFalse(mock_message.get_or_create.called)
 
     @patch('django_twilio_sms.views.Message')
     def test_returns_message_object(self, mock_message):
         message = message_recipe.make()
-        mock_message.get_or_create.return_value = (message, True)
+        mock_message.get_or_create_from_request.return_value = (message, True)
         self.assertEqual(message, message_view(Mock(messagesid='test')))
 
 